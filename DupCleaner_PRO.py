@@ -4,15 +4,31 @@ Professional Duplicate File Finder & Cleaner
 Scrollable Thumbnails | Auto-Delete | Keep Newest Option
 """
 
-import os, sys, threading, time, json
+import os, sys, threading, json
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from datetime import datetime
 from collections import defaultdict
-import hashlib
-from send2trash import send2trash
+from dataclasses import asdict
+
+from dupcleaner import (
+    DEFAULT_WORKERS, LINK_MODES, VERIFY_MODES, DeleteResult, DeletionJournal, ScanCheckpoint, ScanOptions, ScanResult,
+    available_algorithms, delete_files, undo_deletions, FileTable, find_duplicates, format_size, link_duplicates, log_error, reclaimable_bytes, scan,
+    select_for_deletion, stat_record, walk,
+)
+from dupcleaner.archives import MEMBER_SEP, is_archive
+from dupcleaner.chunking import PARTIAL_MODE, find_partial_duplicates
+from dupcleaner.hashing import DEFAULT_ALGORITHM
+from dupcleaner.metrics import TABLE_COLUMNS, metrics_file, metrics_rows
+from dupcleaner.progress import ProgressBus
+from dupcleaner.similar import DEFAULT_DISTANCE, PERCEPTUAL_METHODS, find_similar_images
+from dupcleaner.thumbnails import ThumbnailLoader, is_image
+from dupcleaner.report import check_csv_algorithm, load_report, read_report_header, report_format, write_report, write_txt_report
+from dupcleaner.targets import TargetIndex
+from dupcleaner.utils import data_path, default_cache_file, default_checkpoint_file, default_journal_file, default_metrics_dir
+from dupcleaner.walker import WalkState
+from dupcleaner.watch import watch
 
 try:
     from PIL import Image, ImageTk
@@ -22,45 +38,48 @@ except ImportError:
 
 # =================== GLOBALS ===================
 stop_event = threading.Event()
-all_files = set()
+all_files = FileTable()  # path -> FileRecord (size, mtime, device, inode captured by the walker), stored compactly
 duplicates = defaultdict(list)
-tree_iid_map = {}  # stable mapping Treeview IID -> file list
-thumbnail_cache = []
-file_delete_vars = {}  # file path -> BooleanVar
-
-log_file = os.path.join(os.getcwd(), "dupcleaner.log")
-settings_file = os.path.join(os.getcwd(), "dupcleaner_settings.json")
+group_digests = {}  # group key -> digest reported by the scan, written to exports
+tree_iid_map = {}  # Treeview IID -> file list, for the rows of the current page only
+thumbnail_cache = []  # PhotoImages of the visible page; decoded images live in the loader's LRU
+thumb_loader = None
+deselected_files = set()  # paths unticked in the preview; every other duplicate is selected
+group_order = []  # keys of `duplicates` in display order
+group_wasted = {}  # group key -> reclaimable bytes
+group_reclaim = {}  # group key -> bytes block-level dedupe would reclaim, for partial-duplicate groups
+group_number = {}  # group key -> stable "Group N" label, independent of sorting
+group_sort = [None, True]  # [column, descending]
+group_page = 0
+preview_files = []  # files of the group shown in the preview panel
+preview_page = 0
+scan_options = ScanOptions()  # options of the last scan, e.g. the digest algorithm for exports
+scan_mode = "exact"  # "exact", a perceptual hash method or PARTIAL_MODE, for the last scan
+progress_bus = ProgressBus()  # engine publishes counters here; the UI polls it on a timer
+last_metrics_file = None  # per-stage metrics of the last scan or delete, as JSON
+scan_thread = None
+watch_stop = threading.Event()  # replaced for every watch session
+watch_stop.set()
+
+PROGRESS_POLL_MS = 200
+GROUP_PAGE_SIZE = 200  # Treeview rows materialized at a time
+FILE_PAGE_SIZE = 100
+THUMB_PAGE_SIZE = 40
+METRICS_KEEP = 50  # per-run metrics files kept in default_metrics_dir
+
+settings_file = data_path("dupcleaner_settings.json")
 
 # =================== UTIL ===================
 def resource_path(file_name):
     base_path = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base_path, file_name)
 
-def file_hash(path, chunk_size=65536, quick=True):
-    md5 = hashlib.md5()
+def _safe_get(var, default):
+    """Read a Tk variable bound to a free-text widget, falling back on invalid input."""
     try:
-        with open(path, "rb") as f:
-            if quick:
-                md5.update(f.read(65536))
-            else:
-                while True:
-                    data = f.read(chunk_size)
-                    if not data:
-                        break
-                    md5.update(data)
-    except Exception:
-        return None
-    return md5.hexdigest()
-
-def log_error(msg):
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat()}] {msg}\n")
-
-def format_size(num):
-    for unit in ("B", "KB", "MB", "GB", "TB"):
-        if num < 1024:
-            return f"{num:.2f} {unit}"
-        num /= 1024
+        return var.get()
+    except (tk.TclError, ValueError):
+        return default
 
 # ---------------------- Helper for consistent messages ----------------------
 def _show_message(title, text, msg_type="info"):
@@ -97,6 +116,16 @@ except Exception:
 
 progress_value = tk.IntVar(app)
 keep_newest_var = tk.BooleanVar(value=False)
+workers_var = tk.IntVar(value=DEFAULT_WORKERS)
+use_processes_var = tk.BooleanVar(value=False)
+verify_var = tk.StringVar(value="compare")
+algorithm_var = tk.StringVar(value=DEFAULT_ALGORITHM)
+link_mode_var = tk.StringVar(value="hardlink")
+exclude_var = tk.StringVar(value="")  # comma-separated folder name patterns
+watch_var = tk.BooleanVar(value=False)
+archives_var = tk.BooleanVar(value=False)  # list zip/tar members of folders added from now on
+mode_var = tk.StringVar(value="exact")  # exact duplicates, similar images by perceptual hash, or partial duplicates
+distance_var = tk.IntVar(value=DEFAULT_DISTANCE)
 
 # =================== TITLE ===================
 tb.Label(app, text="DupCleaner PRO", font=("Segoe UI", 22, "bold")).pack(pady=(10, 2))
@@ -111,7 +140,8 @@ tb.Label(
 row1 = tb.Labelframe(app, text="Add Files / Folders", padding=10)
 row1.pack(fill="x", padx=10, pady=6)
 
-target_paths = []
+target_paths = []  # in the order shown in the list
+target_index = TargetIndex()  # the same paths, for nested/overlapping target checks
 
 listbox_frame = tb.Frame(row1)
 listbox_frame.pack(side="left", fill="both", expand=True, padx=6)
@@ -128,6 +158,13 @@ tb.Button(row1, text="📄 Add File", bootstyle="secondary", command=lambda: add
 tb.Button(row1, text="❌ Remove Selected", bootstyle="danger", command=lambda: remove_selected_ui()).pack(side="left", padx=4)
 
 tb.Checkbutton(row1, text="Keep Newest File in Duplicates", variable=keep_newest_var, bootstyle="info").pack(side="right", padx=6)
+tb.Spinbox(row1, from_=0, to=32, width=3, textvariable=distance_var).pack(side="right", padx=(0, 6))
+tb.Label(row1, text="Distance:").pack(side="right", padx=(6, 4))
+tb.Combobox(row1, values=("exact",) + PERCEPTUAL_METHODS + (PARTIAL_MODE,), textvariable=mode_var, state="readonly", width=7).pack(side="right")
+tb.Label(row1, text="Mode:").pack(side="right", padx=(6, 4))
+tb.Entry(row1, textvariable=exclude_var, width=18).pack(side="right", padx=(0, 6))
+tb.Label(row1, text="Exclude:").pack(side="right", padx=(6, 4))
+tb.Checkbutton(row1, text="🗜 Archives", variable=archives_var, bootstyle="info").pack(side="right", padx=6)
 
 # =================== CONTROLS ===================
 row2 = tb.Labelframe(app, text="Scan Controls", padding=10)
@@ -135,15 +172,35 @@ row2.pack(fill="x", padx=10, pady=6)
 
 start_btn = tb.Button(row2, text="🔍 SCAN DUPLICATES", bootstyle="success")
 stop_btn = tb.Button(row2, text="🛑 STOP", bootstyle="danger-outline", state="disabled")
+resume_btn = tb.Button(row2, text="⏯ RESUME", bootstyle="success-outline",
+                       state="normal" if os.path.exists(default_checkpoint_file) else "disabled")
 delete_btn = tb.Button(row2, text="🗑️ DELETE DUPLICATES", bootstyle="danger-outline", state="disabled")
+undo_btn = tb.Button(row2, text="↩ UNDO", bootstyle="secondary-outline",
+                     state="normal" if os.path.exists(default_journal_file) else "disabled")
+link_btn = tb.Button(row2, text="🔗 LINK", bootstyle="warning-outline", state="disabled")
 
 start_btn.pack(side="left", padx=6)
 stop_btn.pack(side="left", padx=6)
+resume_btn.pack(side="left", padx=6)
 delete_btn.pack(side="left", padx=6)
+undo_btn.pack(side="left", padx=6)
+link_btn.pack(side="left", padx=(6, 2))
+tb.Combobox(row2, values=LINK_MODES, textvariable=link_mode_var, state="readonly", width=8).pack(side="left")
+
+tb.Label(row2, text="Workers:").pack(side="left", padx=(18, 4))
+tb.Spinbox(row2, from_=1, to=64, width=4, textvariable=workers_var).pack(side="left")
+tb.Checkbutton(row2, text="Process Pool", variable=use_processes_var, bootstyle="info").pack(side="left", padx=8)
+tb.Label(row2, text="Verify:").pack(side="left", padx=(10, 4))
+tb.Combobox(row2, values=VERIFY_MODES, textvariable=verify_var, state="readonly", width=8).pack(side="left")
+tb.Label(row2, text="Hash:").pack(side="left", padx=(10, 4))
+tb.Combobox(row2, values=available_algorithms(), textvariable=algorithm_var, state="readonly", width=9).pack(side="left")
+tb.Checkbutton(row2, text="👁 Live Watch", variable=watch_var, bootstyle="info", command=lambda: toggle_watch()).pack(side="left", padx=10)
 
 tb.Button(row2, text="ℹ About / Help", bootstyle="info-outline", command=lambda: show_about()).pack(side="right", padx=4)
-tb.Button(row2, text="🧾 JSON", bootstyle="secondary-outline", command=lambda: export_json()).pack(side="right", padx=4)
+tb.Button(row2, text="📊 Stats", bootstyle="info-outline", command=lambda: show_scan_stats()).pack(side="right", padx=4)
+tb.Button(row2, text="🧾 Export", bootstyle="secondary-outline", command=lambda: export_report()).pack(side="right", padx=4)
 tb.Button(row2, text="📃 TXT", bootstyle="secondary-outline", command=lambda: export_txt()).pack(side="right", padx=4)
+tb.Button(row2, text="📂 Import", bootstyle="secondary-outline", command=lambda: import_report()).pack(side="right", padx=4)
 
 # =================== PROGRESS ===================
 row3 = tb.Labelframe(app, text="Progress", padding=8)
@@ -158,6 +215,9 @@ eta_lbl.pack(side="left", padx=10)
 spd_lbl = tb.Label(row3, text="Speed: -- files/s")
 spd_lbl.pack(side="left", padx=10)
 
+stage_lbl = tb.Label(row3, text="Stage: idle")
+stage_lbl.pack(side="left", padx=10)
+
 stats_lbl = tb.Label(row3, text="Files: 0 | Duplicates: 0")
 stats_lbl.pack(side="right", padx=10)
 
@@ -176,10 +236,10 @@ results_frame.pack(fill="both", expand=True)
 tree_frame = tb.Frame(results_frame)
 tree_frame.pack(side="left", fill="both", expand=True, padx=(0, 5))
 
-tree_cols = ("group", "count")
+tree_cols = ("group", "count", "wasted")
 tree = tb.Treeview(tree_frame, columns=tree_cols, show="headings", selectmode="browse")
 for col in tree_cols:
-    tree.heading(col, text=col.upper())
+    tree.heading(col, text=col.upper(), command=lambda c=col: sort_groups(c))
     tree.column(col, anchor="w")
 
 scroll_y = tb.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
@@ -192,21 +252,69 @@ scroll_x.grid(row=1, column=0, sticky="ew")
 tree_frame.grid_rowconfigure(0, weight=1)
 tree_frame.grid_columnconfigure(0, weight=1)
 
+def _pager(parent, turn):
+    """Prev/next page controls; returns (frame, update(page, pages, caption))."""
+    bar = tb.Frame(parent)
+    prev_btn = tb.Button(bar, text="◀", width=3, bootstyle="secondary-outline", command=lambda: turn(-1))
+    label = tb.Label(bar, text="")
+    next_btn = tb.Button(bar, text="▶", width=3, bootstyle="secondary-outline", command=lambda: turn(1))
+    prev_btn.pack(side="left")
+    label.pack(side="left", padx=8)
+    next_btn.pack(side="left")
+
+    def update(page, pages, caption):
+        label.config(text=f"Page {page + 1}/{pages} · {caption}")
+        prev_btn.config(state="normal" if page > 0 else "disabled")
+        next_btn.config(state="normal" if page + 1 < pages else "disabled")
+
+    return bar, update
+
+def _page_count(total, size):
+    return max(1, (total + size - 1) // size)
+
 # --- RIGHT PANEL: Preview ---
 preview_frame = tb.Labelframe(results_frame, text="Preview Duplicate Files", padding=5)
 preview_frame.pack(side="right", fill="both", expand=True)
 
 # =================== THUMBNAILS / FILE SELECTION ===================
-def show_thumbnails(files):
-    """Display image thumbnails in a responsive grid inside preview_frame."""
-    global thumbnail_cache
+def _clear_preview():
+    if thumb_loader is not None:
+        thumb_loader.cancel_pending()
     for widget in preview_frame.winfo_children():
         widget.destroy()
     thumbnail_cache.clear()
 
-    if not files:
+def get_thumb_loader():
+    """Loader matching the last scan's algorithm, so content keys come from its hash cache."""
+    global thumb_loader
+    if thumb_loader is None or thumb_loader.algorithm != scan_options.algorithm:
+        if thumb_loader is not None:
+            thumb_loader.close()
+        thumb_loader = ThumbnailLoader(cache_path=default_cache_file, algorithm=scan_options.algorithm)
+    return thumb_loader
+
+def turn_preview_page(step, render):
+    global preview_page
+    preview_page += step
+    render()
+
+def show_thumbnails(files):
+    """Display one page of image thumbnails in a responsive grid inside preview_frame."""
+    global preview_files, preview_page
+    preview_files = [f for f in files if is_image(f)]
+    preview_page = 0
+    render_thumbnail_page()
+
+def render_thumbnail_page():
+    _clear_preview()
+    if not preview_files:
         return
 
+    pages = _page_count(len(preview_files), THUMB_PAGE_SIZE)
+    bar, update_pager = _pager(preview_frame, lambda step: turn_preview_page(step, render_thumbnail_page))
+    bar.pack(side="bottom", pady=(4, 0))
+    update_pager(preview_page, pages, f"{len(preview_files)} images")
+
     # Scrollable canvas
     canvas = tk.Canvas(preview_frame)
     scrollbar = tk.Scrollbar(preview_frame, orient="vertical", command=canvas.yview)
@@ -234,47 +342,141 @@ def show_thumbnails(files):
         for c in range(cols):
             scroll_frame.grid_columnconfigure(c, weight=1)
 
-    # Create thumbnails
-    for f in files:
-        if not f.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp")):
-            continue
-        try:
-            img = Image.open(f)
-            img.thumbnail((120, 120))
-            tk_img = ImageTk.PhotoImage(img)
-            thumbnail_cache.append(tk_img)
-            lbl = tk.Label(scroll_frame, image=tk_img, text=os.path.basename(f), compound="top")
-            lbl.bind("<Configure>", update_grid)
-            lbl.grid(padx=5, pady=5)
-        except Exception as e:
-            log_error(f"Thumbnail failed: {f} | {e}")
+    # Placeholders for this page; the loader decodes in the background and fills them in
+    loader = get_thumb_loader()
+    placeholder = tk.PhotoImage(width=120, height=120)
+    thumbnail_cache.append(placeholder)
+    start = preview_page * THUMB_PAGE_SIZE
+    for f in preview_files[start:start + THUMB_PAGE_SIZE]:
+        lbl = tk.Label(scroll_frame, image=placeholder, text=os.path.basename(f), compound="top")
+        lbl.bind("<Configure>", update_grid)
+        lbl.grid(padx=5, pady=5)
+        loader.request(f, all_files.get(f), lambda path, img, lbl=lbl: app.after(0, _set_thumbnail, lbl, img))
 
     # Update grid whenever frame is resized
     scroll_frame.bind("<Configure>", update_grid)
 
+def _set_thumbnail(lbl, img):
+    if img is None or not lbl.winfo_exists():
+        return
+    tk_img = ImageTk.PhotoImage(img)
+    thumbnail_cache.append(tk_img)
+    lbl.config(image=tk_img)
+
 def show_file_selection(files):
-    global file_delete_vars
-    for widget in preview_frame.winfo_children():
-        widget.destroy()
-    file_delete_vars.clear()
+    """Paged per-file selection; ticks live in deselected_files, not in Tk variables."""
+    global preview_files, preview_page
+    preview_files = list(files)
+    preview_page = 0
+    render_file_page()
+
+def render_file_page():
+    _clear_preview()
+    if not preview_files:
+        return
 
-    if not files:
+    pages = _page_count(len(preview_files), FILE_PAGE_SIZE)
+    bar, update_pager = _pager(preview_frame, lambda step: turn_preview_page(step, render_file_page))
+    bar.pack(side="bottom", pady=(4, 0))
+    update_pager(preview_page, pages, f"{len(preview_files)} files · click a row to toggle")
+
+    cols = ("sel", "name", "size", "folder")
+    files_view = tb.Treeview(preview_frame, columns=cols, show="headings", selectmode="none")
+    for col, width in zip(cols, (40, 220, 90, 300)):
+        files_view.heading(col, text="✓" if col == "sel" else col.upper())
+        files_view.column(col, anchor="w", width=width, stretch=col == "folder")
+    files_view.heading("sel", command=lambda: toggle_all_files(files_view))
+    view_scroll = tb.Scrollbar(preview_frame, orient="vertical", command=files_view.yview)
+    files_view.configure(yscrollcommand=view_scroll.set)
+    files_view.pack(side="left", fill="both", expand=True)
+    view_scroll.pack(side="right", fill="y")
+
+    start = preview_page * FILE_PAGE_SIZE
+    for i, f in enumerate(preview_files[start:start + FILE_PAGE_SIZE], start):
+        rec = all_files.get(f)
+        files_view.insert("", "end", iid=str(i), values=(
+            "☐" if f in deselected_files else "☑",
+            os.path.basename(f),
+            format_size(rec.size) if rec else "?",
+            os.path.dirname(f),
+        ))
+    files_view.bind("<Button-1>", lambda e: toggle_file(files_view, files_view.identify_row(e.y)))
+
+def toggle_file(files_view, iid):
+    if not iid:
         return
+    f = preview_files[int(iid)]
+    if f in deselected_files:
+        deselected_files.discard(f)
+    else:
+        deselected_files.add(f)
+    files_view.set(iid, "sel", "☐" if f in deselected_files else "☑")
+
+def toggle_all_files(files_view):
+    """Header click: untick the whole group, or tick it again if it is already unticked."""
+    if all(f in deselected_files for f in preview_files):
+        deselected_files.difference_update(preview_files)
+    else:
+        deselected_files.update(preview_files)
+    for iid in files_view.get_children():
+        files_view.set(iid, "sel", "☐" if preview_files[int(iid)] in deselected_files else "☑")
 
-    for f in files:
-        var = tk.BooleanVar(value=True)
-        file_delete_vars[f] = var
-        cb = tk.Checkbutton(preview_frame, text=os.path.basename(f), variable=var)
-        cb.pack(anchor="w", padx=5, pady=2)
+def is_selected(f):
+    return f not in deselected_files
 
 # =================== TREE SELECTION ===================
 def refresh_tree():
+    """Recompute group order and wasted bytes, then render the current page."""
+    group_order[:] = list(duplicates)
+    group_wasted.clear()
+    group_number.clear()
+    for i, (key, lst) in enumerate(duplicates.items(), 1):
+        group_wasted[key] = group_reclaim[key] if key in group_reclaim else reclaimable_bytes(lst, all_files)
+        group_number[key] = i
+    _sort_group_order()
+    render_group_page()
+
+def _sort_group_order():
+    column, descending = group_sort
+    if column == "wasted":
+        group_order.sort(key=group_wasted.__getitem__, reverse=descending)
+    elif column == "count":
+        group_order.sort(key=lambda k: len(duplicates[k]), reverse=descending)
+
+def sort_groups(column):
+    """Heading click: reorder the backing key list; only the visible page is re-rendered."""
+    global group_page
+    if column == "group":
+        group_sort[:] = [None, True]
+        group_order[:] = list(duplicates)
+    else:
+        group_sort[:] = [column, not group_sort[1] if group_sort[0] == column else True]
+        _sort_group_order()
+    group_page = 0
+    render_group_page()
+
+def turn_group_page(step):
+    global group_page
+    group_page += step
+    render_group_page()
+
+def render_group_page():
+    global group_page
+    pages = _page_count(len(group_order), GROUP_PAGE_SIZE)
+    group_page = min(max(group_page, 0), pages - 1)
     tree.delete(*tree.get_children())
     tree_iid_map.clear()
-    for i, lst in enumerate(duplicates.values(), 1):
-        iid = str(id(lst))
-        tree.insert("", "end", iid=iid, values=(f"Group {i}", len(lst)))
+    start = group_page * GROUP_PAGE_SIZE
+    for key in group_order[start:start + GROUP_PAGE_SIZE]:
+        lst = duplicates[key]
+        iid = str(key)
+        tree.insert("", "end", iid=iid, values=(f"Group {group_number[key]}", len(lst), format_size(group_wasted[key])))
         tree_iid_map[iid] = lst
+    update_group_pager(group_page, pages, f"{len(group_order)} groups")
+
+group_pager, update_group_pager = _pager(tree_frame, turn_group_page)
+group_pager.grid(row=2, column=0, columnspan=2, pady=(4, 0))
+update_group_pager(0, 1, "0 groups")
 
 def on_group_select(event):
     selected = event.widget.selection()
@@ -283,7 +485,7 @@ def on_group_select(event):
     iid = selected[0]
     files = tree_iid_map.get(iid, [])
 
-    if any(f.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp")) for f in files):
+    if Image is not None and any(is_image(f) for f in files):
         show_thumbnails(files)
     else:
         show_file_selection(files)
@@ -291,135 +493,301 @@ def on_group_select(event):
 tree.bind("<<TreeviewSelect>>", on_group_select)
 
 # =================== FILE / FOLDER ADDING ===================
+def add_target(path, load=True):
+    """List a file or folder as a target and, with load, read its files into all_files.
+
+    A target inside an existing one is listed but not walked again; a folder
+    that contains existing targets is walked around them.
+    """
+    if not target_index.add(path):
+        return False
+    target_paths.append(path)
+    target_listbox.insert("end", path)
+    if not load or target_index.covering(path) is not None:
+        return True
+    if os.path.isfile(path):
+        rec = stat_record(path)
+        if rec:
+            all_files[path] = rec
+            if archives_var.get() and is_archive(path):
+                threading.Thread(target=scan_folder_thread, args=(path, (), (), True), daemon=True).start()
+    else:
+        nested = target_index.nested(path)
+        threading.Thread(target=scan_folder_thread, args=(path, exclude_patterns(), nested, archives_var.get()),
+                         daemon=True).start()
+    return True
+
 def add_files_ui():
-    global target_paths, all_files
     files = filedialog.askopenfilenames()
     if files:
         for f in files:
-            if f not in target_paths:
-                target_paths.append(f)
-                all_files.add(f)
-                target_listbox.insert("end", f)
+            add_target(f)
         update_stats()
 
 def add_folder_ui():
-    global target_paths, all_files
     folder = filedialog.askdirectory()
     if folder:
-        if folder not in target_paths:
-            target_paths.append(folder)
-            target_listbox.insert("end", folder)
-            threading.Thread(target=scan_folder_thread, args=(folder,), daemon=True).start()
+        add_target(folder)
 
 def remove_selected_ui():
-    global target_paths, all_files
     selected_indices = list(target_listbox.curselection())
     selected_indices.reverse()
+    if selected_indices:
+        stop_watch()  # the watcher would keep reporting files below removed targets
     for i in selected_indices:
         path = target_listbox.get(i)
         target_listbox.delete(i)
-        if os.path.isfile(path):
-            all_files.discard(path)
-        else:
-            all_files = {f for f in all_files if not f.startswith(path)}
         target_paths.remove(path)
+        target_index.discard(path)
+        if target_index.covering(path) is not None:
+            continue  # an enclosing target still holds these files
+        if path in all_files:
+            all_files.pop(path)
+            all_files.remove_tree(path + MEMBER_SEP)  # its archive members, listed as "path!/..."
+        else:
+            # Only this folder's subtree is visited; targets nested inside it stay loaded.
+            nested = target_index.nested(path)
+            nested_files = [all_files[p] for p in nested if p in all_files]
+            all_files.remove_tree(path, keep=nested)
+            for rec in nested_files:
+                all_files.add(rec)
     update_stats()
 
-def scan_folder_thread(folder):
-    global all_files
-    new_files = set()
-    for root, _, files in os.walk(folder):
-        for f in files:
-            new_files.add(os.path.join(root, f))
-    all_files.update(new_files)
-    app.after(0, update_stats)
+def exclude_patterns():
+    """Folder name patterns from the Exclude box, e.g. ".git, node_modules, $RECYCLE.BIN"."""
+    return tuple(p.strip() for p in exclude_var.get().split(",") if p.strip())
+
+def scan_folder_thread(folder, exclude=(), skip=(), archives=False):
+    """Walk folder (or list an archive's members) off the UI thread; folders in skip
+    (nested targets, already loaded) are not listed again."""
+    seen = set()
+    for path in skip:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        seen.add((st.st_dev, st.st_ino))
+    new_files = FileTable(walk([folder], exclude, state=WalkState(seen=seen), archives=archives))
+    app.after(0, merge_files, new_files)
+
+def merge_files(new_files):
+    """Add a walked folder to all_files on the UI thread, which owns the table."""
+    for rec in new_files.values():
+        all_files.add(rec)
+    update_stats()
 
 # =================== SCAN DUPLICATES ===================
 def scan_duplicates():
     if not all_files:
         _show_message("No Files ⚠️", "No files have been added for scanning.\nPlease add files or folders first.", "info")
         return
+    if mode_var.get() != "exact" and Image is None:
+        _show_message("Pillow Needed ⚠️", "Similar-image mode needs Pillow.\nInstall it with: pip install pillow", "error")
+        return
 
+    _begin_scan()
+    global scan_options
+    # Spawned pool workers would re-import this module and build a second window,
+    # so the GUI only offers the process pool where fork is available.
+    scan_options = ScanOptions(
+        workers=max(1, _safe_get(workers_var, DEFAULT_WORKERS)),
+        use_processes=use_processes_var.get(),
+        start_method="fork",
+        cache_path=default_cache_file,
+        verify=verify_var.get(),
+        algorithm=algorithm_var.get(),
+        exclude=exclude_patterns(),
+        archives=archives_var.get(),
+    )
+    global scan_thread, scan_mode
+    scan_mode = mode_var.get()
+    distance = max(0, _safe_get(distance_var, DEFAULT_DISTANCE))
+    progress_bus.reset()
+    files = all_files.copy()  # the worker gets a snapshot; targets may change while it runs
+    # Exact scans save their progress, so STOP or a crash can be followed by RESUME.
+    checkpoint = ScanCheckpoint(default_checkpoint_file, target_paths, scan_options, files) if scan_mode == "exact" else None
+    scan_thread = threading.Thread(target=scan_duplicates_thread, args=(files, scan_options, scan_mode, distance, checkpoint), daemon=True)
+    scan_thread.start()
+    poll_progress()
+
+def _begin_scan():
+    stop_watch()
     stop_event.clear()
     start_btn.config(state="disabled")
     stop_btn.config(state="normal")
+    resume_btn.config(state="disabled")
     delete_btn.config(state="disabled")
+    link_btn.config(state="disabled")
     duplicates.clear()
-    tree.delete(*tree.get_children())
+    group_digests.clear()
+    group_reclaim.clear()
+    deselected_files.clear()
+    refresh_tree()
+    _clear_preview()
     progress_value.set(0)
 
-    threading.Thread(target=scan_duplicates_thread, daemon=True).start()
+def _collect_groups(result):
+    for final, digest in zip(result.groups, result.digests):
+        duplicates[id(final)] = final
+        group_digests[id(final)] = digest
 
-def scan_duplicates_thread():
-    size_map = defaultdict(list)
-    files_list = list(all_files)
-    processed = 0
-    start_time = time.time()
+def _worker_failed(what, e):
+    """Log an unexpected error of a worker thread and report it on the UI thread."""
+    log_error(f"{what} failed: {e}")
+    app.after(0, _show_message, f"{what} Error ❌", f"{what} stopped with an error:\n{e}\nSee the log for details.", "error")
 
-    for f in files_list:
-        if stop_event.is_set():
-            finish_scan()
+def scan_duplicates_thread(files, options, mode="exact", distance=DEFAULT_DISTANCE, checkpoint=None):
+    # finish_scan always runs, so a failed scan never leaves the buttons disabled.
+    try:
+        if mode == PARTIAL_MODE:
+            # Large files sharing most of their chunks; each group carries what block-level dedupe would free.
+            result = find_partial_duplicates(files.values(), options, stop_event=stop_event, bus=progress_bus)
+            for group in result.groups:
+                duplicates[id(group.paths)] = group.paths
+                group_reclaim[id(group.paths)] = group.reclaimable
+            _save_metrics("partial", options)
             return
-        try:
-            size_map[os.path.getsize(f)].append(f)
-        except Exception:
-            continue
+        if mode == "exact":
+            result = find_duplicates(files, options, stop_event, progress_bus, roots=list(target_paths), checkpoint=checkpoint)
+        else:
+            result = find_similar_images(files.values(), mode, distance, options, stop_event, progress_bus)
+        _collect_groups(result)
+        _save_metrics("scan", options)
+    except Exception as e:
+        _worker_failed("Scan", e)
+    finally:
+        app.after(0, finish_scan)
+
+def resume_scan():
+    """Continue the scan saved by STOP, a crash, or the CLI from its checkpoint."""
+    try:
+        checkpoint = ScanCheckpoint.load(default_checkpoint_file)
+    except ValueError as e:
+        _show_message("Resume Error ❌", f"The saved scan cannot be resumed:\n{e}", "error")
+        return
+    if checkpoint is None:
+        resume_btn.config(state="disabled")
+        _show_message("Nothing to Resume ⚠️", "There is no interrupted scan to resume.", "info")
+        return
 
-    candidate_groups = [g for g in size_map.values() if len(g) > 1]
-    if not candidate_groups:
-        finish_scan()
+    _begin_scan()
+    global scan_options, scan_mode, scan_thread
+    checkpoint.options.start_method = "fork"  # as in scan_duplicates: no spawned copies of the GUI
+    scan_options = checkpoint.options
+    scan_mode = "exact"
+    for path in checkpoint.paths:
+        add_target(path, load=False)  # the resumed scan supplies the files
+    progress_bus.reset()
+    scan_thread = threading.Thread(target=resume_scan_thread, args=(checkpoint,), daemon=True)
+    scan_thread.start()
+    poll_progress()
+
+def resume_scan_thread(checkpoint):
+    try:
+        checkpoint.revalidate()
+        result = scan(checkpoint.paths, checkpoint.options, stop_event, progress_bus, checkpoint=checkpoint)
+        _collect_groups(result)
+        _save_metrics("resume", checkpoint.options)
+        app.after(0, merge_files, result.records)
+    except Exception as e:
+        _worker_failed("Scan", e)
+    finally:
+        app.after(0, finish_scan)
+
+def _save_metrics(command, options):
+    """Write the run's per-stage metrics to a new file in default_metrics_dir (worker thread)."""
+    global last_metrics_file
+    path = metrics_file(default_metrics_dir, keep=METRICS_KEEP)
+    try:
+        progress_bus.metrics.write(path, command=command, paths=list(target_paths), options=asdict(options))
+        last_metrics_file = path
+    except OSError as e:
+        log_error(f"Cannot write metrics: {path} | {e}")
+
+def show_scan_stats():
+    """Per-stage wall time, bytes read, cache hit rate and worker utilisation of the
+    last (or running) scan or delete, for tuning workers on each drive."""
+    data = progress_bus.metrics.as_dict()
+    if not data["stages"]:
+        _show_message("Scan Statistics 📊", "Run a scan first; its statistics will be shown here.", "info")
         return
 
-    for group in candidate_groups:
-        if stop_event.is_set():
-            finish_scan()
+    win = tb.Toplevel(app)
+    win.title("Scan Statistics 📊")
+    win.geometry("860x340")
+    win.attributes("-toolwindow", True)
+
+    frame = tb.Frame(win, padding=12)
+    frame.pack(fill="both", expand=True)
+
+    view = tb.Treeview(frame, columns=TABLE_COLUMNS, show="headings", height=8)
+    for col in TABLE_COLUMNS:
+        view.heading(col, text=col)
+        view.column(col, anchor="w" if col == "Stage" else "e", width=110 if col == "Stage" else 85)
+    view.pack(fill="both", expand=True)
+
+    def refresh():
+        if not win.winfo_exists():
             return
-        quick_map = defaultdict(list)
-        for f in group:
-            if stop_event.is_set():
-                finish_scan()
-                return
-            h = file_hash(f, quick=True)
-            if h:
-                quick_map[h].append(f)
-            processed += 1
-            app.after(0, lambda p=processed: update_progress(p, sum(len(g) for g in candidate_groups), start_time))
-
-        for vals in quick_map.values():
-            if len(vals) > 1:
-                full_map = defaultdict(list)
-                for f in vals:
-                    h = file_hash(f, quick=False)
-                    if h:
-                        full_map[h].append(f)
-                for final in full_map.values():
-                    if len(final) > 1:
-                        duplicates[id(final)] = final
-
-    app.after(0, finish_scan)
-
-def update_progress(processed, total, start_time):
-    progress_value.set(int(processed / total * 100))
-    elapsed = time.time() - start_time
-    spd_lbl.config(text=f"Speed: {processed/elapsed:.1f} files/s" if elapsed else "--")
-    eta = int((total-processed)/(processed/elapsed)) if processed else 0
-    eta_lbl.config(text=f"ETA: {eta}s")
+        view.delete(*view.get_children())
+        current = progress_bus.metrics.as_dict()
+        for row in metrics_rows(current):
+            view.insert("", "end", values=row)
+        memory = current.get("memory")
+        note = f"Total: {current['total_wall']:.2f}s"
+        if memory:
+            note += f" | Peak traced memory: {format_size(memory['peak_bytes'])}"
+        if last_metrics_file:
+            note += f"\nLast run saved to: {last_metrics_file}"
+        note_lbl.config(text=note)
+        if scan_thread is not None and scan_thread.is_alive():
+            win.after(1000, refresh)
+
+    tb.Label(frame, text="Utilisation = share of worker time spent on each stage or job type. MB/s/worker is the read rate "
+                         "of one busy worker: if it falls as workers are added, the drive is saturated.",
+             font=("Segoe UI", 9), foreground="#6b7280", wraplength=820, justify="left").pack(anchor="w", pady=(8, 2))
+    note_lbl = tb.Label(frame, text="", font=("Segoe UI", 9), justify="left")
+    note_lbl.pack(anchor="w")
+    tb.Button(frame, text="Close", bootstyle="secondary-outline", width=12, command=win.destroy).pack(pady=8)
+    refresh()
+
+def poll_progress():
+    """Refresh the progress row from the bus at a fixed rate while a scan runs."""
+    update_progress(progress_bus.snapshot())
+    if scan_thread is not None and scan_thread.is_alive():
+        app.after(PROGRESS_POLL_MS, poll_progress)
+
+def update_progress(snap):
+    progress_value.set(int(snap.fraction * 100))
+    spd_lbl.config(text=f"Speed: {format_size(snap.bytes_per_sec)}/s ({snap.files_per_sec:.1f} files/s)")
+    eta_lbl.config(text=f"ETA: {int(snap.eta)}s" if snap.eta is not None else "ETA: --")
+    if snap.stage == "walk":
+        stage_lbl.config(text=f"Stage: grouping {snap.files_seen} files")
+    elif snap.stage == "delete":
+        stage_lbl.config(text=f"Stage: deleting {snap.files_done}/{snap.files_total} files")
+    else:
+        stage_lbl.config(text=f"Stage: {snap.stage} | Cache hits: {snap.cache_hits}")
 
 def finish_scan():
     start_btn.config(state="normal")
     stop_btn.config(state="disabled")
-    delete_btn.config(state="normal")
+    resume_btn.config(state="normal" if os.path.exists(default_checkpoint_file) else "disabled")
+    # Partial duplicates differ in content, so they are never offered for deletion;
+    # near-duplicates differ too, so they must never be replaced by links.
+    delete_btn.config(state="disabled" if scan_mode == PARTIAL_MODE else "normal")
+    link_btn.config(state="normal" if scan_mode == "exact" else "disabled")
     refresh_tree()
     update_stats()
 
     total_dupes = sum(len(v) for v in duplicates.values())
     total_groups = len(duplicates)
-    total_size = sum(os.path.getsize(f) for group in duplicates.values() for f in group if os.path.exists(f))
+    total_size = sum(all_files[f].size for group in duplicates.values() for f in group if f in all_files)
+    reclaimable = sum(group_wasted.values())
 
     # Create a custom user-friendly window
     win = tb.Toplevel(app)
     win.title("Scan Complete ✅")
-    win.geometry("400x280")
+    win.geometry("400x310")
     win.resizable(False, False)
     win.grab_set()  # modal window
     win.attributes("-toolwindow", True)
@@ -440,6 +808,7 @@ def finish_scan():
     tb.Label(frame, text=f"✅ Total Duplicate Files: {total_dupes}", font=("Segoe UI", 12)).pack(anchor="w", pady=4)
     tb.Label(frame, text=f"📂 Duplicate Groups: {total_groups}", font=("Segoe UI", 12)).pack(anchor="w", pady=4)
     tb.Label(frame, text=f"💾 Total Size: {format_size(total_size)}", font=("Segoe UI", 12)).pack(anchor="w", pady=4)
+    tb.Label(frame, text=f"♻️ Reclaimable: {format_size(reclaimable)}", font=("Segoe UI", 12)).pack(anchor="w", pady=4)
 
     # Friendly tip
     tb.Label(frame, text="You can review each group on the right panel before deleting duplicates.", 
@@ -448,6 +817,9 @@ def finish_scan():
     # Close button
     tb.Button(frame, text="Close", bootstyle="success-outline", width=12, command=win.destroy).pack(pady=10)
 
+    if watch_var.get() and scan_mode == "exact" and not stop_event.is_set():
+        start_watch()
+
 def update_stats():
     total_dupes = sum(len(v) for v in duplicates.values())
     stats_lbl.config(text=f"Files: {len(all_files)} | Duplicates: {total_dupes}")
@@ -457,6 +829,64 @@ def stop_scan():
     start_btn.config(state="normal")
     stop_btn.config(state="disabled")
 
+# =================== LIVE WATCH ===================
+def start_watch():
+    """Keep the finished scan current from file system events instead of rescanning."""
+    global watch_stop
+    stop_watch()
+    if not target_paths:
+        return
+    # The watcher keys groups by their position in the seed, so the view is re-keyed to match.
+    seed = ScanResult(groups=[list(g) for g in duplicates.values()], records=all_files.copy())
+    digests = [group_digests.get(key) for key in duplicates]
+    duplicates.clear()
+    group_digests.clear()
+    for key, (group, digest) in enumerate(zip(seed.groups, digests)):
+        duplicates[key] = group
+        if digest is not None:
+            group_digests[key] = digest
+    session = watch_stop = threading.Event()
+
+    def on_update(groups, updated, removed):
+        app.after(0, apply_watch_update, session, groups, updated, removed)
+
+    threading.Thread(
+        target=watch,
+        args=(list(target_paths), on_update, scan_options, session),
+        kwargs={"result": seed},
+        daemon=True,
+    ).start()
+    stage_lbl.config(text="Stage: watching for changes")
+
+def stop_watch():
+    watch_stop.set()
+
+def toggle_watch():
+    if not watch_var.get():
+        stop_watch()
+        stage_lbl.config(text="Stage: idle")
+    elif (duplicates or all_files) and scan_mode == "exact":
+        if scan_thread is None or not scan_thread.is_alive():
+            start_watch()
+
+def apply_watch_update(session, changed, updated, removed):
+    """Merge a watcher delta into the file table and the groups it touched."""
+    if session.is_set():
+        return  # a late update from a stopped watch session
+    for f in removed:
+        all_files.pop(f, None)
+    for rec in updated:
+        all_files[rec.path] = rec
+    for key, group in changed.items():
+        group_digests.pop(key, None)  # the watcher regroups by content but does not report digests
+        if group is None:
+            duplicates.pop(key, None)
+        else:
+            duplicates[key] = group
+    refresh_tree()
+    update_stats()
+    stage_lbl.config(text=f"Stage: watching | {len(updated)} changed, {len(removed)} removed")
+
 # =================== DELETE DUPLICATES ===================
 def delete_duplicates():
     if not duplicates:
@@ -464,29 +894,14 @@ def delete_duplicates():
         return
 
     keep_newest = keep_newest_var.get()
-    deleted = 0
-    total_size = 0
-    skipped_files = []
-    failed_files = []
 
     # Gather deletion candidates
-    files_to_delete = []
-    for lst in duplicates.values():
-        if keep_newest:
-            lst_sorted = sorted(lst, key=lambda x: os.path.getmtime(x), reverse=True)
-            candidates = lst_sorted[1:]
-        else:
-            candidates = lst[1:]
-
-        for f in candidates:
-            if file_delete_vars.get(f, tk.BooleanVar(value=True)).get():
-                basename = os.path.basename(f)
-                # Skip Office temp files
-                if basename.startswith("~$"):
-                    skipped_files.append(f)
-                    log_error(f"Skipped temp file: {f}")
-                    continue
-                files_to_delete.append(f)
+    files_to_delete, skipped_files = select_for_deletion(
+        duplicates.values(),
+        keep_newest,
+        is_selected,
+        all_files,
+    )
 
     if not files_to_delete:
         _show_message(
@@ -497,45 +912,49 @@ def delete_duplicates():
         return
 
     # Confirmation popup
-    total_files_size = sum(os.path.getsize(f) for f in files_to_delete if os.path.exists(f))
+    total_files_size = sum(all_files[f].size for f in files_to_delete if f in all_files)
     confirm = _confirm_delete(len(files_to_delete), total_files_size, keep_newest)
     if not confirm:
         return
 
-    # Perform deletion
-    for f in files_to_delete:
-        if not os.path.exists(f):
-            skipped_files.append(f)
-            log_error(f"Skipped missing file: {f}")
-            continue
+    # Delete off the UI thread; sizes and mtimes come from the scan, and every
+    # move to the Recycle Bin is journaled so UNDO can put it back.
+    global scan_thread
+    records = {f: all_files[f] for f in files_to_delete if f in all_files}
+    for btn in (start_btn, resume_btn, delete_btn, undo_btn, link_btn):
+        btn.config(state="disabled")
+    progress_bus.reset()
+    progress_value.set(0)
+    scan_thread = threading.Thread(target=delete_thread, args=(files_to_delete, records, skipped_files), daemon=True)
+    scan_thread.start()
+    poll_progress()
 
-        try:
-            # Normalize path to Windows style
-            f_norm = os.path.normpath(os.path.abspath(f))
-            send2trash(f_norm)  # Try sending to Recycle Bin
-            all_files.discard(f)
-            deleted += 1
-            try:
-                total_size += os.path.getsize(f)
-            except Exception:
-                pass
-        except Exception as e:
-            log_error(f"send2trash failed, trying os.remove(): {f} | {e}")
-            try:
-                os.remove(f_norm)  # Fallback to permanent delete
-                all_files.discard(f)
-                deleted += 1
-                try:
-                    total_size += os.path.getsize(f)
-                except Exception:
-                    pass
-            except Exception as e2:
-                skipped_files.append(f)
-                failed_files.append((f, str(e2)))
-                log_error(f"Permanent delete failed: {f} | {e2}")
+def delete_thread(files, records, skipped_files):
+    result = DeleteResult()
+    try:
+        with DeletionJournal() as journal:
+            result = delete_files(files, True, records, journal, bus=progress_bus)
+        _save_metrics("delete", scan_options)
+    except Exception as e:
+        _worker_failed("Deletion", e)
+    finally:
+        app.after(0, finish_delete, result, skipped_files)
+
+def finish_delete(result, skipped_files):
+    start_btn.config(state="normal")
+    undo_btn.config(state="normal" if os.path.exists(default_journal_file) else "disabled")
+    resume_btn.config(state="normal" if os.path.exists(default_checkpoint_file) else "disabled")
+    stage_lbl.config(text="Stage: idle")
+    for f in result.deleted:
+        all_files.pop(f, None)
+    deleted = len(result.deleted)
+    total_size = result.reclaimed
+    skipped_files += result.skipped
+    failed_files = result.failed
 
     # Clear duplicates and refresh UI
     duplicates.clear()
+    group_digests.clear()
     refresh_tree()
     update_stats()
 
@@ -544,7 +963,7 @@ def delete_duplicates():
     if total_size:
         summary += f" ({format_size(total_size)})"
     if skipped_files:
-        summary += f"\n⚠ Skipped {len(skipped_files)} temporary, missing, or locked files"
+        summary += f"\n⚠ Skipped {len(skipped_files)} temporary, missing, or modified files"
     if failed_files:
         summary += f"\n❌ Failed to delete {len(failed_files)} files. See log for details."
 
@@ -556,12 +975,59 @@ def delete_duplicates():
 
     _show_message("Deletion Summary 🗑️", summary, "success")
 
+def undo_delete():
+    """Restore the files of the last deletion from the Recycle Bin / Trash via the journal."""
+    if scan_thread is not None and scan_thread.is_alive():
+        _show_message("Busy ⚠️", "Wait for the current scan or deletion to finish.", "info")
+        return
+    msg = "Files moved to the Recycle Bin by the last deletion will be put back where they were.\n\nProceed?"
+    if not _confirm_action("Undo Last Deletion ↩", "Confirm Undo", msg, "Yes, Restore"):
+        return
+    undo_btn.config(state="disabled")
+    stage_lbl.config(text="Stage: restoring files")
+
+    def worker():
+        with DeletionJournal() as journal:
+            result = undo_deletions(journal)
+        app.after(0, finish_undo, result)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def finish_undo(result):
+    undo_btn.config(state="normal")
+    stage_lbl.config(text="Stage: idle")
+    if result.batch is None:
+        _show_message("Nothing to Undo ⚠️", "No deletions have been recorded yet.", "info")
+        return
+    for f in result.restored:
+        rec = stat_record(f)
+        if rec:
+            all_files[f] = rec
+    update_stats()
+    restored = len(result.restored)
+    summary = f"✅ Restored {restored} file{'s' if restored != 1 else ''}"
+    if result.missing:
+        summary += f"\n⚠ {len(result.missing)} files could not be found in the Recycle Bin or were deleted permanently"
+        summary += "\n\nFirst missing files:\n" + "\n".join(os.path.basename(f) for f, _ in result.missing[:10])
+    if result.failed:
+        summary += f"\n❌ Failed to restore {len(result.failed)} files. See log for details."
+    _show_message("Undo Summary ↩", summary, "success")
+
 def _confirm_delete(file_count, total_size, keep_newest):
     """Custom confirmation dialog for deletion."""
+    msg = (
+        f"You are about to move {file_count} files ({format_size(total_size)}) to the Recycle Bin.\n\n"
+        f"Kept file per group: {'Newest' if keep_newest else 'First'}\n\n"
+        "You can restore them later with UNDO or from the Recycle Bin.\n\nProceed?"
+    )
+    return _confirm_action("Move Files to Recycle Bin ⚠️", "Confirm Deletion", msg, "Yes, Delete")
+
+def _confirm_action(window_title, heading, msg, confirm_text):
+    """Modal Yes/Cancel dialog; returns True when confirmed."""
     confirmed = []
 
     win = tb.Toplevel(app)
-    win.title("Move Files to Recycle Bin ⚠️")
+    win.title(window_title)
     win.geometry("450x270")
     win.resizable(False, False)
     win.grab_set()
@@ -575,12 +1041,7 @@ def _confirm_delete(file_count, total_size, keep_newest):
     frame = tb.Frame(win, padding=15)
     frame.pack(fill="both", expand=True)
 
-    tb.Label(frame, text="Confirm Deletion", font=("Segoe UI", 14, "bold")).pack(pady=(0, 10))
-    msg = (
-        f"You are about to move {file_count} files ({format_size(total_size)}) to the Recycle Bin.\n\n"
-        f"Kept file per group: {'Newest' if keep_newest else 'First'}\n\n"
-        "You can restore files later from the Recycle Bin.\n\nProceed?"
-    )
+    tb.Label(frame, text=heading, font=("Segoe UI", 14, "bold")).pack(pady=(0, 10))
     tb.Label(frame, text=msg, font=("Segoe UI", 11), wraplength=410, justify="left").pack(pady=(0, 15))
 
     def on_confirm():
@@ -592,34 +1053,131 @@ def _confirm_delete(file_count, total_size, keep_newest):
 
     btn_frame = tb.Frame(frame)
     btn_frame.pack(pady=5)
-    tb.Button(btn_frame, text="Yes, Delete", bootstyle="danger", width=12, command=on_confirm).pack(side="left", padx=10)
+    tb.Button(btn_frame, text=confirm_text, bootstyle="danger", width=12, command=on_confirm).pack(side="left", padx=10)
     tb.Button(btn_frame, text="Cancel", bootstyle="secondary-outline", width=12, command=on_cancel).pack(side="left", padx=10)
 
     win.wait_window()
     return bool(confirmed)
 
+# =================== LINK DUPLICATES ===================
+def link_duplicates_ui():
+    """Replace duplicates with hardlinks/reflinks to the kept file instead of deleting them."""
+    if not duplicates:
+        _show_message("No Duplicates ❌", "No duplicates found to link.", "info")
+        return
+
+    mode = link_mode_var.get()
+    keep_newest = keep_newest_var.get()
+    reclaimable = sum(reclaimable_bytes(group, all_files) for group in duplicates.values())
+    msg = (
+        f"Duplicates in {len(duplicates)} groups will be replaced with {mode}s to the kept file "
+        f"(up to {format_size(reclaimable)} reclaimed).\n\n"
+        f"Kept file per group: {'Newest' if keep_newest else 'First'}\n\n"
+        "All paths stay in place; this cannot be undone from the Recycle Bin.\n\nProceed?"
+    )
+    if not _confirm_action(f"Replace Duplicates with {mode.title()}s ⚠️", "Confirm Linking", msg, "Yes, Link"):
+        return
+
+    try:
+        result = link_duplicates(
+            duplicates.values(),
+            mode,
+            keep_newest,
+            all_files,
+            is_selected,
+        )
+    except (OSError, ValueError) as e:
+        _show_message("Link Error ❌", str(e), "error")
+        return
+
+    for f in result.linked:
+        rec = stat_record(f)  # the path now points at the kept file's inode (or a fresh clone)
+        if rec:
+            all_files[f] = rec
+
+    duplicates.clear()
+    refresh_tree()
+    update_stats()
+
+    linked = len(result.linked)
+    summary = f"✅ Replaced {linked} file{'s' if linked != 1 else ''} with {mode}s ({format_size(result.reclaimed)} reclaimed)"
+    if result.skipped:
+        summary += f"\n⚠ Skipped {len(result.skipped)} already linked, modified, missing or cross-device files"
+    if result.failed:
+        summary += f"\n❌ Failed to link {len(result.failed)} files. See log for details."
+        summary += "\n\nFirst failed files:\n" + "\n".join(os.path.basename(f) for f, _ in result.failed[:10])
+    _show_message("Link Summary 🔗", summary, "success")
+
 # =================== EXPORT ===================
-def export_json():
+REPORT_FILETYPES = [("JSON Lines", "*.jsonl"), ("CSV Files", "*.csv"), ("JSON Files", "*.json")]
+
+def export_report():
     if not duplicates:
         _show_message("No Data ⚠️", "No duplicates to export.", "info")
         return
 
-    path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
+    path = filedialog.asksaveasfilename(defaultextension=".jsonl", filetypes=REPORT_FILETYPES)
     if not path:
         return
 
+    algorithm = scan_options.algorithm if scan_mode == "exact" else scan_mode
+    try:
+        check_csv_algorithm(report_format(path), algorithm)
+    except ValueError as e:
+        _show_message("Export Error ❌", f"{e}.", "error")
+        return
+
     try:
-        data = {f"Group {i+1}": lst for i, lst in enumerate(duplicates.values())}
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({
-                "tool": "DupCleaner PRO",
-                "version": "1.0.0",
-                "timestamp": datetime.utcnow().isoformat(),
-                "duplicates": data
-            }, f, indent=2)
-        _show_message("Export Success ✅", f"JSON saved successfully at:\n{path}", "success")
+        keys = list(duplicates)
+        write_report([duplicates[k] for k in keys], path, all_files, algorithm, [group_digests.get(k) for k in keys])
+        _show_message("Export Success ✅", f"Report saved successfully at:\n{path}", "success")
     except Exception as e:
-        _show_message("Export Error ❌", f"Failed to save JSON:\n{e}", "error")
+        _show_message("Export Error ❌", f"Failed to save report:\n{e}", "error")
+
+def import_report():
+    """Load a saved report instead of rescanning; files changed since it was written are dropped."""
+    if scan_thread is not None and scan_thread.is_alive():
+        _show_message("Scan Running ⚠️", "Stop the current scan before importing a report.", "info")
+        return
+    path = filedialog.askopenfilename(filetypes=REPORT_FILETYPES)
+    if not path:
+        return
+    stop_watch()
+    stage_lbl.config(text="Stage: loading report")
+
+    def worker():
+        try:
+            result = load_report(path)
+        except Exception as e:
+            log_error(f"Report import failed: {path} | {e}")
+            app.after(0, _show_message, "Import Error ❌", f"Failed to load report:\n{e}", "error")
+            return
+        app.after(0, finish_import, result, read_report_header(path).get("algorithm"))
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def finish_import(result, algorithm):
+    global scan_mode
+    scan_mode = algorithm if algorithm in PERCEPTUAL_METHODS + (PARTIAL_MODE,) else "exact"
+    if scan_mode == "exact" and algorithm in available_algorithms():
+        scan_options.algorithm = algorithm
+    for rec in result.records.values():
+        all_files.add(rec)
+    duplicates.clear()
+    group_digests.clear()
+    group_reclaim.clear()
+    deselected_files.clear()
+    for group, digest in zip(result.groups, result.digests):
+        duplicates[id(group)] = group
+        group_digests[id(group)] = digest
+    _clear_preview()
+    refresh_tree()
+    update_stats()
+    # Files of a report without sizes and times may have changed since: review only, rescan to clean up.
+    delete_btn.config(state="normal" if duplicates and scan_mode != PARTIAL_MODE and result.verified else "disabled")
+    link_btn.config(state="normal" if duplicates and scan_mode == "exact" and result.verified else "disabled")
+    note = "" if result.verified else " (no file sizes or scan mode in report: rescan to delete)"
+    stage_lbl.config(text=f"Stage: loaded {len(duplicates)} groups from report{note}")
 
 
 def export_txt():
@@ -632,37 +1190,52 @@ def export_txt():
         return
 
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            for i, lst in enumerate(duplicates.values(), 1):
-                f.write(f"Group {i} ({len(lst)} files)\n")
-                for file in lst:
-                    f.write(f"{file}\n")
-                f.write("\n")
+        write_txt_report(duplicates.values(), path)
         _show_message("Export Success ✅", f"TXT saved successfully at:\n{path}", "success")
     except Exception as e:
         _show_message("Export Error ❌", f"Failed to save TXT:\n{e}", "error")
 
 # =================== SETTINGS ===================
 def load_settings():
-    global target_paths
     if os.path.exists(settings_file):
         try:
             with open(settings_file, "r") as f:
                 data = json.load(f)
-            target_paths = data.get("target_paths", [])
             keep_newest_var.set(data.get("keep_newest", False))
+            workers_var.set(data.get("workers", DEFAULT_WORKERS))
+            use_processes_var.set(data.get("use_processes", False))
+            verify_var.set(data.get("verify", "compare"))
+            exclude_var.set(data.get("exclude", ""))
+            watch_var.set(data.get("watch", False))
+            archives_var.set(data.get("archives", False))
+            if data.get("mode") in ("exact",) + PERCEPTUAL_METHODS + (PARTIAL_MODE,):
+                mode_var.set(data["mode"])
+            distance_var.set(data.get("distance", DEFAULT_DISTANCE))
+            if data.get("link_mode") in LINK_MODES:
+                link_mode_var.set(data["link_mode"])
+            if data.get("algorithm") in available_algorithms():
+                algorithm_var.set(data["algorithm"])
             target_listbox.delete(0, "end")
-            for path in target_paths:
-                target_listbox.insert("end", path)
-                if os.path.isfile(path):
-                    all_files.add(path)
-                else:
-                    threading.Thread(target=scan_folder_thread, args=(path,), daemon=True).start()
+            for path in data.get("target_paths", []):
+                add_target(path)
         except Exception as e:
             log_error(f"Load settings failed: {e}")
 
 def save_settings():
-    data = {"target_paths": target_paths, "keep_newest": keep_newest_var.get()}
+    data = {
+        "target_paths": target_paths,
+        "keep_newest": keep_newest_var.get(),
+        "workers": _safe_get(workers_var, DEFAULT_WORKERS),
+        "use_processes": use_processes_var.get(),
+        "verify": verify_var.get(),
+        "algorithm": algorithm_var.get(),
+        "exclude": exclude_var.get(),
+        "link_mode": link_mode_var.get(),
+        "watch": watch_var.get(),
+        "archives": archives_var.get(),
+        "mode": mode_var.get(),
+        "distance": _safe_get(distance_var, DEFAULT_DISTANCE),
+    }
     try:
         with open(settings_file, "w") as f:
             json.dump(data, f, indent=2)
@@ -670,6 +1243,9 @@ def save_settings():
         log_error(f"Save settings failed: {e}")
 
 def on_close():
+    stop_watch()
+    if thumb_loader is not None:
+        thumb_loader.close()
     save_settings()
     app.destroy()
 
@@ -728,7 +1304,10 @@ def show_about():
 # =================== BUTTONS ===================
 start_btn.config(command=scan_duplicates)
 stop_btn.config(command=stop_scan)
+resume_btn.config(command=resume_scan)
 delete_btn.config(command=delete_duplicates)
+undo_btn.config(command=undo_delete)
+link_btn.config(command=link_duplicates_ui)
 
 # =================== START ===================
 app.mainloop()
@@ -0,0 +1,33 @@
+"""
+DupCleaner PRO engine
+Headless scanning, hashing and deletion shared by the GUI and the CLI.
+"""
+
+__version__ = "1.0.0"
+APP_NAME = "DupCleaner PRO"
+
+from .archives import is_member, split_member
+from .cache import HashCache
+from .checkpoint import ScanCheckpoint, resume_scan
+from .chunking import PARTIAL_MODE, ChunkIndex, PartialResult, find_partial_duplicates, scan_partial
+from .deletion import DeleteResult, DeletionJournal, UndoResult, delete_files, undo_deletions
+from .dedupe import LINK_MODES, LinkResult, link_duplicates
+from .engine import (
+    DEFAULT_WORKERS,
+    VERIFY_MODES,
+    ScanOptions,
+    ScanResult,
+    find_duplicates,
+    group_by_size,
+    reclaimable_bytes,
+    scan,
+    select_for_deletion,
+)
+from .filetable import FileTable
+from .hashing import available_algorithms, file_hash
+from .metrics import ScanMetrics, profiled
+from .progress import ProgressBus, ProgressSnapshot
+from .shards import MergeResult, build_index, complete_index, merge_indexes
+from .similar import PERCEPTUAL_METHODS, find_similar_images, scan_similar
+from .utils import format_size, log_error
+from .walker import FileRecord, stat_record, walk
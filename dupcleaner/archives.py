@@ -0,0 +1,183 @@
+"""
+Archive members as virtual files.
+
+With ScanOptions.archives set, the walker lists the members of .zip and .tar
+(.tar.gz, .tgz, .tar.bz2, .tar.xz) files and reports each regular member as
+"archive.zip!/inner/path", with the size from the archive header and the
+archive's own device and modification time. Members are never opened one by
+one: candidates left after size grouping (and, between zip members, after
+comparing the CRC-32 stored in the zip headers, which costs no reads) are
+stream-hashed in one sequential pass per archive, so compressed tars are
+decompressed once and nothing is written to temporary files.
+
+Members can be reported but not deleted or linked; nested archives are not
+opened.
+"""
+
+import lzma
+import os
+import tarfile
+import time
+import zipfile
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from .hashing import stream_digests
+from .utils import log_error
+
+MEMBER_SEP = "!/"
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ARCHIVE_ERRORS = (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError, zlib.error, lzma.LZMAError)
+
+
+def is_archive(path):
+    return path.lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+
+def member_path(archive, name):
+    return f"{archive}{MEMBER_SEP}{name}"
+
+
+def split_member(path):
+    """(archive, member name) for an "archive!/name" path, or (None, None) for ordinary paths."""
+    i = path.find(MEMBER_SEP)
+    while i > 0:
+        if is_archive(path[:i]):
+            return path[:i], path[i + len(MEMBER_SEP):]
+        i = path.find(MEMBER_SEP, i + 1)
+    return None, None
+
+
+def is_member(path):
+    return MEMBER_SEP in path and split_member(path)[0] is not None
+
+
+@lru_cache(maxsize=16)
+def _listing(archive, mtime_ns):
+    """{member name: (size, CRC-32 or None)} for the regular, readable members of an archive.
+
+    Cached per (path, mtime), so looking up members of the same archive again
+    (stat_record(), the CRC filter) does not re-read its directory.
+    """
+    members = {}
+    try:
+        if archive.lower().endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir() and not info.flag_bits & 0x1:  # encrypted members cannot be read
+                        members[info.filename] = (info.file_size, info.CRC)
+        else:
+            with tarfile.open(archive, "r:*") as tf:
+                for info in tf:
+                    if info.isfile():
+                        members[info.name] = (info.size, None)
+    except ARCHIVE_ERRORS as e:
+        log_error(f"Cannot read archive: {archive} | {e}")
+    return members
+
+
+def list_members(archive, mtime_ns):
+    """[(member name, size)] of an archive, in archive order."""
+    return [(name, size) for name, (size, _) in _listing(archive, mtime_ns).items()]
+
+
+def member_info(path):
+    """(size, CRC-32 or None, archive os.stat_result) of an "archive!/name" path, or None if it is gone."""
+    archive, name = split_member(path)
+    if archive is None:
+        return None
+    try:
+        st = os.stat(archive)
+    except OSError:
+        return None
+    entry = _listing(archive, st.st_mtime_ns).get(name)
+    return None if entry is None else (*entry, st)
+
+
+# =================== CANDIDATE FILTER ===================
+def split_by_crc(groups):
+    """Split same-size groups made only of zip members by the CRC-32 in their headers.
+
+    Members whose CRC no other member shares cannot be duplicates and are
+    dropped without reading them. Groups holding any ordinary file or tar
+    member (no stored CRC) are returned unchanged.
+    """
+    out = []
+    for group in groups:
+        infos = [member_info(p) if is_member(p) else None for p in group]
+        if any(info is None or info[1] is None for info in infos):
+            out.append(group)
+            continue
+        by_crc = defaultdict(list)
+        for p, info in zip(group, infos):
+            by_crc[info[1]].append(p)
+        out.extend(g for g in by_crc.values() if len(g) > 1)
+    return out
+
+
+# =================== HASHING ===================
+def _hash_archive(archive, names, algorithm, stop_event=None):
+    """Digests of the named members of one archive, read in a single sequential pass.
+
+    Returns ({name: [quick, sample, full]}, bytes hashed, seconds).
+    """
+    start = time.perf_counter()
+    digests = {}
+    nbytes = 0
+    stopped = lambda: stop_event is not None and stop_event.is_set()
+    try:
+        if archive.lower().endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    if stopped():
+                        break
+                    if info.filename in names:
+                        try:
+                            with zf.open(info) as f:
+                                digests[info.filename] = stream_digests(f, info.file_size, algorithm)
+                            nbytes += info.file_size
+                        except ARCHIVE_ERRORS as e:  # e.g. a bad CRC, reported once the member is read
+                            log_error(f"Cannot read archive member: {member_path(archive, info.filename)} | {e}")
+        else:
+            with tarfile.open(archive, "r:*") as tf:
+                for info in tf:
+                    if stopped() or len(digests) == len(names):
+                        break
+                    if info.isfile() and info.name in names:
+                        f = tf.extractfile(info)
+                        digests[info.name] = stream_digests(f, info.size, algorithm)
+                        nbytes += info.size
+    except ARCHIVE_ERRORS as e:
+        log_error(f"Cannot read archive: {archive} | {e}")
+    return digests, nbytes, time.perf_counter() - start
+
+
+def hash_members(paths, algorithm, entries, workers=1, stop_event=None, metrics=None):
+    """Fill entries ({path: [quick, sample, full]}) for the archive members among paths.
+
+    Each archive is read once, front to back; archives are processed in
+    parallel. Members already holding a full digest in entries (a resumed scan)
+    are skipped. Unreadable members get no entry, so the scan treats them as
+    unreadable files. metrics, a ScanMetrics, records the "hash.archive" job.
+    """
+    by_archive = defaultdict(set)
+    for p in paths:
+        entry = entries.get(p)
+        if entry is not None and entry[2] is not None:
+            continue
+        archive, name = split_member(p)
+        if archive is not None:
+            by_archive[archive].add(name)
+    if not by_archive:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="archive") as pool:
+        futures = {pool.submit(_hash_archive, a, names, algorithm, stop_event): a for a, names in by_archive.items()}
+        for fut, archive in futures.items():
+            digests, nbytes, busy = fut.result()
+            for name, digest in digests.items():
+                entries[member_path(archive, name)] = digest
+            if metrics is not None:
+                metrics.add("hash.archive", files=len(digests), bytes=nbytes, busy=busy, tasks=1)
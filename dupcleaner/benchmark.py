@@ -0,0 +1,269 @@
+"""
+Reproducible benchmarks: a synthetic file-tree generator and per-stage timings.
+
+generate_tree() builds a tree from a seed, so two versions of DupCleaner can be
+measured on byte-identical input. Besides plain unique files and copies it plants
+the cases that make duplicate finders slow or wrong:
+
+- header traps: same-size files sharing their first 64 KB, which the quick hash
+  cannot separate;
+- prefix traps: same-size files over 1 MB that differ in a single byte between the
+  head and the first middle sample, which only full verification separates.
+
+run_benchmarks() times each pipeline stage on its own (walk, size grouping, quick
+hash, full hash, the whole scan, delete) and returns a JSON-ready dict;
+compare_results() lines two such dicts up so regressions stand out.
+"""
+
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from functools import partial
+
+from . import __version__
+from .deletion import delete_files
+from .engine import ScanOptions, find_duplicates, group_by_size, make_hash_executor, select_for_deletion
+from .filetable import FileTable
+from .hashing import QUICK_HASH_BYTES, SAMPLE_COUNT, SAMPLE_MIN_SIZE, TAIL_BYTES, file_hash
+from .walker import walk
+
+BENCH_STAGES = ("walk", "group", "quick", "full", "scan", "delete")
+FORMAT_VERSION = 1
+MARKER = ".dupcleaner-bench"  # marks a benchmark root, whose tree/ folder may be wiped
+
+
+@dataclass
+class TreeSpec:
+    files: int = 2000
+    files_per_dir: int = 50
+    depth: int = 3  # deepest folder nesting
+    size_median: int = 64 * 1024  # sizes are log-normal around this median
+    size_sigma: float = 1.5
+    size_max: int = 16 * 1024 * 1024
+    duplicate_ratio: float = 0.3  # fraction of files that copy an earlier file
+    header_traps: int = 20  # groups of files sharing only their first 64 KB
+    prefix_traps: int = 5  # groups of files over 1 MB differing in one unsampled byte
+    trap_group_size: int = 3
+    seed: int = 1
+
+
+# =================== GENERATOR ===================
+def _folders(rng, spec, root):
+    count = max(1, math.ceil(spec.files / max(1, spec.files_per_dir)))
+    folders = [(root, 0)]
+    while len(folders) < count:
+        parent, level = rng.choice([f for f in folders if f[1] < spec.depth] or folders[:1])
+        folders.append((os.path.join(parent, f"d{len(folders):05d}"), level + 1))
+    for folder, _ in folders:
+        os.makedirs(folder, exist_ok=True)
+    return [f for f, _ in folders]
+
+
+def generate_tree(root, spec=None):
+    """Write the tree described by spec below root; return a manifest dict.
+
+    The manifest counts what a correct scan must find: expected_groups and
+    expected_duplicates (files in those groups), plus files and bytes written.
+    """
+    spec = spec or TreeSpec()
+    rng = random.Random(spec.seed)
+    folders = _folders(rng, spec, root)
+    mu = math.log(max(1, spec.size_median))
+    manifest = {"files": 0, "bytes": 0, "expected_groups": 0, "expected_duplicates": 0}
+    copies = {}  # content index -> number of files holding it
+    contents = []
+
+    def write(data):
+        index = manifest["files"]
+        path = os.path.join(rng.choice(folders), f"f{index:07d}.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+        manifest["files"] += 1
+        manifest["bytes"] += len(data)
+
+    def unique(data):
+        copies[len(contents)] = 1
+        contents.append(data)
+        write(data)
+
+    trap_files = (spec.header_traps + spec.prefix_traps) * spec.trap_group_size
+    for _ in range(max(0, spec.files - trap_files)):
+        if contents and rng.random() < spec.duplicate_ratio:
+            index = rng.randrange(len(contents))
+            copies[index] += 1
+            write(contents[index])
+        else:
+            # At least 16 random bytes, so unrelated "unique" files never collide.
+            size = max(16, min(spec.size_max, int(rng.lognormvariate(mu, spec.size_sigma))))
+            unique(rng.randbytes(size))
+
+    for _ in range(spec.header_traps):
+        size = rng.randint(QUICK_HASH_BYTES + 1, max(QUICK_HASH_BYTES + 1, min(spec.size_max, 4 * SAMPLE_MIN_SIZE)))
+        head = rng.randbytes(QUICK_HASH_BYTES)
+        for _ in range(spec.trap_group_size):
+            unique(head + rng.randbytes(size - QUICK_HASH_BYTES))
+
+    for _ in range(spec.prefix_traps):
+        size = rng.randint(SAMPLE_MIN_SIZE + 1, max(SAMPLE_MIN_SIZE + 1, min(spec.size_max, 8 * SAMPLE_MIN_SIZE)))
+        base = bytearray(rng.randbytes(size))
+        # Halfway between the head and the first strided sample of hashing.sample_hash().
+        stride = (max(QUICK_HASH_BYTES, size - TAIL_BYTES) - QUICK_HASH_BYTES) // (SAMPLE_COUNT + 1)
+        offset = QUICK_HASH_BYTES + stride // 2
+        for i in range(spec.trap_group_size):
+            base[offset] = i
+            unique(bytes(base))
+
+    groups = [n for n in copies.values() if n > 1]
+    manifest["expected_groups"] = len(groups)
+    manifest["expected_duplicates"] = sum(groups)
+    return manifest
+
+
+# =================== STAGES ===================
+def _timed(fn, repeat, setup=None):
+    """Run fn() repeat times (after setup() each time, untimed); return (seconds list, last result)."""
+    times = []
+    result = None
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def _stage(times, files, nbytes, **extra):
+    best = min(times)
+    return {
+        "runs": [round(t, 6) for t in times],
+        "best": round(best, 6),
+        "median": round(statistics.median(times), 6),
+        "files": files,
+        "bytes": nbytes,
+        "files_per_sec": round(files / best, 1) if best else None,
+        "mb_per_sec": round(nbytes / best / 1e6, 2) if best else None,
+        **extra,
+    }
+
+
+def _hash_all(paths, options, quick):
+    fn = partial(file_hash, quick=quick, algorithm=options.algorithm)
+    executor = make_hash_executor(options.workers, options.use_processes, options.start_method)
+    with executor:
+        return list(executor.map(fn, paths, chunksize=64 if options.use_processes else 1))
+
+
+def run_benchmarks(root=None, spec=None, options=None, stages=BENCH_STAGES, repeat=3, keep=False):
+    """Generate a tree (in root/tree, or a temporary folder) and time each stage.
+
+    Runs are warm-cache: the generator has just written every file, so the
+    numbers measure CPU and syscall cost rather than the disk. Hashing stages run
+    without the hash cache. The delete stage removes the duplicates permanently
+    and rebuilds the tree before each run; it comes last for that reason.
+    Raises ValueError if root is a non-empty folder the benchmark did not create.
+    """
+    spec = spec or TreeSpec()
+    options = replace(options or ScanOptions(), cache_path=None)
+    own_root = root is None
+    root = root or tempfile.mkdtemp(prefix="dupcleaner-bench-")
+    marker = os.path.join(root, MARKER)
+    if os.path.isdir(root) and os.listdir(root) and not os.path.exists(marker):
+        raise ValueError(f"{root} is not empty and was not created by the benchmark; refusing to overwrite it")
+    os.makedirs(root, exist_ok=True)
+    open(marker, "a").close()
+    tree = os.path.join(root, "tree")
+    results = {
+        "format": FORMAT_VERSION,
+        "tool_version": __version__,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "spec": asdict(spec),
+        "options": {k: v for k, v in asdict(options).items() if k != "cache_path"},
+        "stages": {},
+    }
+
+    def regenerate():
+        shutil.rmtree(tree, ignore_errors=True)
+        os.makedirs(tree)
+        return generate_tree(tree, spec)
+
+    try:
+        start = time.perf_counter()
+        results["tree"] = regenerate()
+        results["tree"]["generate_seconds"] = round(time.perf_counter() - start, 3)
+        walk_files = lambda: FileTable(walk([tree], options.exclude, options.follow_symlinks, options.walk_workers))
+        records = walk_files()
+        nbytes = sum(records.sizes)
+        stages = [s for s in BENCH_STAGES if s in stages]
+
+        if "walk" in stages:
+            times, records = _timed(walk_files, repeat)
+            results["stages"]["walk"] = _stage(times, len(records), 0)
+
+        times, (groups, _, _) = _timed(lambda: group_by_size(records), repeat if "group" in stages else 1)
+        candidates = [p for g in groups for p in g]
+        candidate_bytes = sum(records[p].size for p in candidates)
+        if "group" in stages:
+            results["stages"]["group"] = _stage(times, len(records), 0, groups=len(groups))
+
+        if "quick" in stages:
+            times, _ = _timed(lambda: _hash_all(candidates, options, True), repeat)
+            quick_bytes = sum(min(records[p].size, QUICK_HASH_BYTES) for p in candidates)
+            results["stages"]["quick"] = _stage(times, len(candidates), quick_bytes)
+
+        if "full" in stages:
+            times, _ = _timed(lambda: _hash_all(candidates, options, False), repeat)
+            results["stages"]["full"] = _stage(times, len(candidates), candidate_bytes)
+
+        scan_result = None
+        if "scan" in stages or "delete" in stages:
+            times, scan_result = _timed(lambda: find_duplicates(walk_files(), options), repeat if "scan" in stages else 1)
+            if "scan" in stages:
+                found = sum(len(g) for g in scan_result.groups)
+                results["stages"]["scan"] = _stage(
+                    times, len(records), nbytes, groups=len(scan_result.groups), duplicates=found,
+                    correct=(len(scan_result.groups), found) == (results["tree"]["expected_groups"],
+                                                                  results["tree"]["expected_duplicates"]))
+
+        if "delete" in stages:
+            to_delete, _ = select_for_deletion(scan_result.groups, records=scan_result.records)
+            pending = []
+
+            def setup():
+                regenerate()
+                # Rebuilt files have new mtimes; refresh the records the delete stage checks against.
+                pending[:] = [FileTable(walk([tree]))]
+
+            times, deleted = _timed(lambda: delete_files(to_delete, False, pending[0]), repeat, setup)
+            results["stages"]["delete"] = _stage(times, len(deleted.deleted), 0, reclaimed=deleted.reclaimed)
+    finally:
+        if own_root and not keep:
+            shutil.rmtree(root, ignore_errors=True)
+    results["tree_path"] = tree if keep or not own_root else None
+    return results
+
+
+def compare_results(old, new, tolerance=0.10):
+    """[(stage, old best, new best, ratio, verdict)] for stages present in both result dicts.
+
+    ratio is new/old time; verdict is "slower" or "faster" beyond tolerance, else "same".
+    """
+    rows = []
+    for stage in BENCH_STAGES:
+        a, b = old.get("stages", {}).get(stage), new.get("stages", {}).get(stage)
+        if not a or not b or not a["best"]:
+            continue
+        ratio = b["best"] / a["best"]
+        verdict = "slower" if ratio > 1 + tolerance else "faster" if ratio < 1 - tolerance else "same"
+        rows.append((stage, a["best"], b["best"], ratio, verdict))
+    return rows
@@ -0,0 +1,99 @@
+"""Persistent on-disk digest cache so rescans skip unchanged files."""
+
+import os
+import sqlite3
+
+from .utils import log_error
+
+
+class HashCache:
+    """Persistent quick/sample/full digests keyed by (device, inode, algorithm), validated by size and mtime."""
+
+    SCHEMA_VERSION = 4
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path, algorithm="md5"):
+        self.algorithm = algorithm
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS hashes")
+            self.conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "dev INTEGER, ino INTEGER, algo TEXT, size INTEGER, mtime_ns INTEGER, "
+            "path TEXT, quick TEXT, sample TEXT, full TEXT, PRIMARY KEY (dev, ino, algo))"
+        )
+        # Paths are stored absolute, so eviction can select a scanned root's files by range.
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hashes_path ON hashes (path)")
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cacheable(rec):
+        # Filesystems without stable inode numbers report 0; never trust those keys.
+        return rec.ino != 0
+
+    def get(self, rec):
+        """Return (quick, sample, full) digests for a FileRecord; None for stale/unknown ones."""
+        if not self._cacheable(rec):
+            return None, None, None
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, quick, sample, full FROM hashes WHERE dev=? AND ino=? AND algo=?",
+            (rec.dev, rec.ino, self.algorithm)
+        ).fetchone()
+        if row is None or row[0] != rec.size or row[1] != rec.mtime_ns:
+            self.misses += 1
+            return None, None, None
+        self.hits += 1
+        return row[2], row[3], row[4]
+
+    def put(self, path, rec, quick, sample, full):
+        if not self._cacheable(rec):
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (rec.dev, rec.ino, self.algorithm, rec.size, rec.mtime_ns, os.path.abspath(path), quick, sample, full)
+        )
+        self.pending += 1
+        if self.pending >= self.COMMIT_EVERY:
+            self.commit()
+
+    def evict_missing(self, roots, seen):
+        """Drop entries under the scanned roots whose (dev, ino) was not seen in this scan.
+
+        Only the rows under each root are read, through the path index: the
+        root itself, and paths from "root/" up to (not including) "root0",
+        the next string after the separator.
+        """
+        stale = set()
+        for root in {os.path.abspath(r) for r in roots}:
+            prefix = os.path.join(root, "")
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            rows = self.conn.execute(
+                "SELECT dev, ino FROM hashes WHERE path = ? OR (path >= ? AND path < ?)", (root, prefix, upper))
+            stale.update(key for key in rows if key not in seen)
+        self.conn.executemany("DELETE FROM hashes WHERE dev=? AND ino=?", stale)
+        self.commit()
+        return len(stale)
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        try:
+            self.commit()
+        finally:
+            self.conn.close()
+
+
+def open_hash_cache(path, algorithm="md5"):
+    """Open the cache at path, or return None (and log why) if it cannot be used."""
+    try:
+        return HashCache(path, algorithm)
+    except Exception as e:
+        log_error(f"Hash cache unavailable, hashing without it: {e}")
+        return None
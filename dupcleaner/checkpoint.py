@@ -0,0 +1,157 @@
+"""
+Checkpoints so an interrupted or crashed scan can be resumed.
+
+A checkpoint holds what a scan has learned so far: its targets and options, the
+walked FileTable, the folders still to be listed, the stage reached and every
+quick/sampled/full digest finished. It is rewritten atomically every
+CHECKPOINT_INTERVAL seconds and when the scan is stopped, and removed when the
+scan completes. Size groups are not stored: they are rebuilt from the walked
+table by one sort, which is much cheaper than writing them out.
+"""
+
+import dataclasses
+import os
+import pickle
+import time
+
+from .engine import ScanOptions, scan
+from .filetable import FileTable
+from .progress import STAGE_HASH, STAGE_WALK
+from .utils import default_checkpoint_file, log_error
+from .walker import WalkState, stat_record
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 30.0  # seconds between periodic saves
+
+# Everything else in a checkpoint is plain data built from pickle opcodes.
+_ALLOWED_GLOBALS = {
+    ("dupcleaner.filetable", "FileTable"),
+    ("array", "array"),
+    ("array", "_array_reconstructor"),
+    ("builtins", "bytearray"),
+    ("builtins", "set"),
+}
+
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) not in _ALLOWED_GLOBALS:
+            raise pickle.UnpicklingError(f"Unexpected object in checkpoint: {module}.{name}")
+        return super().find_class(module, name)
+
+
+class ScanCheckpoint:
+    """Resumable state of one scan, saved to path.
+
+    Pass it to scan() or find_duplicates(); both fill it in as they go.
+    """
+
+    def __init__(self, path=default_checkpoint_file, paths=(), options=None, records=None,
+                 interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.paths = list(paths)
+        self.options = options or ScanOptions()
+        self.records = records if records is not None else FileTable()
+        self.walk_state = WalkState()
+        self.stage = STAGE_WALK
+        self.entries = {}  # path -> [quick, sample, full] digests finished so far
+        self.interval = interval
+        self.saved_at = time.monotonic()
+
+    # ---------- engine hooks ----------
+    def tick(self):
+        """Save if the last save is more than interval seconds old."""
+        if time.monotonic() - self.saved_at >= self.interval:
+            self.save()
+
+    def walked(self):
+        self.stage = STAGE_HASH
+        self.walk_state = WalkState()
+        self.save()
+
+    def finish(self, stopped):
+        if stopped:
+            self.save()
+        else:
+            self.discard()
+
+    # ---------- disk ----------
+    def save(self):
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "paths": self.paths,
+            "options": dataclasses.asdict(self.options),
+            "stage": self.stage,
+            "records": self.records,
+            "walk_pending": self.walk_state.pending,
+            "walk_seen": self.walk_state.seen,
+            "entries": self.entries,
+        }
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log_error(f"Checkpoint save failed: {self.path} | {e}")
+        self.saved_at = time.monotonic()
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log_error(f"Checkpoint removal failed: {self.path} | {e}")
+
+    @classmethod
+    def load(cls, path=default_checkpoint_file, interval=CHECKPOINT_INTERVAL):
+        """The checkpoint saved at path, or None if there is none.
+
+        Raises ValueError for a damaged checkpoint or one from another version.
+        """
+        try:
+            with open(path, "rb") as f:
+                state = _CheckpointUnpickler(f).load()
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, TypeError) as e:
+            raise ValueError(f"Unreadable checkpoint {path}: {e}") from None
+        if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint {path} was written by an incompatible version")
+        fields = {f.name for f in dataclasses.fields(ScanOptions)}
+        options = ScanOptions(**{k: v for k, v in state["options"].items() if k in fields})
+        checkpoint = cls(path, state["paths"], options, state["records"], interval)
+        checkpoint.stage = state["stage"]
+        checkpoint.walk_state = WalkState(state["walk_pending"], state["walk_seen"])
+        checkpoint.entries = state["entries"]
+        return checkpoint
+
+    def revalidate(self):
+        """Forget digests of files modified or removed since the checkpoint; returns how many."""
+        stale = 0
+        for path in list(self.entries):
+            rec = stat_record(path)
+            old = self.records.get(path)
+            if rec is None or old is None or (rec.size, rec.mtime_ns) != (old.size, old.mtime_ns):
+                del self.entries[path]
+                if rec is None:
+                    self.records.pop(path, None)
+                else:
+                    self.records.add(rec)
+                stale += 1
+        return stale
+
+
+def resume_scan(path=default_checkpoint_file, stop_event=None, bus=None, on_group=None):
+    """Continue the scan checkpointed at path with its original targets and options.
+
+    Raises FileNotFoundError if there is no checkpoint, ValueError if it cannot be read.
+    """
+    checkpoint = ScanCheckpoint.load(path)
+    if checkpoint is None:
+        raise FileNotFoundError(f"No checkpoint to resume at {path}")
+    stale = checkpoint.revalidate()
+    if stale:
+        log_error(f"Checkpoint {path}: {stale} files changed since it was saved and will be hashed again")
+    return scan(checkpoint.paths, checkpoint.options, stop_event, bus, on_group, checkpoint)
@@ -0,0 +1,358 @@
+"""
+Partial duplicates: content-defined chunking and a disk-backed chunk index.
+
+VM images, database dumps and appended logs share most of their bytes without
+ever matching as whole files. Each large file is cut into chunks at
+content-defined boundaries (FastCDC: a gear rolling hash with normalized chunk
+sizes), so an insertion or an appended tail only changes the chunks around it.
+Chunk digests go into a SQLite index on disk, which is then read back sorted by
+digest to score file pairs by shared bytes, group files that mostly overlap,
+and work out what block-level deduplication would reclaim. Memory stays bounded
+by the batch sizes and SQLite's page cache, however large the input.
+
+The optional fastcdc package (pip install fastcdc) finds boundaries in compiled
+code; without it a pure-Python chunker is used, which is much slower.
+"""
+
+import hashlib
+import mmap
+import os
+import queue
+import sqlite3
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .archives import is_member
+from .engine import ScanOptions, inode_key
+from .filetable import FileTable
+from .hashing import new_hasher
+from .progress import STAGE_DONE, STAGE_HASH, STAGE_WALK, ProgressBus
+from .utils import log_error
+from .walker import stat_record, walk
+
+try:
+    from fastcdc.fastcdc_cy import fastcdc_cy
+except ImportError:
+    fastcdc_cy = None
+
+PARTIAL_MODE = "partial"  # mode name in the GUI and in report headers
+CDC_AVG_SIZE = 64 * 1024
+PARTIAL_MIN_SIZE = 1024 * 1024  # smaller files are left to the exact scan
+DEFAULT_MIN_RATIO = 0.5  # shared bytes over the smaller file's size
+MAX_CHUNK_FANOUT = 64  # chunks in more files (zero pages, common headers) are not used to pair files
+MAX_PAIRS = 1_000_000  # file pairs scored at most; pairs first seen after that are dropped and counted
+DIGEST_BYTES = 16
+INSERT_BATCH = 4096
+INDEX_CACHE_KB = 64 * 1024
+
+# Gear table: one pseudo-random 32-bit value per byte value, fixed so cut points are reproducible.
+_GEAR = [int.from_bytes(hashlib.md5(bytes([i])).digest()[:4], "little") for i in range(256)]
+
+
+# =================== CHUNKING ===================
+def _cut_point(data, start, end, min_size, avg_size, max_size, mask_s, mask_l, gear=_GEAR):
+    """End offset of the chunk starting at start (FastCDC normalized chunking)."""
+    remaining = end - start
+    if remaining <= min_size:
+        return end
+    center = start + min(avg_size, remaining)
+    limit = start + min(max_size, remaining)
+    h = 0
+    i = start + min_size
+    # A stricter mask before the average size and a looser one after it pull sizes towards the average.
+    while i < center:
+        h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+        if not h & mask_s:
+            return i + 1
+        i += 1
+    while i < limit:
+        h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+        if not h & mask_l:
+            return i + 1
+        i += 1
+    return limit
+
+
+def chunk_spans(data, avg_size=CDC_AVG_SIZE):
+    """Yield (offset, length) of the content-defined chunks of a bytes-like object."""
+    min_size, max_size = avg_size // 4, avg_size * 4
+    if fastcdc_cy is not None:
+        for chunk in fastcdc_cy(data, min_size, avg_size, max_size):
+            yield chunk.offset, chunk.length
+        return
+    bits = avg_size.bit_length() - 1
+    mask_s, mask_l = (1 << (bits + 1)) - 1, (1 << (bits - 1)) - 1
+    offset, end = 0, len(data)
+    while offset < end:
+        cut = _cut_point(data, offset, end, min_size, avg_size, max_size, mask_s, mask_l)
+        yield offset, cut - offset
+        offset = cut
+
+
+def file_chunks(path, algorithm, avg_size=CDC_AVG_SIZE):
+    """Yield (digest, length) for each content-defined chunk of a file."""
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                for offset, length in chunk_spans(view, avg_size):
+                    hasher = new_hasher(algorithm)
+                    hasher.update(view[offset:offset + length])
+                    yield hasher.digest()[:DIGEST_BYTES], length
+            finally:
+                view.release()
+
+
+# =================== INDEX ===================
+class ChunkIndex:
+    """SQLite table of (digest, file, length) rows, written in batches and read back by digest.
+
+    With path None the index lives in a temporary file removed by close().
+    """
+
+    def __init__(self, path=None):
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="dupcleaner-chunks-", suffix=".db")
+            os.close(fd)
+        for stale in (path, path + "-journal"):
+            if os.path.exists(stale):
+                os.remove(stale)  # an index describes one run
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute(f"PRAGMA cache_size=-{INDEX_CACHE_KB}")
+        self.conn.execute("PRAGMA temp_store=FILE")  # sorts for the index spill to disk too
+        self.conn.execute("CREATE TABLE chunks (digest BLOB, file INTEGER, length INTEGER)")
+
+    def add(self, rows):
+        self.conn.executemany("INSERT INTO chunks VALUES (?, ?, ?)", rows)
+
+    def finish(self):
+        self.conn.execute("CREATE INDEX chunks_digest ON chunks (digest, file)")
+        self.conn.commit()
+
+    def totals(self):
+        """(chunks, distinct chunks, bytes, bytes left after block-level dedupe)."""
+        count, nbytes = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+        unique, unique_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM (SELECT MIN(length) AS length FROM chunks GROUP BY digest)"
+        ).fetchone()
+        return count, unique, nbytes, unique_bytes
+
+    def by_digest(self):
+        """Yield (length, [(file, occurrences), ...]) per digest held by more than one chunk."""
+        rows = self.conn.execute(
+            "SELECT digest, file, COUNT(*), MIN(length) FROM chunks GROUP BY digest, file ORDER BY digest, file")
+        current, length, members = None, 0, []
+        for digest, fid, occurrences, size in rows:
+            if digest != current:
+                if len(members) > 1 or (members and members[0][1] > 1):
+                    yield length, members
+                current, length, members = digest, size, []
+            members.append((fid, occurrences))
+        if len(members) > 1 or (members and members[0][1] > 1):
+            yield length, members
+
+    def close(self):
+        self.conn.close()
+        if self.temporary:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+# =================== ANALYSIS ===================
+@dataclass
+class PartialMatch:
+    a: str
+    b: str
+    shared: int  # bytes of distinct chunks found in both files
+    ratio: float  # shared over the smaller file's size
+
+
+@dataclass
+class PartialGroup:
+    paths: list
+    size: int  # total size of the files
+    reclaimable: int  # bytes block-level dedupe would free within the group
+    ratio: float  # best pair ratio in the group
+
+
+@dataclass
+class PartialResult:
+    pairs: list = field(default_factory=list)  # PartialMatch, best ratio first
+    groups: list = field(default_factory=list)  # PartialGroup, most reclaimable first
+    records: FileTable = field(default_factory=FileTable)
+    files: int = 0  # files chunked
+    bytes_scanned: int = 0
+    chunks: int = 0
+    unique_chunks: int = 0
+    reclaimable: int = 0  # over all chunked files, including repeats within a file
+    chunker: str = ""
+    common_chunks: int = 0  # distinct chunks in more than MAX_CHUNK_FANOUT files, not used to pair files
+    dropped_pairs: int = 0  # chunk overlaps of file pairs not scored because MAX_PAIRS was reached
+    stopped: bool = False
+
+
+def _index_files(paths, records, index, options, avg_size, stop_event, bus):
+    """Chunk files on a thread pool; batches of rows reach index on the calling thread."""
+    stopped = lambda: stop_event is not None and stop_event.is_set()
+    out = queue.Queue(maxsize=options.workers * 4)  # bounds the rows in flight
+
+    def chunk_file(fid, path):
+        start = time.perf_counter()
+        batch = []
+        try:
+            for digest, length in file_chunks(path, options.algorithm, avg_size):
+                if stopped():
+                    break
+                batch.append((digest, fid, length))
+                if len(batch) >= INSERT_BATCH:
+                    out.put((None, batch))
+                    batch = []
+        except Exception as e:
+            log_error(f"Chunking failed: {path} | {e}")
+        finally:
+            out.put((None, batch))
+            out.put((path, time.perf_counter() - start))
+
+    with ThreadPoolExecutor(max_workers=options.workers, thread_name_prefix="chunk") as pool:
+        for fid, path in enumerate(paths):
+            pool.submit(chunk_file, fid, path)
+        done = 0
+        while done < len(paths):
+            path, payload = out.get()
+            if path is None:
+                if payload:
+                    index.add(payload)
+                continue
+            done += 1
+            size = records[path].size
+            bus.add(files_done=1, bytes_done=size)
+            bus.metrics.add("hash.chunk", files=1, bytes=size, busy=payload, tasks=1)
+    index.finish()
+
+
+def find_partial_duplicates(files, options=None, min_size=PARTIAL_MIN_SIZE, min_ratio=DEFAULT_MIN_RATIO,
+                            avg_size=CDC_AVG_SIZE, index_path=None, stop_event=None, bus=None):
+    """Chunk files of at least min_size and return a PartialResult.
+
+    files are FileRecords or paths. Pairs sharing at least min_ratio of the
+    smaller file are reported and joined into groups. The chunk index is
+    written to index_path (a temporary file by default) and removed afterwards
+    only if it was temporary.
+    """
+    options = options or ScanOptions()
+    new_hasher(options.algorithm)
+    if avg_size < 256 or avg_size & (avg_size - 1):
+        raise ValueError(f"Average chunk size must be a power of two of at least 256 bytes, not {avg_size}")
+    bus = bus or ProgressBus()
+    stopped = lambda: stop_event is not None and stop_event.is_set()
+    result = PartialResult(chunker="fastcdc" if fastcdc_cy is not None else "python")
+
+    bus.set_stage(STAGE_WALK)
+    units = set()
+    paths = []
+    for item in files:
+        if stopped():
+            break
+        rec = stat_record(item) if isinstance(item, str) else item
+        if rec is None or rec.path in result.records or is_member(rec.path):  # members are compared whole only
+            continue
+        result.records.add(rec)
+        bus.add(files_seen=1)
+        key = inode_key(rec)
+        if rec.size >= min_size and key not in units:  # hardlinks share every block already
+            units.add(key)
+            paths.append(rec.path)
+    bus.metrics.add(STAGE_WALK, files=len(result.records))
+
+    bus.set_stage(STAGE_HASH)
+    bus.metrics.set_workers(STAGE_HASH, options.workers)
+    sizes = [result.records[p].size for p in paths]
+    bus.set_totals(len(paths), sum(sizes))
+    index = ChunkIndex(index_path)
+    try:
+        if not stopped():
+            _index_files(paths, result.records, index, options, avg_size, stop_event, bus)
+        result.stopped = stopped()
+        result.files, result.bytes_scanned = len(paths), sum(sizes)
+        result.chunks, result.unique_chunks, nbytes, unique_bytes = index.totals()
+        result.reclaimable = nbytes - unique_bytes
+
+        # Pairs grow with the square of the files sharing a chunk: chunks in too many files are
+        # skipped and, past MAX_PAIRS, only pairs already being scored keep adding up.
+        shared = defaultdict(int)  # (file a, file b) -> bytes of distinct chunks in both
+        for length, members in index.by_digest():
+            if len(members) > MAX_CHUNK_FANOUT:
+                result.common_chunks += 1
+            elif len(members) > 1:
+                fids = [fid for fid, _ in members]
+                for i, a in enumerate(fids):
+                    for b in fids[i + 1:]:
+                        if (a, b) in shared or len(shared) < MAX_PAIRS:
+                            shared[a, b] += length
+                        else:
+                            result.dropped_pairs += 1
+        if result.dropped_pairs:
+            log_error(f"Partial scan: more than {MAX_PAIRS} file pairs share chunks; "
+                      f"{result.dropped_pairs} overlaps of further pairs were not scored")
+
+        parent = {}  # union-find over file ids of matching pairs
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = x = parent[parent[x]]
+            return x
+
+        matches = []
+        for (a, b), nbytes in shared.items():
+            ratio = nbytes / max(1, min(sizes[a], sizes[b]))
+            if ratio >= min_ratio:
+                matches.append((a, ratio))
+                result.pairs.append(PartialMatch(paths[a], paths[b], nbytes, round(ratio, 4)))
+                parent.setdefault(a, a)
+                parent.setdefault(b, b)
+                parent[find(a)] = find(b)
+        result.pairs.sort(key=lambda m: (m.ratio, m.shared), reverse=True)
+
+        group_of = {fid: find(fid) for fid in parent}
+        best = defaultdict(float)
+        for a, ratio in matches:
+            best[group_of[a]] = max(best[group_of[a]], ratio)
+        reclaim = defaultdict(int)
+        for length, members in index.by_digest():
+            counts = defaultdict(int)
+            for fid, occurrences in members:
+                if fid in group_of:
+                    counts[group_of[fid]] += occurrences
+            for root, occurrences in counts.items():
+                reclaim[root] += (occurrences - 1) * length
+        members_of = defaultdict(list)
+        for fid in sorted(group_of):
+            members_of[group_of[fid]].append(fid)
+        for root, fids in members_of.items():
+            result.groups.append(PartialGroup([paths[f] for f in fids], sum(sizes[f] for f in fids),
+                                              reclaim[root], round(best[root], 4)))
+            bus.add(groups=1)
+        result.groups.sort(key=lambda g: g.reclaimable, reverse=True)
+    finally:
+        index.close()
+    bus.set_stage(STAGE_DONE)
+    return result
+
+
+def scan_partial(paths, options=None, min_size=PARTIAL_MIN_SIZE, min_ratio=DEFAULT_MIN_RATIO,
+                 avg_size=CDC_AVG_SIZE, index_path=None, stop_event=None, bus=None):
+    """Walk the given files/folders and find partially duplicated large files."""
+    options = options or ScanOptions()
+    files = walk(paths, options.exclude, options.follow_symlinks, options.walk_workers, stop_event)
+    return find_partial_duplicates(files, options, min_size, min_ratio, avg_size, index_path, stop_event, bus)
@@ -0,0 +1,642 @@
+"""
+Command line interface (never imports tkinter):
+
+    python -m dupcleaner scan PATH... [--jsonl out.jsonl] [--csv out.csv] [--json out.json] [--txt out.txt]
+    python -m dupcleaner scan --resume [--checkpoint FILE]
+    python -m dupcleaner scan PATH... --archives
+    python -m dupcleaner scan PATH... --stats [--metrics metrics.json] [--profile scan.prof] [--trace-memory]
+    python -m dupcleaner watch PATH... [--json out.json]
+    python -m dupcleaner index PATH... --output node.jsonl [--node NAME]
+    python -m dupcleaner index --complete needs/node.txt --output node.jsonl
+    python -m dupcleaner merge INDEX... [--json merged.json] [--needs DIR]
+    python -m dupcleaner partial PATH... [--min-ratio R] [--index chunks.db] [--json out.json]
+    python -m dupcleaner load REPORT [--delete | --link MODE]
+    python -m dupcleaner undo [--batch ID]
+    python -m dupcleaner bench [--files N] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import asdict
+
+from . import APP_NAME, __version__
+from .benchmark import BENCH_STAGES, TreeSpec, compare_results, run_benchmarks
+from .checkpoint import ScanCheckpoint
+from .chunking import CDC_AVG_SIZE, DEFAULT_MIN_RATIO, PARTIAL_MIN_SIZE, PARTIAL_MODE, scan_partial
+from .dedupe import LINK_MODES, link_duplicates
+from .deletion import DeletionJournal, delete_files, undo_deletions
+from .engine import DEFAULT_WORKERS, VERIFY_MODES, ScanOptions, scan, select_for_deletion
+from .hashing import DEFAULT_ALGORITHM, available_algorithms
+from .metrics import TABLE_COLUMNS, metrics_rows, profiled
+from .progress import STAGE_WALK, ProgressBus
+from .report import (ReportWriter, load_report, read_report_header, write_json_report, write_partial_report,
+                     write_report, write_txt_report)
+from .scheduler import DEVICE_KINDS
+from .shards import build_index, complete_index, default_node, merge_indexes, read_needs, write_needs
+from .similar import DEFAULT_DISTANCE, PERCEPTUAL_METHODS, scan_similar
+from .utils import default_cache_file, default_checkpoint_file, default_journal_file, format_size
+from .watch import DEFAULT_INTERVAL, watch
+
+
+def _print_progress(bus, stream, done_event, interval=0.5):
+    """Poll the progress bus and redraw one status line until done_event is set."""
+    while not done_event.wait(interval):
+        snap = bus.snapshot()
+        if snap.stage == STAGE_WALK:
+            line = f"Walking: {snap.files_seen} files"
+        else:
+            eta = f"{snap.eta:.0f}s" if snap.eta is not None else "--"
+            line = (f"Hashing {snap.fraction:6.1%} | {snap.files_done}/{snap.files_total} files | "
+                    f"{format_size(snap.bytes_per_sec)}/s | ETA {eta} | cache hits {snap.cache_hits}")
+        stream.write(f"\r{line:<100}")
+        stream.flush()
+    stream.write("\r" + " " * 100 + "\r")
+    stream.flush()
+
+
+def _scan_options(args):
+    return ScanOptions(
+        workers=args.workers,
+        use_processes=args.processes,
+        cache_path=None if args.no_cache else args.cache,
+        verify=args.verify,
+        algorithm=args.algorithm,
+        exclude=tuple(args.exclude),
+        follow_symlinks=args.follow_symlinks,
+        device_depth=tuple(args.device_depth),
+        archives=getattr(args, "archives", False),
+        group_memory=args.group_memory * 1024 * 1024 if args.group_memory else None,
+        spill_dir=args.spill_dir,
+    )
+
+
+def _device_depth(text):
+    """argparse type for --device-depth KIND=N."""
+    kind, _, depth = text.partition("=")
+    if kind not in DEVICE_KINDS or not depth.isdigit() or int(depth) < 1:
+        raise argparse.ArgumentTypeError(f"expected KIND=N with KIND one of {', '.join(DEVICE_KINDS)} and N >= 1")
+    return kind, int(depth)
+
+
+def _run_scan(args, options, similar=None, on_group=None, checkpoint=None, bus=None):
+    """Scan (or, with similar set to a perceptual hash method, find near-duplicate
+    images; for the partial command, partially duplicated files) with a
+    progress line on stderr; None if interrupted.
+
+    The first Ctrl+C stops the scan cleanly, so a checkpoint is saved in a
+    consistent state; a second one aborts at once. --profile/--trace-memory
+    wrap the scan in metrics.profiled().
+    """
+    stop_event = threading.Event()
+    bus = bus or ProgressBus()
+    done_event = threading.Event()
+    printer = threading.Thread(target=_print_progress, args=(bus, sys.stderr, done_event), daemon=True)
+    if not args.quiet:
+        printer.start()
+
+    def on_interrupt(signum, frame):
+        stop_event.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    previous = signal.signal(signal.SIGINT, on_interrupt)
+    try:
+        with profiled(args.profile, args.trace_memory, bus.metrics):
+            if args.command == "index":
+                result = build_index(args.paths, args.output, options, args.node, stop_event, bus)
+            elif args.command == "partial":
+                result = scan_partial(args.paths, options, args.min_size, args.min_ratio, args.chunk_size, args.index,
+                                      stop_event, bus)
+            elif similar:
+                result = scan_similar(args.paths, similar, args.distance, options, stop_event, bus, on_group)
+            elif checkpoint is not None:
+                result = scan(checkpoint.paths, options, stop_event, bus, on_group, checkpoint)
+            else:
+                result = scan(args.paths, options, stop_event, bus, on_group)
+    except KeyboardInterrupt:
+        result = None
+    finally:
+        signal.signal(signal.SIGINT, previous)
+        done_event.set()
+        if printer.is_alive():
+            printer.join()
+    if result is None or result.stopped:
+        print("\nScan interrupted.", file=sys.stderr)
+        if checkpoint is not None and result is not None:
+            print(f"Progress saved to {checkpoint.path}; continue with: scan --resume --checkpoint {checkpoint.path}",
+                  file=sys.stderr)
+        return None
+    return result
+
+
+def _write_reports(args, groups, algorithm, records=None, digests=None, streamed=False):
+    """Write the requested reports; streamed JSON Lines/CSV reports were written during the scan."""
+    if args.json:
+        write_json_report(groups, args.json, algorithm)
+    if args.txt:
+        write_txt_report(groups, args.txt)
+    if not streamed:
+        for path in filter(None, (args.jsonl, args.csv)):
+            write_report(groups, path, records or {}, algorithm, digests)
+
+
+def _open_writers(args, algorithm):
+    """Streaming writers for --jsonl/--csv and an on_group callback feeding them all."""
+    writers = [ReportWriter(path, algorithm, fmt) for path, fmt in ((args.jsonl, "jsonl"), (args.csv, "csv")) if path]
+
+    def on_group(group, digest):
+        for writer in writers:
+            writer.write_group(group, digest)
+
+    return writers, (on_group if writers else None)
+
+
+def _print_summary(args, result):
+    if not args.quiet:
+        print(f"Duplicate groups: {len(result.groups)}")
+        print(f"Duplicate files: {sum(len(g) for g in result.groups)}")
+        print(f"Reclaimable: {format_size(result.total_reclaimable)}")
+
+
+def _report_metrics(args, bus, options, paths):
+    """Print the per-stage table (--stats) and write the metrics file (--metrics)."""
+    data = bus.metrics.as_dict()
+    if args.stats:
+        rows = [TABLE_COLUMNS, *metrics_rows(data)]
+        widths = [max(len(row[i]) for row in rows) for i in range(len(TABLE_COLUMNS))]
+        for row in rows:
+            print("  ".join(cell.ljust(w) if i == 0 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths))),
+                  file=sys.stderr)
+        memory = data.get("memory")
+        if memory:
+            print(f"Peak traced memory: {format_size(memory['peak_bytes'])}", file=sys.stderr)
+            for site in memory["top"]:
+                print(f"  {format_size(site['bytes']):>10}  {site['site']}", file=sys.stderr)
+    if args.metrics:
+        try:
+            bus.metrics.write(args.metrics, command=args.command, paths=list(paths), options=asdict(options))
+        except OSError as e:
+            print(f"Cannot write metrics: {e}", file=sys.stderr)
+
+
+def _scan_checkpoint(args, options):
+    """(checkpoint or None, exit status or None) for the --resume/--checkpoint options."""
+    if args.resume:
+        if args.paths or args.similar:
+            print("--resume continues the checkpointed scan; do not pass paths or --similar", file=sys.stderr)
+            return None, 2
+        try:
+            checkpoint = ScanCheckpoint.load(args.checkpoint)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return None, 1
+        if checkpoint is None:
+            print(f"No checkpoint to resume at {args.checkpoint}", file=sys.stderr)
+            return None, 1
+        checkpoint.revalidate()
+        return checkpoint, None
+    if not args.paths:
+        print("No paths to scan (or use --resume)", file=sys.stderr)
+        return None, 2
+    if args.no_checkpoint or args.similar:
+        return None, None
+    return ScanCheckpoint(args.checkpoint, args.paths, options), None
+
+
+def cmd_scan(args):
+    options = _scan_options(args)
+    if args.similar and args.link:
+        print("--link cannot be used with --similar: near-duplicates differ in content", file=sys.stderr)
+        return 2
+    if args.similar and args.csv:
+        print("--csv cannot be used with --similar: CSV reports hold exact duplicates only; use --jsonl",
+              file=sys.stderr)
+        return 2
+    if args.similar and args.archives:
+        print("--archives cannot be used with --similar: images inside archives are not decoded", file=sys.stderr)
+        return 2
+    checkpoint, status = _scan_checkpoint(args, options)
+    if status is not None:
+        return status
+    if checkpoint is not None:
+        options = checkpoint.options  # a resumed scan keeps the options its digests were made with
+    algorithm = args.similar or options.algorithm
+    paths = checkpoint.paths if checkpoint is not None else args.paths
+    writers, on_group = _open_writers(args, algorithm)
+    bus = ProgressBus()
+    try:
+        result = _run_scan(args, options, args.similar, on_group, checkpoint, bus)
+    except ImportError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        for writer in writers:
+            writer.close()
+    if result is None:
+        _report_metrics(args, bus, options, paths)
+        return 130
+
+    _write_reports(args, result.groups, algorithm, streamed=True)
+    _print_summary(args, result)
+    status = _apply_action(args, result, bus)
+    _report_metrics(args, bus, options, paths)
+    return status
+
+
+def cmd_load(args):
+    try:
+        result = load_report(args.report, check=not args.no_check)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load report: {e}", file=sys.stderr)
+        return 1
+    header = read_report_header(args.report)
+    if (args.delete or args.link) and header.get("algorithm") == PARTIAL_MODE:
+        print("--delete and --link cannot be used on a partial-duplicates report: the files differ", file=sys.stderr)
+        return 2
+    if (args.delete or args.link) and not result.verified:
+        print("--delete and --link need a JSON Lines or CSV report that records file sizes, times and the scan "
+              "mode; this one does not (a JSON report, or a CSV report from an older version), so rescan instead",
+              file=sys.stderr)
+        return 2
+    if args.link and header.get("algorithm") in PERCEPTUAL_METHODS:
+        print("--link cannot be used on a similar-images report: near-duplicates differ in content", file=sys.stderr)
+        return 2
+    _print_summary(args, result)
+    return _apply_action(args, result)
+
+
+def _apply_action(args, result, bus=None):
+    """Run --delete or --link on a scanned or loaded result; returns the exit status.
+
+    bus, if given, also collects the delete stage's progress and metrics.
+    """
+    groups = result.groups
+    keep_newest = args.keep == "newest"
+    if args.delete:
+        to_delete, skipped = select_for_deletion(groups, keep_newest, records=result.records)
+        with DeletionJournal(args.journal) as journal:
+            deleted = delete_files(to_delete, not args.permanent, result.records, journal, bus=bus)
+        if not args.quiet:
+            print(f"Deleted {len(deleted.deleted)} files ({format_size(deleted.reclaimed)})")
+            if deleted.deleted and not args.permanent:
+                print(f"Undo with: undo --batch {deleted.batch}")
+            if deleted.skipped or skipped:
+                print(f"Skipped {len(deleted.skipped) + len(skipped)} temporary, missing, or modified files")
+        if deleted.failed:
+            print(f"Failed to delete {len(deleted.failed)} files. See log for details.", file=sys.stderr)
+            return 1
+    elif args.link:
+        try:
+            linked = link_duplicates(groups, args.link, keep_newest, result.records)
+        except OSError as e:
+            print(f"Cannot {args.link} duplicates: {e}", file=sys.stderr)
+            return 1
+        if not args.quiet:
+            print(f"Replaced {len(linked.linked)} files with {args.link}s ({format_size(linked.reclaimed)} reclaimed)")
+            if linked.skipped:
+                print(f"Skipped {len(linked.skipped)} files (already linked, modified, missing or on another device)")
+        if linked.failed:
+            print(f"Failed to link {len(linked.failed)} files. See log for details.", file=sys.stderr)
+            return 1
+    return 0
+
+
+def cmd_undo(args):
+    with DeletionJournal(args.journal) as journal:
+        result = undo_deletions(journal, args.batch)
+    if result.batch is None:
+        print(f"Nothing to undo in {args.journal}", file=sys.stderr)
+        return 1
+    print(f"Restored {len(result.restored)} files from batch {result.batch}")
+    for path, reason in result.missing:
+        print(f"Not restored ({reason}): {path}")
+    for path, error in result.failed:
+        print(f"Restore failed ({error}): {path}")
+    return 1 if result.failed else 0
+
+
+def cmd_bench(args):
+    spec = TreeSpec(
+        files=args.files,
+        size_median=args.size_median,
+        size_sigma=args.size_sigma,
+        size_max=args.size_max,
+        duplicate_ratio=args.duplicate_ratio,
+        header_traps=args.header_traps,
+        prefix_traps=args.prefix_traps,
+        seed=args.seed,
+    )
+    options = ScanOptions(workers=args.workers, use_processes=args.processes, verify=args.verify, algorithm=args.algorithm)
+    stages = args.stages.split(",") if args.stages else BENCH_STAGES
+    unknown = set(stages) - set(BENCH_STAGES)
+    if unknown:
+        print(f"Unknown stages: {', '.join(sorted(unknown))}; choose from {', '.join(BENCH_STAGES)}", file=sys.stderr)
+        return 2
+    try:
+        results = run_benchmarks(args.root, spec, options, stages, args.repeat, args.keep)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    tree = results["tree"]
+    print(f"Tree: {tree['files']} files, {format_size(tree['bytes'])}, {tree['expected_groups']} duplicate groups "
+          f"(generated in {tree['generate_seconds']}s)")
+    for stage, r in results["stages"].items():
+        rate = f"{r['mb_per_sec']} MB/s" if r["bytes"] else f"{r['files_per_sec']} files/s"
+        check = "" if "correct" not in r else ("  groups OK" if r["correct"] else "  WRONG GROUPS")
+        print(f"{stage:<7} best {r['best']:9.4f}s  median {r['median']:9.4f}s  {rate}{check}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        if old.get("spec") != results["spec"]:
+            print("Note: the compared run used a different tree spec", file=sys.stderr)
+        print(f"\nAgainst {args.compare} (version {old.get('tool_version')}):")
+        for stage, before, after, ratio, verdict in compare_results(old, results):
+            print(f"{stage:<7} {before:9.4f}s -> {after:9.4f}s  x{ratio:.2f}  {verdict}")
+    return 0 if all(r.get("correct", True) for r in results["stages"].values()) else 1
+
+
+def cmd_watch(args):
+    options = _scan_options(args)
+    bus = ProgressBus()
+    result = _run_scan(args, options, bus=bus)
+    _report_metrics(args, bus, options, args.paths)
+    if result is None:
+        return 130
+    _write_reports(args, result.groups, options.algorithm, result.records, result.digests)
+    if not args.quiet:
+        print(f"Watching {len(result.records)} files, {len(result.groups)} duplicate groups (Ctrl+C to stop)")
+
+    groups = dict(enumerate(result.groups))
+
+    def on_update(changed, updated, removed):
+        for key, group in changed.items():
+            if group is None:
+                groups.pop(key, None)
+            else:
+                groups[key] = group
+        current = list(groups.values())
+        _write_reports(args, current, options.algorithm)
+        if not args.quiet:
+            print(f"[{time.strftime('%H:%M:%S')}] {len(updated)} changed, {len(removed)} removed -> "
+                  f"{len(current)} duplicate groups, {sum(len(g) for g in current)} files", flush=True)
+
+    stop_event = threading.Event()
+    try:
+        watch(args.paths, on_update, options, stop_event, result=result, interval=args.interval)
+    except KeyboardInterrupt:
+        stop_event.set()
+    return 0
+
+
+def cmd_partial(args):
+    if args.jsonl or args.csv:
+        print("Partial-duplicate reports are written with --json or --txt", file=sys.stderr)
+        return 2
+    options = _scan_options(args)
+    bus = ProgressBus()
+    try:
+        result = _run_scan(args, options, bus=bus)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    except (OSError, sqlite3.Error) as e:
+        print(f"Cannot build the chunk index: {e}", file=sys.stderr)
+        return 1
+    _report_metrics(args, bus, options, args.paths)
+    if result is None:
+        return 130
+    if args.json:
+        write_partial_report(result, args.json, args.top)
+    if args.txt:
+        write_txt_report([g.paths for g in result.groups], args.txt)
+    if not args.quiet:
+        print(f"Chunked {result.files} files ({format_size(result.bytes_scanned)}) into {result.chunks} chunks, "
+              f"{result.unique_chunks} distinct ({result.chunker} chunker)")
+        print(f"Block-level dedupe could reclaim: {format_size(result.reclaimable)}")
+        print(f"Partially duplicated groups: {len(result.groups)}")
+        if result.dropped_pairs:
+            print(f"Pair limit reached: {result.dropped_pairs} chunk overlaps of further file pairs were not scored")
+        for m in result.pairs[:args.top]:
+            print(f"{m.ratio:7.1%}  {format_size(m.shared):>10} shared  {m.a}  <->  {m.b}")
+    return 0
+
+
+def cmd_index(args):
+    if args.complete:
+        if args.paths:
+            print("--complete updates an existing index; do not pass paths", file=sys.stderr)
+            return 2
+        try:
+            hashed = complete_index(args.output, read_needs(args.complete), args.workers)
+        except (OSError, ValueError) as e:
+            print(f"Cannot complete index: {e}", file=sys.stderr)
+            return 1
+        if not args.quiet:
+            print(f"Hashed {hashed} files; {args.output} is ready to merge again")
+        return 0
+    if not args.paths:
+        print("No paths to index (or use --complete)", file=sys.stderr)
+        return 2
+    if args.verify == "none":
+        print("Indexes need full digests; use --verify compare or hash", file=sys.stderr)
+        return 2
+    options = _scan_options(args)
+    bus = ProgressBus()
+    try:
+        result = _run_scan(args, options, bus=bus)
+    except OSError as e:
+        print(f"Cannot write index: {e}", file=sys.stderr)
+        return 1
+    _report_metrics(args, bus, options, args.paths)
+    if result is None:
+        return 130
+    if not args.quiet:
+        print(f"Indexed {len(result.records)} files to {args.output} "
+              f"({len(result.groups)} duplicate groups on this node)")
+    return 0
+
+
+def cmd_merge(args):
+    try:
+        result = merge_indexes(args.indexes)
+    except (OSError, ValueError) as e:
+        print(f"Cannot merge: {e}", file=sys.stderr)
+        return 1
+    labelled = [[f"{node}:{path}" for node, path in g] for g in result.groups]
+    if args.json:
+        write_json_report(labelled, args.json, result.algorithm)
+    if args.txt:
+        write_txt_report(labelled, args.txt)
+    if not args.quiet:
+        print(f"Nodes: {', '.join(result.nodes)} ({result.files} files)")
+        print(f"Duplicate groups: {len(result.groups)} ({len(result.cross_node)} across nodes)")
+        print(f"Reclaimable: {format_size(result.total_reclaimable)}")
+    if result.needs:
+        pending = sum(len(p) for p in result.needs.values())
+        if args.needs:
+            for node, path in write_needs(result.needs, args.needs).items():
+                print(f"{node}: {len(result.needs[node])} files to hash; run there: "
+                      f"index --complete {path} --output INDEX")
+        else:
+            print(f"{pending} files in cross-node size collisions still need hashing; "
+                  f"pass --needs DIR to list them per node", file=sys.stderr)
+        return 3
+    return 0
+
+
+def _add_scan_arguments(p, paths_nargs="+"):
+    p.add_argument("paths", nargs=paths_nargs, metavar="PATH", help="files or folders to scan")
+    p.add_argument("--json", metavar="FILE", help="write the duplicate report as JSON")
+    p.add_argument("--txt", metavar="FILE", help="write the duplicate report as text")
+    p.add_argument("--jsonl", metavar="FILE", help="stream groups to a JSON Lines report (size, mtime and digest per file)")
+    p.add_argument("--csv", metavar="FILE", help="stream groups to a CSV report (size, mtime and digest per file)")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parallel hashing workers (default: %(default)s)")
+    p.add_argument("--processes", action="store_true", help="hash in worker processes instead of threads")
+    p.add_argument("--device-depth", action="append", default=[], type=_device_depth, metavar="KIND=N",
+                   help="concurrent reads per device of KIND (rotational=1, ssd=workers, network=2x workers, "
+                        "unknown=workers by default); repeatable")
+    p.add_argument("--verify", choices=VERIFY_MODES, default="compare",
+                   help="confirm candidates by lockstep comparison, full hashes, or trust sampled fingerprints (none)")
+    p.add_argument("--algorithm", choices=available_algorithms(), default=DEFAULT_ALGORITHM,
+                   help="digest algorithm (xxh3_128/xxh64/blake3 need the xxhash/blake3 packages)")
+    p.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                   help="skip folders whose name matches PATTERN (repeatable), e.g. --exclude .git")
+    p.add_argument("--follow-symlinks", action="store_true", help="follow symlinked files and folders (loops are detected)")
+    p.add_argument("--group-memory", type=int, metavar="MB",
+                   help="group files by size in sorted runs of at most MB spilled to disk, for trees too large "
+                        "to sort in memory; hashing starts as the runs merge")
+    p.add_argument("--spill-dir", metavar="DIR", help="folder for --group-memory runs (default: the system temp folder)")
+    p.add_argument("--cache", default=default_cache_file, metavar="FILE", help="hash cache database (default: %(default)s)")
+    p.add_argument("--no-cache", action="store_true", help="do not read or update the hash cache")
+    p.add_argument("--stats", action="store_true",
+                   help="print per-stage wall time, bytes read, cache hit rate and worker utilisation")
+    p.add_argument("--metrics", metavar="FILE", help="write the per-stage metrics of this run as JSON")
+    p.add_argument("--profile", metavar="FILE", help="profile the scan with cProfile and save the stats (read with pstats)")
+    p.add_argument("--trace-memory", action="store_true",
+                   help="trace allocations with tracemalloc; the peak and top sites go to --stats/--metrics")
+    p.add_argument("-q", "--quiet", action="store_true", help="no progress or summary output")
+
+
+def _add_action_arguments(p):
+    action = p.add_mutually_exclusive_group()
+    action.add_argument("--delete", action="store_true", help="move duplicates to the Recycle Bin, keeping one file per group")
+    action.add_argument("--link", choices=LINK_MODES, help="replace duplicates with hardlinks or reflinks to the kept file")
+    p.add_argument("--keep", choices=("first", "newest"), default="first", help="file to keep in each group with --delete/--link")
+    p.add_argument("--permanent", action="store_true", help="with --delete, remove files instead of using the Recycle Bin")
+    p.add_argument("--journal", default=default_journal_file, metavar="FILE",
+                   help="append every deleted file to this journal, for undo (default: %(default)s)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dupcleaner", description=f"{APP_NAME} – duplicate file finder")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", help="find duplicate files below the given paths")
+    _add_scan_arguments(p, paths_nargs="*")
+    _add_action_arguments(p)
+    p.add_argument("--checkpoint", default=default_checkpoint_file, metavar="FILE",
+                   help="save scan progress here periodically and on Ctrl+C (default: %(default)s)")
+    p.add_argument("--no-checkpoint", action="store_true", help="do not save scan progress")
+    p.add_argument("--resume", action="store_true",
+                   help="continue the scan saved in the checkpoint, with its original paths and options")
+    p.add_argument("--similar", choices=PERCEPTUAL_METHODS,
+                   help="find near-duplicate images by perceptual hash instead of identical files (needs Pillow)")
+    p.add_argument("--distance", type=int, default=DEFAULT_DISTANCE, metavar="BITS",
+                   help="with --similar, maximum differing hash bits out of 64 (default: %(default)s)")
+    p.add_argument("--archives", action="store_true",
+                   help="also compare the files inside .zip/.tar(.gz/.bz2/.xz) archives, reported as ARCHIVE!/PATH "
+                        "(never deleted or linked)")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("load", help="reload a JSON Lines, CSV or JSON report without rescanning")
+    p.add_argument("report", metavar="REPORT", help="report written by scan --jsonl/--csv/--json or the GUI")
+    p.add_argument("--no-check", action="store_true",
+                   help="trust the report instead of re-checking each file's size and modification time")
+    _add_action_arguments(p)
+    p.add_argument("-q", "--quiet", action="store_true", help="no summary output")
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser("undo", help="restore the files a --delete moved to the Recycle Bin / Trash")
+    p.add_argument("--batch", metavar="ID", help="batch to undo, as printed by --delete (default: the last one)")
+    p.add_argument("--journal", default=default_journal_file, metavar="FILE", help="deletion journal (default: %(default)s)")
+    p.set_defaults(func=cmd_undo)
+
+    p = sub.add_parser("bench", help="time each pipeline stage on a generated tree, for comparing versions")
+    spec = TreeSpec()
+    p.add_argument("--root", metavar="DIR", help="generate the tree in DIR/tree instead of a temporary folder (DIR must be empty or an earlier --root)")
+    p.add_argument("--keep", action="store_true", help="keep the generated tree afterwards")
+    p.add_argument("--files", type=int, default=spec.files, help="files to generate (default: %(default)s)")
+    p.add_argument("--size-median", type=int, default=spec.size_median, metavar="BYTES",
+                   help="median of the log-normal file sizes (default: %(default)s)")
+    p.add_argument("--size-sigma", type=float, default=spec.size_sigma, help="spread of the file sizes (default: %(default)s)")
+    p.add_argument("--size-max", type=int, default=spec.size_max, metavar="BYTES", help="largest file (default: %(default)s)")
+    p.add_argument("--duplicate-ratio", type=float, default=spec.duplicate_ratio, metavar="R",
+                   help="fraction of files that copy another (default: %(default)s)")
+    p.add_argument("--header-traps", type=int, default=spec.header_traps, metavar="N",
+                   help="groups of files that share only their first 64 KB (default: %(default)s)")
+    p.add_argument("--prefix-traps", type=int, default=spec.prefix_traps, metavar="N",
+                   help="groups of large files differing in one unsampled byte (default: %(default)s)")
+    p.add_argument("--seed", type=int, default=spec.seed, help="generator seed (default: %(default)s)")
+    p.add_argument("--stages", metavar="LIST", help=f"comma-separated subset of {','.join(BENCH_STAGES)}")
+    p.add_argument("--repeat", type=int, default=3, help="runs per stage; the best is compared (default: %(default)s)")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parallel hashing workers (default: %(default)s)")
+    p.add_argument("--processes", action="store_true", help="hash in worker processes instead of threads")
+    p.add_argument("--verify", choices=VERIFY_MODES, default="compare", help="verification mode for the scan stage")
+    p.add_argument("--algorithm", choices=available_algorithms(), default=DEFAULT_ALGORITHM, help="digest algorithm")
+    p.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    p.add_argument("--compare", metavar="FILE", help="compare with results saved by an earlier --output")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("watch", help="scan, then keep the duplicate report current as files change")
+    _add_scan_arguments(p)
+    p.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, metavar="SECONDS",
+                   help="how often to collect file system changes (default: %(default)s)")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("index", help="scan local paths into a portable index for merging with other machines")
+    _add_scan_arguments(p, paths_nargs="*")
+    p.add_argument("--output", required=True, metavar="FILE", help="index file to write (or update with --complete)")
+    p.add_argument("--node", default=default_node(), help="name of this machine in merged reports (default: %(default)s)")
+    p.add_argument("--complete", metavar="NEEDS",
+                   help="hash the files listed for this node by merge --needs and update the index")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("merge", help="combine indexes from several machines into cross-machine duplicate groups")
+    p.add_argument("indexes", nargs="+", metavar="INDEX", help="indexes written by the index command")
+    p.add_argument("--json", metavar="FILE", help="write the groups as JSON, files named NODE:PATH")
+    p.add_argument("--txt", metavar="FILE", help="write the groups as text")
+    p.add_argument("--needs", metavar="DIR",
+                   help="write DIR/NODE.txt lists of the files each machine must hash before merging again")
+    p.add_argument("-q", "--quiet", action="store_true", help="no summary output")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("partial", help="find large files that share most of their content (VM images, dumps, logs)")
+    _add_scan_arguments(p)
+    p.add_argument("--min-size", type=int, default=PARTIAL_MIN_SIZE, metavar="BYTES",
+                   help="skip smaller files (default: %(default)s)")
+    p.add_argument("--min-ratio", type=float, default=DEFAULT_MIN_RATIO, metavar="R",
+                   help="report pairs sharing at least this fraction of the smaller file (default: %(default)s)")
+    p.add_argument("--chunk-size", type=int, default=CDC_AVG_SIZE, metavar="BYTES",
+                   help="average content-defined chunk size, a power of two (default: %(default)s)")
+    p.add_argument("--index", metavar="FILE", help="keep the chunk index database here instead of a temporary file")
+    p.add_argument("--top", type=int, default=20, metavar="N", help="pairs to print and write (default: %(default)s)")
+    p.set_defaults(func=cmd_partial)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "workers", 1) < 1:
+        args.workers = 1
+    if getattr(args, "group_memory", None) is not None and args.group_memory < 1:
+        args.group_memory = 1
+    return args.func(args)
@@ -0,0 +1,99 @@
+"""
+Vectorized candidate filtering with NumPy (optional).
+
+group_by_size() and the quick-hash stage of hash_groups() otherwise bucket
+files with a dict append per file. With NumPy installed the same buckets are
+found on columns: the FileTable's size, device and inode arrays are viewed
+without copying, sorted with argsort/lexsort, and buckets start wherever
+neighbouring keys differ. Singletons and hardlink aliases are dropped with
+boolean masks, so paths are only built for files that are still candidates.
+"""
+
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _boundaries(*keys):
+    """Start index and length of each run of equal rows in keys (sorted columns of equal length)."""
+    n = len(keys[0])
+    change = np.zeros(n, dtype=bool)
+    if n:
+        change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(change)
+    return starts, np.diff(np.append(starts, n))
+
+
+def size_groups(records):
+    """(groups, aliases) for a FileTable, as group_by_size() builds them.
+
+    Groups are lists of 2+ same-size paths in walk order, ordered by their
+    first file; hardlinks to a (dev, ino) already in the group are left out
+    and listed in aliases under the first path seen.
+    """
+    sizes = np.frombuffer(records.sizes, dtype=np.int64)
+    live = np.frombuffer(records._dir, dtype=np.uint32) != records._NO_DIR
+    ids = np.flatnonzero(live)
+    order = ids[np.argsort(sizes[ids], kind="stable")]  # walk (ID) order within a size
+    starts, counts = _boundaries(sizes[order])
+    shared = counts > 1
+    order = order[np.repeat(shared, counts)]
+    bucket = np.repeat(np.arange(shared.sum()), counts[shared])
+
+    # Hardlinks: sort on (dev, ino). lexsort is stable, so within a run rows stay in
+    # (size, walk) order and a file that changed size between stats starts a new run;
+    # the later rows of each run alias its first.
+    devs = np.frombuffer(records.devs, dtype=np.uint64)[order]
+    inos = np.frombuffer(records.inos, dtype=np.uint64)[order]
+    by_inode = np.lexsort((inos, devs))
+    link_starts, link_counts = _boundaries(devs[by_inode], inos[by_inode], bucket[by_inode])
+    first = np.repeat(link_starts, link_counts)
+    linked = (np.arange(len(by_inode)) != first) & (inos[by_inode] != 0)
+    aliases = defaultdict(list)
+    path = records.path
+    for rep, alias in zip(order[by_inode[first[linked]]].tolist(), order[by_inode[linked]].tolist()):
+        aliases[path(rep)].append(path(alias))
+    keep = np.ones(len(order), dtype=bool)
+    keep[by_inode[linked]] = False
+
+    order, bucket = order[keep], bucket[keep]
+    starts, counts = _boundaries(bucket)
+    shared = counts > 1
+    starts, counts = starts[shared], counts[shared]
+    ends = starts + counts
+    paths = records.paths(order.tolist())
+    groups = [paths[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+    firsts = order[starts]
+    return [groups[i] for i in np.argsort(firsts, kind="stable").tolist()], aliases
+
+
+def split_by_digest(groups, digests):
+    """Split groups by a digest known for every member; returns (buckets of 2+ paths, unique paths).
+
+    digests(path) gives a hex digest. The digests of all groups become one
+    fixed-width bytes column, sorted once with the group number as the outer key.
+    """
+    paths = [p for g in groups for p in g]
+    if not paths:
+        return [], []
+    hexes = [digests(p) for p in paths]
+    joined = "".join(hexes).encode("ascii")
+    width = len(hexes[0])
+    # One algorithm gives one digest length; anything else goes through a slower generic array.
+    column = np.frombuffer(joined, dtype=f"S{width}") if len(joined) == width * len(hexes) else np.array(hexes)
+    group_of = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+    order = np.lexsort((column, group_of))  # stable: group order within a bucket
+    starts, counts = _boundaries(group_of[order], column[order])
+    order = order.tolist()
+    buckets, unique = [], []
+    for s, c in zip(starts.tolist(), counts.tolist()):
+        if c == 1:
+            unique.append(paths[order[s]])
+        else:
+            buckets.append([paths[i] for i in order[s:s + c]])
+    return buckets, unique
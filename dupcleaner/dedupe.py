@@ -0,0 +1,130 @@
+"""
+Space reclaiming without deleting paths: replace duplicates with hardlinks to
+the kept file, or with reflinks (FICLONE copy-on-write clones) on filesystems
+such as Btrfs and XFS that support them.
+"""
+
+import os
+import shutil
+import sys
+import uuid
+from dataclasses import dataclass, field
+
+from .engine import keeper_first
+from .utils import log_error
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LINK_MODES = ("hardlink", "reflink")
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+
+
+@dataclass
+class LinkResult:
+    linked: list = field(default_factory=list)
+    reclaimed: int = 0
+    group_reclaimed: list = field(default_factory=list)  # bytes freed per input group
+    skipped: list = field(default_factory=list)  # (path, reason)
+    failed: list = field(default_factory=list)  # (path, error message)
+
+
+def reflink_supported():
+    return fcntl is not None and sys.platform.startswith("linux")
+
+
+def _temp_name(path):
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.dupclean")
+
+
+def _replace_with_hardlink(keeper, path):
+    tmp = _temp_name(path)
+    os.link(keeper, tmp)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _replace_with_reflink(keeper, path):
+    tmp = _temp_name(path)
+    with open(keeper, "rb") as src, open(tmp, "xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except BaseException:
+            dst.close()
+            os.unlink(tmp)
+            raise
+    try:
+        shutil.copystat(path, tmp)  # the replaced path keeps its own mode and timestamps
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def link_duplicates(groups, mode="hardlink", keep_newest=False, records=None, is_selected=None):
+    """Replace every duplicate with a hardlink/reflink to its group's kept file.
+
+    Files already sharing the keeper's inode, files modified since the scan (when
+    records are given) and, for hardlinks, files on another device are skipped.
+    Bytes count as reclaimed only when the replaced inode lost its last link.
+    Hardlinked paths take on the keeper's permissions and timestamps; reflinked
+    paths keep their own.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode {mode!r}; expected one of {', '.join(LINK_MODES)}")
+    if mode == "reflink" and not reflink_supported():
+        raise OSError("Reflinks (FICLONE) are only available on Linux filesystems such as Btrfs or XFS")
+    replace = _replace_with_hardlink if mode == "hardlink" else _replace_with_reflink
+
+    result = LinkResult()
+    for group in groups:
+        freed = 0
+        ordered = keeper_first(group, keep_newest, records)
+        if len(ordered) < 2:  # e.g. one file and its copies inside archives
+            result.group_reclaimed.append(0)
+            continue
+        keeper = ordered[0]
+        try:
+            keeper_st = os.stat(keeper)
+        except OSError as e:
+            result.skipped.extend((f, f"kept file unavailable: {e}") for f in ordered[1:])
+            result.group_reclaimed.append(0)
+            continue
+        keeper_key = (keeper_st.st_dev, keeper_st.st_ino)
+
+        for f in ordered[1:]:
+            if is_selected is not None and not is_selected(f):
+                continue
+            try:
+                st = os.lstat(f)
+            except OSError as e:
+                result.skipped.append((f, f"missing: {e}"))
+                continue
+            rec = records.get(f) if records else None
+            if (st.st_dev, st.st_ino) == keeper_key:
+                result.skipped.append((f, "already linked"))
+                continue
+            if rec is not None and (st.st_size, st.st_mtime_ns) != (rec.size, rec.mtime_ns):
+                result.skipped.append((f, "modified since scan"))
+                continue
+            if mode == "hardlink" and st.st_dev != keeper_st.st_dev:
+                result.skipped.append((f, "different device"))
+                continue
+            try:
+                replace(keeper, f)
+            except OSError as e:
+                result.failed.append((f, str(e)))
+                log_error(f"{mode} failed: {f} -> {keeper} | {e}")
+                continue
+            result.linked.append(f)
+            if st.st_nlink <= 1:
+                freed += st.st_size
+        result.group_reclaimed.append(freed)
+        result.reclaimed += freed
+    return result
+
@@ -0,0 +1,398 @@
+"""
+Deletion engine: batched, parallel, journaled and undoable.
+
+Each file is checked against the FileRecord captured at scan time (a file that
+changed since is no longer a known duplicate and is skipped), then handed to
+send2trash in batches from a bounded worker pool. Every move to the Recycle
+Bin / Trash and every permanent removal is appended to a JSON Lines journal as
+it completes, and undo_deletions() uses the journal to find trashed files again
+and put them back where they were.
+"""
+
+import json
+import os
+import shutil
+import struct
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import unquote
+
+from .metrics import timed_call
+from .progress import STAGE_DELETE, STAGE_DONE, ProgressBus
+from .utils import default_journal_file, log_error
+
+try:
+    from send2trash import send2trash
+except ImportError:
+    send2trash = None
+
+DEFAULT_DELETE_WORKERS = 4
+TRASH_BATCH = 64  # paths per send2trash call; Windows moves a whole batch in one shell operation
+
+OP_TRASH = "trash"
+OP_REMOVE = "remove"
+OP_RESTORE = "restore"
+
+
+@dataclass
+class DeleteResult:
+    deleted: list = field(default_factory=list)
+    reclaimed: int = 0
+    skipped: list = field(default_factory=list)
+    failed: list = field(default_factory=list)  # (path, error message)
+    batch: str = None  # journal batch ID, for undo_deletions()
+
+
+@dataclass
+class UndoResult:
+    restored: list = field(default_factory=list)
+    missing: list = field(default_factory=list)  # (path, reason): not in the trash, removed permanently, path taken
+    failed: list = field(default_factory=list)  # (path, error message)
+    batch: str = None
+
+
+# =================== JOURNAL ===================
+class DeletionJournal:
+    """Append-only JSON Lines log of every trashed, removed and restored file.
+
+    Each line is {"time", "batch", "op", "path", "size", "mtime_ns"} and is
+    flushed as soon as it is written, so the log survives a crash mid-batch.
+    """
+
+    def __init__(self, path=default_journal_file):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    def record(self, batch, op, path, size=0, mtime_ns=0):
+        line = json.dumps({
+            "time": datetime.now().isoformat(),
+            "batch": batch,
+            "op": op,
+            "path": path,
+            "size": size,
+            "mtime_ns": mtime_ns,
+        }) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line)
+            self.file.flush()
+
+    def entries(self):
+        """Journal entries, oldest first; a line cut short by a crash is ignored."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def last_batch(self):
+        """ID of the most recent batch that trashed or removed files, or None."""
+        batch = None
+        for entry in self.entries():
+            if entry.get("op") in (OP_TRASH, OP_REMOVE):
+                batch = entry.get("batch")
+        return batch
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =================== DELETE ===================
+def _norm(path):
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _delete_chunk(chunk, use_trash):
+    """Delete [(path, FileRecord or None)]; return [(path, outcome, lstat result, message)].
+
+    outcome is OP_TRASH, OP_REMOVE, "skipped" or "failed".
+    """
+    done = []
+    ready = []
+    for f, rec in chunk:
+        try:
+            st = os.lstat(f)
+        except OSError as e:
+            done.append((f, "skipped", None, f"missing: {e}"))
+            continue
+        if rec is not None and (st.st_size, st.st_mtime_ns) != (rec.size, rec.mtime_ns):
+            done.append((f, "skipped", st, "modified since scan"))
+            continue
+        ready.append((f, st))
+
+    trashed = set()
+    if use_trash and send2trash is not None and ready:
+        try:
+            send2trash([_norm(f) for f, _ in ready])
+            trashed.update(f for f, _ in ready)
+        except Exception as e:
+            # Part of the batch may have moved before the error; retry the rest one by one.
+            log_error(f"send2trash batch of {len(ready)} failed, retrying per file | {e}")
+            for f, _ in ready:
+                if not os.path.lexists(f):
+                    trashed.add(f)
+                    continue
+                try:
+                    send2trash(_norm(f))
+                    trashed.add(f)
+                except Exception as e2:
+                    log_error(f"send2trash failed, trying os.remove(): {f} | {e2}")
+
+    for f, st in ready:
+        if f in trashed:
+            done.append((f, OP_TRASH, st, None))
+            continue
+        try:
+            os.remove(_norm(f))
+            done.append((f, OP_REMOVE, st, None))
+        except Exception as e:
+            log_error(f"Permanent delete failed: {f} | {e}")
+            done.append((f, "failed", st, str(e)))
+    return done
+
+
+def _inode_batches(items, size=TRASH_BATCH):
+    """Split [(path, FileRecord or None)] into batches of about size, keeping the links of an inode together.
+
+    A batch stats all its files before deleting any, so every link of an inode
+    sees the same link count and the bytes are counted once. Files without a
+    record are their own unit.
+    """
+    units = {}  # (dev, ino) or path -> items, in first-seen order
+    for f, rec in items:
+        key = (rec.dev, rec.ino) if rec is not None and rec.ino else f
+        units.setdefault(key, []).append((f, rec))
+    batch = []
+    for unit in units.values():
+        if batch and len(batch) + len(unit) > size:
+            yield batch
+            batch = []
+        batch.extend(unit)
+    if batch:
+        yield batch
+
+
+def delete_files(files, use_trash=True, records=None, journal=None, workers=DEFAULT_DELETE_WORKERS,
+                 stop_event=None, bus=None):
+    """Move files to the Recycle Bin (falling back to permanent deletion) in parallel batches.
+
+    records ({path: FileRecord}) supplies sizes and mtimes captured at scan time;
+    files whose size or mtime no longer match are skipped. Each trash/remove is
+    written to journal (a DeletionJournal) under result.batch. Hardlinks of one
+    inode go to the same send2trash batch, and bytes count as reclaimed once
+    every link of the inode is gone. If stop_event is
+    set, batches not yet started are left alone. Progress is published on bus.
+    """
+    result = DeleteResult(batch=f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}")
+    bus = bus or ProgressBus()
+    items = [(f, records.get(f) if records is not None else None) for f in files]
+    bus.set_stage(STAGE_DELETE)
+    bus.set_totals(len(items), sum(rec.size for _, rec in items if rec is not None))
+    bus.metrics.set_workers(STAGE_DELETE, max(1, workers))
+    links_removed = {}  # (dev, ino) -> links deleted in this batch
+
+    def collect(timed):
+        busy, done = timed
+        bus.metrics.add(STAGE_DELETE, tasks=1, busy=busy, files=len(done))
+        for f, outcome, st, message in done:
+            size = st.st_size if st is not None else 0
+            bus.add(files_done=1, bytes_done=size)
+            if outcome == "skipped":
+                result.skipped.append(f)
+                log_error(f"Skipped {message}: {f}")
+            elif outcome == "failed":
+                result.failed.append((f, message))
+            else:
+                result.deleted.append(f)
+                if journal is not None:
+                    journal.record(result.batch, outcome, f, size, st.st_mtime_ns)
+                key = (st.st_dev, st.st_ino)
+                links_removed[key] = links_removed.get(key, 0) + 1
+                if links_removed[key] >= st.st_nlink:
+                    result.reclaimed += size
+
+    inflight = set()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="delete") as pool:
+        for chunk in _inode_batches(items):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if len(inflight) >= workers * 2:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    collect(fut.result())
+            inflight.add(pool.submit(timed_call, _delete_chunk, chunk, use_trash))
+        for fut in inflight:
+            collect(fut.result())
+    bus.set_stage(STAGE_DONE)
+    return result
+
+
+# =================== UNDO ===================
+def _mount_point(path):
+    path = os.path.dirname(_norm(path))
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _freedesktop_index(paths):
+    """{original path: [(deletion date, trashed file, .trashinfo file)]} from the XDG trash folders."""
+    home = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "Trash")
+    trashes = {(home, None)}
+    uid = os.getuid()
+    for p in paths:
+        top = _mount_point(p)
+        trashes.add((os.path.join(top, ".Trash", str(uid)), top))
+        trashes.add((os.path.join(top, f".Trash-{uid}"), top))
+    index = {}
+    for trash, top in trashes:
+        info_dir = os.path.join(trash, "info")
+        try:
+            names = os.listdir(info_dir)
+        except OSError:
+            continue
+        for name in names:
+            if not name.endswith(".trashinfo"):
+                continue
+            info = os.path.join(info_dir, name)
+            fields = {}
+            try:
+                with open(info, encoding="utf-8") as f:
+                    for line in f:
+                        key, _, value = line.strip().partition("=")
+                        fields[key] = value
+            except OSError:
+                continue
+            original = unquote(fields.get("Path", ""))
+            if not original:
+                continue
+            if not os.path.isabs(original) and top is not None:
+                original = os.path.join(top, original)
+            trashed = os.path.join(trash, "files", name[:-len(".trashinfo")])
+            index.setdefault(_norm(original), []).append((fields.get("DeletionDate", ""), trashed, info))
+    return index
+
+
+def _recycle_bin_index(paths):
+    """{original path: [(deletion time, $R file, $I file)]} from the Windows $Recycle.Bin folders."""
+    index = {}
+    for drive in {os.path.splitdrive(_norm(p))[0] for p in paths}:
+        root = os.path.join(drive + os.sep, "$Recycle.Bin")
+        try:
+            sids = os.listdir(root)
+        except OSError:
+            continue
+        for sid in sids:
+            folder = os.path.join(root, sid)
+            try:
+                names = os.listdir(folder)
+            except OSError:
+                continue
+            for name in names:
+                if not name.startswith("$I"):
+                    continue
+                info = os.path.join(folder, name)
+                try:
+                    with open(info, "rb") as f:
+                        data = f.read()
+                    version, _, deleted_at = struct.unpack_from("<qqq", data)
+                    if version == 1:
+                        original = data[24:24 + 520].decode("utf-16-le").split("\0")[0]
+                    else:
+                        length = struct.unpack_from("<i", data, 24)[0]
+                        original = data[28:28 + 2 * length].decode("utf-16-le").rstrip("\0")
+                except (OSError, struct.error, UnicodeDecodeError):
+                    continue
+                index.setdefault(os.path.normcase(_norm(original)), []).append(
+                    (deleted_at, os.path.join(folder, "$R" + name[2:]), info))
+    return index
+
+
+def undo_deletions(journal=None, batch=None):
+    """Put back the files a batch moved to the Recycle Bin / Trash.
+
+    batch defaults to the journal's most recent one. Files are found through the
+    trash's own records of their original paths (Windows $Recycle.Bin and the
+    freedesktop Trash used on Linux/BSD); the macOS Trash keeps no such record,
+    so files there must be restored from Finder. Permanently removed files and
+    paths that exist again are reported in result.missing. Restores are
+    journaled, so undoing the same batch twice is harmless.
+    """
+    if journal is None:
+        with DeletionJournal() as own:
+            return undo_deletions(own, batch)
+    entries = list(journal.entries())
+    if batch is None:
+        batch = journal.last_batch()
+    result = UndoResult(batch=batch)
+    if batch is None:
+        return result
+
+    pending = {}
+    for entry in entries:
+        if entry.get("batch") != batch:
+            continue
+        if entry["op"] in (OP_TRASH, OP_REMOVE):
+            pending[entry["path"]] = entry
+        elif entry["op"] == OP_RESTORE:
+            pending.pop(entry["path"], None)
+
+    trashed = [e for e in pending.values() if e["op"] == OP_TRASH]
+    result.missing.extend((e["path"], "removed permanently") for e in pending.values() if e["op"] == OP_REMOVE)
+    if sys.platform == "win32":
+        index, key = _recycle_bin_index([e["path"] for e in trashed]), lambda p: os.path.normcase(_norm(p))
+    elif sys.platform == "darwin":
+        result.missing.extend((e["path"], "restore from the macOS Trash in Finder") for e in trashed)
+        return result
+    else:
+        index, key = _freedesktop_index([e["path"] for e in trashed]), _norm
+
+    for entry in trashed:
+        path = entry["path"]
+        candidates = [c for c in index.get(key(path), ()) if os.path.lexists(c[1])]
+        sized = [c for c in candidates if os.path.getsize(c[1]) == entry.get("size")]
+        if not candidates:
+            result.missing.append((path, "not found in the trash"))
+            continue
+        if os.path.lexists(path):
+            result.missing.append((path, "a file exists at the original path"))
+            continue
+        chosen = max(sized or candidates)  # the most recent deletion of this path
+        _, trashed_file, info = chosen
+        try:
+            os.makedirs(os.path.dirname(_norm(path)), exist_ok=True)
+            shutil.move(trashed_file, path)
+        except OSError as e:
+            log_error(f"Restore failed: {path} | {e}")
+            result.failed.append((path, str(e)))
+            continue
+        try:
+            os.remove(info)
+        except OSError:
+            pass
+        index[key(path)].remove(chosen)
+        journal.record(batch, OP_RESTORE, path, entry.get("size", 0), entry.get("mtime_ns", 0))
+        result.restored.append(path)
+    return result
@@ -0,0 +1,547 @@
+"""
+Scan engine: walk -> size groups -> quick hash -> sampled hash -> verify -> select
+files to delete (deletion itself is in deletion.py).
+
+Nothing here imports tkinter, so the same pipeline backs the GUI, the CLI
+and any other Python caller.
+"""
+
+import os
+import threading
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+
+from .archives import hash_members, is_member, split_by_crc
+from .cache import open_hash_cache
+from .columnar import np, size_groups, split_by_digest
+from .filetable import FileTable
+from .hashing import (
+    DEFAULT_ALGORITHM, LOCKSTEP_MAX_FILES, QUICK_HASH_BYTES, SAMPLE_BYTES, SAMPLE_COUNT, SAMPLE_MIN_SIZE, TAIL_BYTES,
+    file_hash, lockstep_compare, new_hasher, sample_hash,
+)
+from .metrics import timed_call
+from .progress import STAGE_DONE, STAGE_HASH, STAGE_WALK, ProgressBus
+from .scheduler import KIND_ROTATIONAL, IOScheduler
+from .spill import SizeRuns
+from .utils import log_error
+from .walker import DEFAULT_WALK_WORKERS, stat_record, walk
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 4)
+VERIFY_MODES = ("compare", "hash", "none")
+
+# Hash pipeline stages; the values index the [quick, sample, full] digest entries.
+STAGE_QUICK, STAGE_SAMPLE, STAGE_FULL = 0, 1, 2
+STAGE_LOCKSTEP = 3  # whole-bucket job that produces full digests for the survivors
+JOB_METRICS = {STAGE_QUICK: "hash.quick", STAGE_SAMPLE: "hash.sample", STAGE_FULL: "hash.full",
+               STAGE_LOCKSTEP: "hash.lockstep"}
+
+
+@dataclass
+class ScanOptions:
+    workers: int = DEFAULT_WORKERS
+    use_processes: bool = False
+    start_method: str = None  # multiprocessing start method for the process pool; None = platform default
+    cache_path: str = None  # SQLite hash cache location; None disables the cache
+    # How files that agree on quick + sampled fingerprints are confirmed:
+    # "compare" reads group members block by block in lockstep, "hash" computes a full
+    # digest per file, "none" trusts the sampled fingerprint for files above SAMPLE_MIN_SIZE.
+    verify: str = "compare"
+    algorithm: str = DEFAULT_ALGORITHM  # see hashing.available_algorithms()
+    exclude: tuple = ()  # folder name patterns (fnmatch) pruned from the walk, e.g. ".git"
+    follow_symlinks: bool = False
+    walk_workers: int = DEFAULT_WALK_WORKERS
+    # (device kind, concurrent reads) pairs overriding scheduler.queue_depths(), e.g. (("rotational", 2),)
+    device_depth: tuple = ()
+    archives: bool = False  # also scan the members of zip/tar files, reported as "archive.zip!/inner/path"
+    # Bytes size grouping may use before spilling sorted runs to disk (see spill.py); None sorts in memory.
+    group_memory: int = None
+    spill_dir: str = None  # folder for the spilled runs; None = the system temp folder
+    columnar: bool = True  # bucket by size and cached quick digest with NumPy when it is installed
+
+
+@dataclass
+class ScanResult:
+    groups: list = field(default_factory=list)  # duplicate groups of paths
+    records: FileTable = field(default_factory=FileTable)  # path -> FileRecord for every scanned file
+    stopped: bool = False
+    digests: list = field(default_factory=list)  # per group: full digest, or the strongest one it was confirmed by
+    # False for a loaded report that lacks per-file size/mtime (legacy JSON): its files may have
+    # changed since it was written, so it must not be deleted or linked from without rescanning.
+    verified: bool = True
+
+    def reclaimable(self, group):
+        return reclaimable_bytes(group, self.records)
+
+    @property
+    def total_reclaimable(self):
+        return sum(self.reclaimable(g) for g in self.groups)
+
+
+# =================== SIZE GROUPS ===================
+def inode_key(rec):
+    """(dev, ino) identifying the file's content, or the path where inodes are unknown."""
+    return (rec.dev, rec.ino) if rec.ino else rec.path
+
+
+def _collapse_links(fids, records, aliases):
+    """Paths of one same-size bucket with hardlinks collapsed; aliases collects the others."""
+    devs, inos = records.devs, records.inos
+    units = {}  # inode key -> representative path
+    for fid in fids:
+        path = records.path(fid)
+        key = (devs[fid], inos[fid]) if inos[fid] else path
+        if key in units:
+            aliases[units[key]].append(path)
+        else:
+            units[key] = path
+    return list(units.values())
+
+
+def _streamed_groups(runs, records, aliases, stopped):
+    for _, fids in runs.groups():
+        if stopped():
+            break
+        group = _collapse_links(fids, records, aliases)
+        if len(group) > 1:
+            yield group
+
+
+def group_by_size(files, stop_event=None, bus=None, records=None, tick=None, memory_limit=None, spill_dir=None,
+                  columnar=True):
+    """Group FileRecords (or plain paths, which are stat'ed here) by size.
+
+    Files are collected in a FileTable (a FileTable passed in is used as is) and
+    bucketed by sorting integer file IDs on the size column, so no per-file
+    Python objects outlive the grouping. Hardlinks to the same (st_dev, st_ino)
+    always share a size and are collapsed per bucket: only the first path seen
+    is grouped and hashed, the others are returned as its aliases.
+    Returns (groups of 2+ same-size paths, FileTable, {path: [alias paths]}).
+    Repeated paths are counted once; bus.files_seen counts every new path.
+    records, a FileTable that may already hold files (a resumed walk), collects
+    the files instead of a new table; tick() is called after each new file.
+
+    With memory_limit (bytes), the sort is done in runs spilled to spill_dir
+    (see spill.py) and the groups are a generator yielding them smallest size
+    first as the runs merge; aliases fill in as the groups are consumed.
+    Otherwise, with columnar set and NumPy installed, the buckets are found
+    with array sorts (see columnar.py); the result is the same.
+    """
+    stopped = lambda: stop_event is not None and stop_event.is_set()
+    if isinstance(files, FileTable):
+        records = files
+        if bus is not None:
+            bus.add(files_seen=len(records))
+    else:
+        records = FileTable() if records is None else records
+        if bus is not None and records:
+            bus.add(files_seen=len(records))
+        for item in files:
+            if stopped():
+                break
+            rec = stat_record(item) if isinstance(item, str) else item
+            if rec is None or rec.path in records:
+                continue
+            records.add(rec)
+            if bus is not None:
+                bus.add(files_seen=1)
+            if tick is not None:
+                tick()
+
+    sizes = records.sizes
+    aliases = defaultdict(list)
+    if memory_limit is not None:
+        runs = SizeRuns(memory_limit, spill_dir)
+        for fid in records.ids():
+            runs.add(sizes[fid], fid)
+        return _streamed_groups(runs, records, aliases, stopped), records, aliases
+    if columnar and np is not None and not stopped():
+        groups, aliases = size_groups(records)
+        return groups, records, aliases
+
+    order = sorted(records.ids(), key=sizes.__getitem__)  # stable: walk order within a size
+    groups = []
+    start = 0
+    while start < len(order) and not stopped():
+        size = sizes[order[start]]
+        end = start + 1
+        while end < len(order) and sizes[order[end]] == size:
+            end += 1
+        if end - start > 1:
+            group = _collapse_links(order[start:end], records, aliases)
+            if len(group) > 1:
+                groups.append((order[start], group))
+        start = end
+    groups.sort(key=lambda g: g[0])  # first-seen order, as the walk produced them
+    return [g for _, g in groups], records, aliases
+
+
+def reclaimable_bytes(group, records):
+    """Bytes freed by keeping one copy: hardlinked paths share storage and count once.
+
+    Near-duplicate groups have members of different sizes; the largest is counted as kept.
+    Archive members cannot be removed, so only ordinary files are counted.
+    """
+    units = {inode_key(records[f]): records[f].size for f in group if f in records and not is_member(f)}
+    if len(units) < 2:
+        return 0
+    return sum(units.values()) - max(units.values())
+
+
+# =================== HASHING ===================
+def make_hash_executor(workers, use_processes=False, start_method=None):
+    """Thread pool by default; hashlib releases the GIL, so threads already overlap I/O and digests."""
+    if use_processes:
+        if start_method is None or start_method in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+        log_error(f"Process pool needs the {start_method} start method; hashing with threads instead")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash")
+
+
+def hash_groups(candidate_groups, records, options, stop_event=None, bus=None, roots=(), on_group=None,
+                entries=None, tick=None):
+    """Split same-size groups into byte-identical duplicate groups; return [(paths, digest)].
+
+    Files move through buckets of candidates that agree so far: head (quick) hash,
+    then tail + strided middle samples for large files, then verification. Quick
+    jobs are queued for every group up front and follow-up stages are pushed to the
+    front of the queue as soon as a bucket resolves, so stages overlap across groups.
+    Reads are queued per device (see scheduler.py): spinning disks get one reader
+    fed in inode order and verify with per-file hashes instead of interleaved
+    lockstep reads.
+    Cache lookups and writes stay on the calling thread. Counters on bus advance
+    by file and byte as each candidate is resolved, and bus.metrics collects
+    busy time, bytes read and cache hits per job type (hash.quick, hash.sample,
+    hash.full, hash.lockstep). on_group(paths, digest) is
+    called on the calling thread as each group is confirmed.
+
+    entries ({path: [quick, sample, full]}) is filled in place with every digest
+    computed; digests already in it are trusted like cache hits, which is how a
+    checkpointed scan skips finished work. tick() is called between batches.
+
+    candidate_groups may also be an iterator (the spilled size groups of
+    group_by_size()): groups are then pulled only as the read queue drains,
+    and the progress totals grow as they arrive.
+    """
+    stop_event = stop_event or threading.Event()
+    bus = bus or ProgressBus()
+    duplicates = []
+    bus.set_totals(0, 0)
+    bus.set_stage(STAGE_HASH)
+    metrics = bus.metrics
+    metrics.set_workers(STAGE_HASH, options.workers)
+
+    cache = open_hash_cache(options.cache_path, options.algorithm) if options.cache_path else None
+    entries = {} if entries is None else entries  # path -> [quick, sample, full] digests known so far
+
+    jobs = IOScheduler(options.workers, options.device_depth, metrics)  # (bucket id, path or paths, stage)
+    buckets = {}  # bucket id -> [stage, outstanding jobs, digest -> files]
+    inflight = {}  # future -> job
+    max_inflight = options.workers * 4
+    next_bucket = 0
+
+    def cached(f, stage):
+        entry = entries.get(f)
+        if entry is None:
+            entry = entries[f] = list(cache.get(records[f])) if cache else [None, None, None]
+        return entry[stage]
+
+    def resolve(files):
+        bus.add(files_done=len(files), bytes_done=sum(records[f].size for f in files))
+
+    def confirm(files):
+        # Strongest digest known: full, else the sample (verify="none"), else the quick
+        # hash, which covers the whole file for files of up to 64 KB.
+        digest = next((d for d in reversed(entries[files[0]]) if d), None)
+        duplicates.append((files, digest))
+        if on_group is not None:
+            on_group(files, digest)
+        resolve(files)
+        bus.add(groups=1)
+
+    def store(f, stage, h):
+        entry = entries[f]
+        if entry[stage] is None and h:
+            entry[stage] = h
+            if cache:
+                cache.put(f, records[f], *entry)
+
+    def open_bucket(files, stage, front=True):
+        nonlocal next_bucket
+        size = records[files[0]].size
+        if stage == STAGE_SAMPLE and size <= SAMPLE_MIN_SIZE:
+            stage = STAGE_FULL
+        if stage == STAGE_FULL and (size <= QUICK_HASH_BYTES or (options.verify == "none" and size > SAMPLE_MIN_SIZE)):
+            # The quick hash already covered the whole file, or sampled fingerprints are trusted.
+            confirm(files)
+            return
+        bid = next_bucket
+        next_bucket += 1
+        if (stage == STAGE_FULL and options.verify == "compare" and len(files) <= LOCKSTEP_MAX_FILES
+                and jobs.kind(records[files[0]]) != KIND_ROTATIONAL
+                and any(cached(f, STAGE_FULL) is None for f in files)
+                and not any(is_member(f) for f in files)):  # members come pre-hashed by archives.hash_members()
+            new_jobs = [(bid, tuple(files), STAGE_LOCKSTEP)]
+        else:
+            new_jobs = [(bid, f, stage) for f in files]
+        buckets[bid] = [stage, len(new_jobs), defaultdict(list)]
+        for job in new_jobs:
+            f = job[1]
+            jobs.push(job, records[f[0] if job[2] == STAGE_LOCKSTEP else f], front)
+
+    def complete(bid, f, stage, h):
+        bucket = buckets[bid]
+        if stage == STAGE_LOCKSTEP:
+            matched = set()
+            for digest, members in h or ():
+                for m in members:
+                    store(m, STAGE_FULL, digest)
+                matched.update(members)
+                confirm(members)
+            resolve([m for m in f if m not in matched])
+        else:
+            store(f, stage, h)
+            if h:
+                bucket[2][h].append(f)
+            else:
+                resolve([f])
+        bucket[1] -= 1
+        if bucket[1] == 0:
+            del buckets[bid]
+            for files in bucket[2].values():
+                if len(files) < 2:
+                    resolve(files)
+                elif stage == STAGE_FULL:
+                    confirm(files)
+                else:
+                    open_bucket(files, stage + 1)
+
+    def submit(f, stage):
+        algorithm = options.algorithm
+        if stage == STAGE_QUICK:
+            return executor.submit(timed_call, file_hash, f, quick=True, algorithm=algorithm)
+        if stage == STAGE_SAMPLE:
+            return executor.submit(timed_call, sample_hash, f, algorithm=algorithm)
+        if stage == STAGE_FULL:
+            return executor.submit(timed_call, file_hash, f, quick=False, algorithm=algorithm)
+        return executor.submit(timed_call, lockstep_compare, f, algorithm=algorithm)
+
+    def bytes_read(f, stage):
+        # What each job type reads; lockstep is an upper bound, as it stops at the first difference.
+        if stage == STAGE_LOCKSTEP:
+            return sum(records[m].size for m in f)
+        size = records[f].size
+        if stage == STAGE_QUICK:
+            return min(size, QUICK_HASH_BYTES)
+        if stage == STAGE_SAMPLE:
+            return min(max(0, size - QUICK_HASH_BYTES), SAMPLE_COUNT * SAMPLE_BYTES + TAIL_BYTES)
+        return size
+
+    streamed = not isinstance(candidate_groups, (list, tuple))
+    if not streamed and options.columnar and np is not None:
+        # Groups whose quick digests are all known (cache, checkpoint) are split in one
+        # vectorized pass: unique files resolve at once and the rest go on to sampling.
+        known, rest = [], []
+        for group in candidate_groups:
+            (known if all(cached(f, STAGE_QUICK) is not None for f in group) else rest).append(group)
+        if known:
+            count = sum(len(g) for g in known)
+            bus.add(files_total=count, bytes_total=sum(records[f].size for g in known for f in g))
+            metrics.add(STAGE_HASH, files=count)
+            if cache:
+                bus.add(cache_hits=count)
+                metrics.add(JOB_METRICS[STAGE_QUICK], cache_hits=count)
+            same, unique = split_by_digest(known, lambda f: entries[f][STAGE_QUICK])
+            resolve(unique)
+            for files in same:
+                open_bucket(files, STAGE_SAMPLE, front=False)
+        candidate_groups = rest
+    pending = iter(candidate_groups)
+
+    def feed():
+        # A list is queued whole, so the scheduler can order every read; a stream is
+        # pulled only while the queue is short, keeping memory to the groups in flight.
+        nonlocal pending
+        while pending is not None and not (streamed and len(jobs) >= max_inflight * 2):
+            group = next(pending, None)
+            if group is None:
+                pending = None
+                break
+            bus.add(files_total=len(group), bytes_total=sum(records[f].size for f in group))
+            metrics.add(STAGE_HASH, files=len(group))
+            open_bucket(group, STAGE_QUICK, front=False)
+
+    feed()
+    executor = make_hash_executor(options.workers, options.use_processes, options.start_method)
+    try:
+        while (jobs or inflight or pending is not None) and not stop_event.is_set():
+            if tick is not None:
+                tick()
+            feed()
+            while jobs and len(inflight) < max_inflight:
+                job = jobs.pop()
+                if job is None:
+                    break  # every device with queued reads is at its queue depth
+                bid, f, stage = job
+                h = cached(f, stage) if stage != STAGE_LOCKSTEP else None
+                if cache:
+                    if h is not None:
+                        bus.add(cache_hits=1)
+                        metrics.add(JOB_METRICS[stage], cache_hits=1)
+                    else:
+                        misses = len(f) if stage == STAGE_LOCKSTEP else 1
+                        bus.add(cache_misses=misses)
+                        metrics.add(JOB_METRICS[stage], cache_misses=misses)
+                if h is not None:
+                    jobs.done(job)
+                    complete(bid, f, stage, h)
+                else:
+                    inflight[submit(f, stage)] = job
+            if not inflight:
+                continue
+            done, _ = wait(inflight, timeout=0.2, return_when=FIRST_COMPLETED)
+            for fut in done:
+                job = inflight.pop(fut)
+                bid, f, stage = job
+                try:
+                    busy, h = fut.result()
+                    files, nbytes = (len(f) if stage == STAGE_LOCKSTEP else 1), bytes_read(f, stage)
+                    metrics.add(JOB_METRICS[stage], files=files, bytes=nbytes, busy=busy, tasks=1)
+                    jobs.done(job, files, nbytes, busy)
+                except Exception as e:
+                    log_error(f"Hashing failed: {f} | {e}")
+                    jobs.done(job)
+                    h = None
+                complete(bid, f, stage, h)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if cache:
+            try:
+                if not stop_event.is_set():
+                    cache.evict_missing(roots, {(r.dev, r.ino) for r in records.values()})
+                cache.close()
+            except Exception as e:
+                log_error(f"Hash cache update failed: {e}")
+
+    return duplicates
+
+
+def find_duplicates(files, options=None, stop_event=None, bus=None, roots=(), on_group=None, checkpoint=None,
+                    entries=None):
+    """Size-group and hash an iterable of FileRecords or paths, or a FileTable
+    (which then becomes result.records); return a ScanResult.
+
+    Each group lists its hashed files followed by their hardlink aliases.
+    roots are the scanned targets, used to evict cache entries of vanished files.
+    Progress is published on bus (a ProgressBus) for the caller to poll.
+    on_group([FileRecord, ...], digest) is called as each group is confirmed,
+    so reports can be streamed while the scan runs.
+    If stop_event is set mid-scan, the groups confirmed so far are returned.
+    With a checkpoint (checkpoint.ScanCheckpoint), walked files and finished
+    digests are saved periodically and on stop, and the checkpoint is removed
+    once the scan completes.
+    entries, a dict, collects {path: [quick, sample, full]} for every file a
+    digest was computed or looked up for, hardlink aliases included (see
+    shards.py); a checkpoint brings its own.
+    With options.group_memory set, size groups stream from disk runs and are
+    hashed smallest size first, so result.groups follow size order rather
+    than walk order.
+    """
+    options = options or ScanOptions()
+    new_hasher(options.algorithm)  # fail fast on an unknown or uninstalled algorithm
+    bus = bus or ProgressBus()
+    bus.set_stage(STAGE_WALK)
+    tick = checkpoint.tick if checkpoint is not None else None
+    candidate_groups, records, aliases = group_by_size(
+        files, stop_event, bus, checkpoint.records if checkpoint is not None else None, tick,
+        options.group_memory, options.spill_dir, options.columnar)
+    result = ScanResult(records=records)
+    bus.metrics.add(STAGE_WALK, files=len(records))
+    if checkpoint is not None and not (stop_event is not None and stop_event.is_set()):
+        checkpoint.walked()
+
+    def emit(files, digest):
+        group = [p for f in files for p in (f, *aliases.get(f, ()))]
+        result.groups.append(group)
+        result.digests.append(digest)
+        if on_group is not None:
+            on_group([records[p] for p in group], digest)
+
+    if checkpoint is not None:
+        entries = checkpoint.entries
+    elif entries is None:
+        entries = {}
+    if options.archives and candidate_groups:
+        # Zip headers rule out members with a unique CRC for free; the rest are
+        # hashed one archive at a time and then look like cache hits below.
+        candidate_groups = split_by_crc(candidate_groups)
+        bus.set_stage(STAGE_HASH)
+        hash_members([f for g in candidate_groups for f in g], options.algorithm, entries, options.workers,
+                     stop_event, bus.metrics)
+    if candidate_groups and not (stop_event is not None and stop_event.is_set()):
+        hash_groups(candidate_groups, records, options, stop_event, bus, roots, on_group=emit,
+                    entries=entries, tick=tick)
+    result.stopped = stop_event is not None and stop_event.is_set()
+    for f, same in aliases.items():
+        if f in entries:
+            for alias in same:
+                entries.setdefault(alias, entries[f])
+    if checkpoint is not None:
+        checkpoint.finish(result.stopped)
+    bus.set_stage(STAGE_DONE)
+    return result
+
+
+def scan(paths, options=None, stop_event=None, bus=None, on_group=None, checkpoint=None, entries=None):
+    """Walk the given files/folders and return a ScanResult with their duplicate groups.
+
+    A checkpoint past its walk stage supplies the walked files instead of a new walk;
+    one stopped mid-walk continues from the folders it had not finished.
+    """
+    options = options or ScanOptions()
+    if checkpoint is not None and checkpoint.stage != STAGE_WALK:
+        files = checkpoint.records
+    else:
+        files = walk(paths, options.exclude, options.follow_symlinks, options.walk_workers, stop_event,
+                     checkpoint.walk_state if checkpoint is not None else None, options.archives)
+    return find_duplicates(files, options, stop_event, bus, roots=paths, on_group=on_group, checkpoint=checkpoint,
+                           entries=entries)
+
+
+# =================== DELETE ===================
+def keeper_first(group, keep_newest=False, records=None):
+    """Order a group so the file to keep (first, or newest by mtime) comes first.
+
+    Archive members are left out: they can be neither removed nor kept in place of a file.
+    """
+    group = [f for f in group if not is_member(f)]
+    if not keep_newest:
+        return group
+
+    def mtime(f):
+        rec = records.get(f) if records else None
+        return rec.mtime_ns if rec else os.stat(f).st_mtime_ns
+
+    return sorted(group, key=mtime, reverse=True)
+
+
+def select_for_deletion(groups, keep_newest=False, is_selected=None, records=None):
+    """Pick the files to remove from each group, keeping the first or newest one.
+
+    Returns (files to delete, skipped files). Office temp files (~$...) are skipped;
+    is_selected(path) lets a caller veto individual files. records ({path: FileRecord})
+    supplies modification times captured at scan time.
+    """
+    to_delete = []
+    skipped = []
+    for lst in groups:
+        for f in keeper_first(lst, keep_newest, records)[1:]:
+            if is_selected is not None and not is_selected(f):
+                continue
+            if os.path.basename(f).startswith("~$"):
+                skipped.append(f)
+                log_error(f"Skipped temp file: {f}")
+                continue
+            to_delete.append(f)
+    return to_delete, skipped
@@ -0,0 +1,285 @@
+"""
+Compact path -> FileRecord table for very large scans.
+
+A dict of FileRecords costs a few hundred bytes per file (path string,
+namedtuple, ints, dict slot). FileTable keeps the same mapping interface but
+stores files column-wise: directory prefixes are interned once, names are
+packed into one bytearray, sizes/mtimes/devices/inodes live in array.array
+columns, and the path lookup is an open-addressing table of integer file IDs.
+That is about 50 bytes per file plus the name itself, and FileRecords are
+only built when a file is looked up. A per-folder list of file IDs and a
+folder -> subfolder index let remove_tree() drop a subtree without visiting
+the rest of the table. Removed files leave holes until they outnumber the
+live ones, when the table is compacted.
+"""
+
+import os
+from array import array
+from collections.abc import MutableMapping
+
+from .walker import FileRecord
+
+_SEPARATORS = "".join({os.sep, os.altsep or os.sep, "/"})
+
+
+def _split(path):
+    """(prefix including the last separator, name); prefix + name == path exactly."""
+    i = max(path.rfind(sep) for sep in _SEPARATORS)
+    return path[:i + 1], path[i + 1:]
+
+
+def _prefixes(folder):
+    """The spellings folder can have as a directory prefix: with each separator appended."""
+    base = folder.rstrip(_SEPARATORS)
+    return {base + sep for sep in _SEPARATORS} if base else {folder}
+
+
+class FileTable(MutableMapping):
+    """Mapping of path -> FileRecord with integer file IDs and column storage.
+
+    Removing a file leaves a hole rather than renumbering the others, so file
+    IDs stay stable until the holes make up more than COMPACT_RATIO of the
+    IDs (and at least COMPACT_MIN of them): then a removal compacts the
+    table, renumbering the remaining files.
+    """
+
+    _EMPTY = -1
+    _REMOVED = -2
+    _NO_DIR = 0xFFFFFFFF
+    COMPACT_RATIO = 0.5
+    COMPACT_MIN = 4096
+
+    def __init__(self, records=()):
+        self.dirs = []  # interned directory prefixes, by dir ID
+        self._dir_ids = {}
+        self._names = bytearray()
+        self._name_start = array("Q")
+        self._name_len = array("H")
+        self._dir = array("I")
+        self.sizes = array("q")
+        self.mtimes = array("q")
+        self.devs = array("Q")
+        self.inos = array("Q")
+        self._hashes = array("I")  # low 32 bits of hash(path), for probing and regrowth
+        self._slots = array("i", [self._EMPTY]) * 8
+        self._used_slots = 0  # live + removed markers, for the load factor
+        self._live = 0
+        self._dir_files = []  # dir ID -> array of file IDs added under it (removed ones included)
+        self._subdirs = {}  # folder prefix -> prefixes on the way down to interned folders
+        for rec in records:
+            self.add(rec)
+
+    # ---------- IDs ----------
+    def path(self, fid):
+        start = self._name_start[fid]
+        name = self._names[start:start + self._name_len[fid]].decode("utf-8", "surrogatepass")
+        return self.dirs[self._dir[fid]] + name
+
+    def paths(self, fids):
+        """Paths of many file IDs; much cheaper per file than path() when names are ASCII."""
+        dirs, folder, start, length = self.dirs, self._dir, self._name_start, self._name_len
+        if self._names.isascii():
+            # Byte offsets are character offsets, so the names are decoded once and sliced.
+            text = self._names.decode("ascii")
+            return [dirs[folder[fid]] + text[start[fid]:start[fid] + length[fid]] for fid in fids]
+        return [self.path(fid) for fid in fids]
+
+    def record(self, fid):
+        return FileRecord(self.path(fid), self.sizes[fid], self.mtimes[fid], self.devs[fid], self.inos[fid])
+
+    def ids(self):
+        """IDs of the files currently in the table."""
+        return (fid for fid in range(len(self._dir)) if self._dir[fid] != self._NO_DIR)
+
+    def id_of(self, path):
+        """File ID for path, or None."""
+        fid = self._slots[self._find(path, hash(path) & 0xFFFFFFFF)]
+        return fid if fid >= 0 else None
+
+    def _find(self, path, h):
+        """Slot holding path, or the empty slot where it would go."""
+        mask = len(self._slots) - 1
+        i = h & mask
+        while True:
+            fid = self._slots[i]
+            if fid == self._EMPTY:
+                return i
+            if fid >= 0 and self._hashes[fid] == h and self.path(fid) == path:
+                return i
+            i = (i + 1) & mask
+
+    def _link_dir(self, prefix):
+        """Record prefix under each of its parent folders, up to one already indexed."""
+        child = prefix
+        while True:
+            parent = _split(child.rstrip(_SEPARATORS))[0]
+            if not parent or parent == child:
+                return
+            siblings = self._subdirs.get(parent)
+            if siblings is not None:
+                siblings.add(child)
+                return
+            self._subdirs[parent] = {child}
+            child = parent
+
+    def _build_tree_index(self):
+        self._dir_files = [array("I") for _ in self.dirs]
+        self._subdirs = {}
+        for fid in self.ids():
+            self._dir_files[self._dir[fid]].append(fid)
+        for prefix in self.dirs:
+            self._link_dir(prefix)
+
+    def _grow(self):
+        self._reindex(len(self._slots) * 2)
+
+    def _reindex(self, capacity):
+        slots = array("i", [self._EMPTY]) * capacity
+        mask = len(slots) - 1
+        for fid in self.ids():
+            i = self._hashes[fid] & mask
+            while slots[i] != self._EMPTY:
+                i = (i + 1) & mask
+            slots[i] = fid
+        self._slots = slots
+        self._used_slots = self._live
+
+    # ---------- mapping ----------
+    def add(self, rec):
+        """Insert or update a FileRecord; returns its file ID."""
+        h = hash(rec.path) & 0xFFFFFFFF
+        slot = self._find(rec.path, h)
+        fid = self._slots[slot]
+        if fid >= 0:
+            self.sizes[fid], self.mtimes[fid] = rec.size, rec.mtime_ns
+            self.devs[fid], self.inos[fid] = rec.dev, rec.ino
+            return fid
+        prefix, name = _split(rec.path)
+        dir_id = self._dir_ids.get(prefix)
+        if dir_id is None:
+            dir_id = self._dir_ids[prefix] = len(self.dirs)
+            self.dirs.append(prefix)
+            self._dir_files.append(array("I"))
+            self._link_dir(prefix)
+        encoded = name.encode("utf-8", "surrogatepass")
+        fid = len(self._dir)
+        self._name_start.append(len(self._names))
+        self._name_len.append(len(encoded))
+        self._names += encoded
+        self._dir.append(dir_id)
+        self.sizes.append(rec.size)
+        self.mtimes.append(rec.mtime_ns)
+        self.devs.append(rec.dev)
+        self.inos.append(rec.ino)
+        self._hashes.append(h)
+        self._dir_files[dir_id].append(fid)
+        self._slots[slot] = fid
+        self._live += 1
+        self._used_slots += 1
+        if self._used_slots * 3 > len(self._slots) * 2:
+            self._grow()
+        return fid
+
+    def __setitem__(self, path, rec):
+        if rec.path != path:
+            rec = rec._replace(path=path)
+        self.add(rec)
+
+    def __getitem__(self, path):
+        fid = self._slots[self._find(path, hash(path) & 0xFFFFFFFF)]
+        if fid < 0:
+            raise KeyError(path)
+        return self.record(fid)
+
+    def __delitem__(self, path):
+        slot = self._find(path, hash(path) & 0xFFFFFFFF)
+        fid = self._slots[slot]
+        if fid < 0:
+            raise KeyError(path)
+        self._remove(slot, fid)
+        self._maybe_compact()
+
+    def _remove(self, slot, fid):
+        self._slots[slot] = self._REMOVED
+        self._dir[fid] = self._NO_DIR
+        self._live -= 1
+
+    def remove_tree(self, folder, keep=()):
+        """Remove every file below folder, except below the folders in keep; returns the count.
+
+        Folders are matched by whole name, so removing /data/a leaves /data/ab
+        alone, and only the folders below folder are visited.
+        """
+        skip = {p for k in keep for p in _prefixes(k)}
+        stack = list(_prefixes(folder))
+        visited = set()
+        removed = 0
+        while stack:
+            prefix = stack.pop()
+            if prefix in skip or prefix in visited:
+                continue
+            visited.add(prefix)
+            dir_id = self._dir_ids.get(prefix)
+            if dir_id is not None:
+                for fid in self._dir_files[dir_id]:
+                    if self._dir[fid] == dir_id:
+                        self._remove(self._find(self.path(fid), self._hashes[fid]), fid)
+                        removed += 1
+                self._dir_files[dir_id] = array("I")
+            stack.extend(self._subdirs.get(prefix, ()))
+        self._maybe_compact()
+        return removed
+
+    def _maybe_compact(self):
+        holes = len(self._dir) - self._live
+        if holes >= self.COMPACT_MIN and holes > len(self._dir) * self.COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Rebuild the columns, folders and probe table from the live files only; file IDs change."""
+        fresh = FileTable(self.values())
+        self.__dict__.update(fresh.__dict__)
+
+    def __contains__(self, path):
+        return isinstance(path, str) and self._slots[self._find(path, hash(path) & 0xFFFFFFFF)] >= 0
+
+    def __iter__(self):
+        return (self.path(fid) for fid in self.ids())
+
+    def __len__(self):
+        return self._live
+
+    def values(self):
+        """FileRecords, built one at a time (an iterator, not a view)."""
+        return (self.record(fid) for fid in self.ids())
+
+    def items(self):
+        return ((rec.path, rec) for rec in self.values())
+
+    def __getstate__(self):
+        # hash(str) is salted per process, so pickles leave out the hashes and the
+        # probe table and __setstate__ rebuilds them.
+        state = self.__dict__.copy()
+        del state["_hashes"], state["_slots"], state["_dir_files"], state["_subdirs"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._hashes = array("I", (hash(self.path(fid)) & 0xFFFFFFFF if self._dir[fid] != self._NO_DIR else 0
+                                   for fid in range(len(self._dir))))
+        capacity = 8
+        while capacity * 2 <= self._live * 3:
+            capacity *= 2
+        self._reindex(capacity)
+        self._build_tree_index()
+
+    def copy(self):
+        other = FileTable.__new__(FileTable)
+        other.__dict__.update({k: (v[:] if isinstance(v, (array, bytearray, list)) else v)
+                               for k, v in self.__dict__.items()})
+        other._dir_ids = dict(self._dir_ids)
+        other._build_tree_index()
+        return other
+
+    def __repr__(self):
+        return f"<FileTable {self._live} files in {len(self.dirs)} folders>"
@@ -0,0 +1,204 @@
+"""File digests and comparisons for the quick, sampled and full verification stages."""
+
+import hashlib
+import mmap
+import os
+from collections import defaultdict
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+QUICK_HASH_BYTES = 65536
+READ_CHUNK = 1024 * 1024
+MMAP_MIN_SIZE = 8 * 1024 * 1024  # below this, readinto() a reused buffer is as fast as mapping
+
+# =================== ALGORITHMS ===================
+DEFAULT_ALGORITHM = "md5"
+ALGORITHMS = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "blake2b": lambda: hashlib.blake2b(digest_size=32),
+}
+if xxhash is not None:
+    ALGORITHMS["xxh3_128"] = xxhash.xxh3_128
+    ALGORITHMS["xxh64"] = xxhash.xxh64
+if blake3 is not None:
+    ALGORITHMS["blake3"] = blake3.blake3
+
+
+def available_algorithms():
+    return list(ALGORITHMS)
+
+
+def new_hasher(algorithm=DEFAULT_ALGORITHM):
+    """Return a fresh hash object; raise ValueError for unknown or uninstalled algorithms."""
+    try:
+        return ALGORITHMS[algorithm]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown or unavailable hash algorithm {algorithm!r}; "
+            f"available: {', '.join(ALGORITHMS)}"
+        ) from None
+
+
+def _update_from_file(hasher, f, size, chunk_size):
+    """Feed a whole open file into hasher without allocating a bytes object per chunk."""
+    if size >= MMAP_MIN_SIZE:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for pos in range(0, len(mm), chunk_size * 16):
+                        hasher.update(view[pos:pos + chunk_size * 16])
+                finally:
+                    view.release()
+            return
+        except (OSError, ValueError):
+            f.seek(0)  # e.g. network filesystems without mmap support
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        hasher.update(view[:n])
+
+
+def file_hash(path, chunk_size=READ_CHUNK, quick=True, algorithm=DEFAULT_ALGORITHM):
+    """Hex digest of the first 64 KB (quick) or of the whole file; None if unreadable."""
+    hasher = new_hasher(algorithm)
+    try:
+        with open(path, "rb") as f:
+            if quick:
+                hasher.update(f.read(QUICK_HASH_BYTES))
+            else:
+                _update_from_file(hasher, f, os.fstat(f.fileno()).st_size, chunk_size)
+    except Exception:
+        return None
+    return hasher.hexdigest()
+
+
+# =================== SAMPLED FINGERPRINTS ===================
+SAMPLE_MIN_SIZE = 1024 * 1024  # smaller files go straight from the quick hash to verification
+TAIL_BYTES = 65536  # container indexes (MP4 moov, ZIP central directory) live at the end
+SAMPLE_COUNT = 16
+SAMPLE_BYTES = 16384
+LOCKSTEP_BLOCK = 262144
+LOCKSTEP_MAX_FILES = 64  # larger groups are verified with per-file full hashes instead
+
+
+def sample_hash(path, algorithm=DEFAULT_ALGORITHM):
+    """Digest of the tail plus evenly strided middle samples; None if unreadable.
+
+    Together with the head-only quick hash this separates large files that share
+    a header (video containers, disk images) without reading them in full.
+    """
+    hasher = new_hasher(algorithm)
+    try:
+        with open(path, "rb") as f:
+            for start, end in sample_ranges(os.fstat(f.fileno()).st_size):
+                f.seek(start)
+                hasher.update(f.read(end - start))
+    except Exception:
+        return None
+    return hasher.hexdigest()
+
+
+def sample_ranges(size):
+    """(start, end) byte ranges read by sample_hash(): strided middle samples, then the tail."""
+    start, end = QUICK_HASH_BYTES, max(QUICK_HASH_BYTES, size - TAIL_BYTES)
+    stride = (end - start) // (SAMPLE_COUNT + 1)
+    ranges = []
+    if stride > 0:
+        for i in range(1, SAMPLE_COUNT + 1):
+            offset = start + i * stride
+            ranges.append((offset, min(size, offset + SAMPLE_BYTES)))
+    ranges.append((end, min(size, end + TAIL_BYTES)))
+    return ranges
+
+
+def stream_digests(f, size, algorithm=DEFAULT_ALGORITHM, chunk_size=READ_CHUNK):
+    """[quick, sample, full] hex digests of a forward-only stream of size bytes, in one pass.
+
+    They equal file_hash(quick=True), sample_hash() and file_hash(quick=False)
+    of the same bytes. sample is None for files of up to SAMPLE_MIN_SIZE,
+    which the scan never samples (their ranges could overlap).
+    """
+    quick, full = new_hasher(algorithm), new_hasher(algorithm)
+    sample = new_hasher(algorithm) if size > SAMPLE_MIN_SIZE else None
+    ranges = sample_ranges(size) if sample is not None else []
+    pos = r = 0
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            break
+        view = memoryview(block)
+        end = pos + len(block)
+        full.update(view)
+        if pos < QUICK_HASH_BYTES:
+            quick.update(view[:QUICK_HASH_BYTES - pos])
+        while r < len(ranges) and ranges[r][0] < end:
+            lo, hi = ranges[r]
+            sample.update(view[max(lo, pos) - pos:min(hi, end) - pos])
+            if hi > end:
+                break
+            r += 1
+        pos = end
+    return [quick.hexdigest(), sample.hexdigest() if sample is not None else None, full.hexdigest()]
+
+
+def lockstep_compare(paths, block_size=LOCKSTEP_BLOCK, algorithm=DEFAULT_ALGORITHM):
+    """Read all files block by block in lockstep and return [(full digest, paths)] for
+    each set of 2+ byte-identical files.
+
+    A file is closed as soon as its block differs from every other member, so a
+    non-duplicate costs at most one block past the point where it diverges. The
+    digests of surviving files equal file_hash(path, quick=False, algorithm=algorithm).
+    """
+    handles = {}
+    hashers = {}
+    for p in paths:
+        try:
+            handles[p] = open(p, "rb")
+            hashers[p] = new_hasher(algorithm)
+        except OSError:
+            continue
+
+    def drop(members):
+        for p in members:
+            handles.pop(p).close()
+
+    results = []
+    groups = [list(handles)] if len(handles) > 1 else []
+    try:
+        while groups:
+            next_groups = []
+            for group in groups:
+                by_block = defaultdict(list)
+                for p in group:
+                    try:
+                        block = handles[p].read(block_size)
+                    except OSError:
+                        drop([p])
+                        continue
+                    hashers[p].update(block)
+                    by_block[block].append(p)
+                for block, members in by_block.items():
+                    if len(members) < 2:
+                        drop(members)
+                    elif not block:
+                        results.append((hashers[members[0]].hexdigest(), members))
+                        drop(members)
+                    else:
+                        next_groups.append(members)
+            groups = next_groups
+    finally:
+        drop(list(handles))
+    return results
@@ -0,0 +1,224 @@
+"""
+Per-stage scan metrics and optional profiling hooks.
+
+Every ProgressBus carries a ScanMetrics. set_stage() times the top-level stages
+(walk, hash, delete) and the engine adds per-job figures under "stage.job"
+names (hash.quick, hash.sample, hash.full, hash.lockstep, ...): files touched,
+bytes read, cache hits and misses, and worker busy time. The I/O scheduler adds
+the same figures per device, with the device's queue depth as its workers. Worker utilisation is
+busy time over wall time times workers, which shows whether a storage tier is
+starved (low utilisation: add workers) or saturated (high utilisation, falling
+MB/s per worker: fewer workers or larger chunks).
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from . import __version__
+
+COUNTERS = ("files", "bytes", "cache_hits", "cache_misses", "tasks", "busy")
+TABLE_COLUMNS = ("Stage", "Wall", "Files", "Read", "MB/s", "MB/s/worker", "Cache hits", "Workers", "Utilisation")
+
+
+def timed_call(fn, *args, **kwargs):
+    """(seconds, fn(*args, **kwargs)); module level so process pools can pickle it."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+class ScanMetrics:
+    """Thread-safe per-stage counters; as_dict() is the machine-readable form."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}  # name -> {"wall", "workers", counters...}
+            self.devices = {}  # device label -> {"kind", "workers", "wall", counters...}
+            self.extra = {}  # e.g. tracemalloc results
+            self.started_at = datetime.now().isoformat()
+            self._current = None
+            self._stage_started = None
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"wall": 0.0, "workers": None, **dict.fromkeys(COUNTERS, 0)}
+            stage["busy"] = 0.0
+        return stage
+
+    def begin(self, name):
+        """End the running top-level stage (if any) and start timing name (None: stop timing)."""
+        now = time.perf_counter()
+        with self._lock:
+            if self._current is not None:
+                self._stage(self._current)["wall"] += now - self._stage_started
+            self._current, self._stage_started = name, now
+            if name is not None:
+                self._stage(name)
+
+    def end(self):
+        self.begin(None)
+
+    def set_workers(self, name, workers):
+        with self._lock:
+            self._stage(name)["workers"] = workers
+
+    def add(self, name, **counts):
+        with self._lock:
+            stage = self._stage(name)
+            for key, value in counts.items():
+                stage[key] += value
+
+    def set_device(self, label, **fields):
+        """Replace the figures of one device (wall is the time it had reads in flight)."""
+        with self._lock:
+            self.devices[label] = fields
+
+    def as_dict(self):
+        with self._lock:
+            walls = {name: s["wall"] for name, s in self.stages.items() if "." not in name}
+            if self._current is not None:
+                walls[self._current] += time.perf_counter() - self._stage_started
+            totals = {name: dict(s) for name, s in self.stages.items()}
+            for name, s in self.stages.items():
+                top = name.split(".")[0]
+                if top != name and top in totals:
+                    # A stage's reads, busy time and cache lookups include its jobs'; files do not,
+                    # as one file passes through several job types.
+                    for key in COUNTERS[1:]:
+                        totals[top][key] += s[key]
+            stages = {}
+            for name, s in totals.items():
+                top = name.split(".")[0]
+                wall = walls.get(name, s["wall"])
+                workers = s["workers"] or totals.get(top, {}).get("workers")
+                lookups = s["cache_hits"] + s["cache_misses"]
+                stages[name] = {
+                    **s,
+                    "wall": round(wall, 6),
+                    "busy": round(s["busy"], 6),
+                    "workers": workers,
+                    "files_per_sec": round(s["files"] / wall, 1) if wall else None,
+                    "mb_per_sec": round(s["bytes"] / wall / 1e6, 2) if wall else None,
+                    # Throughput of one busy worker: the figure to compare across chunk sizes.
+                    "mb_per_busy_sec": round(s["bytes"] / s["busy"] / 1e6, 2) if s["busy"] else None,
+                    "cache_hit_rate": round(s["cache_hits"] / lookups, 4) if lookups else None,
+                    "utilisation": (round(s["busy"] / (walls[top] * workers), 4)
+                                    if workers and walls.get(top) else None),
+                }
+            devices = {}
+            for label, d in self.devices.items():
+                wall, busy, nbytes = d["wall"], d["busy"], d["bytes"]
+                devices[label] = {
+                    **d,
+                    "wall": round(wall, 6),
+                    "busy": round(busy, 6),
+                    "files_per_sec": round(d["files"] / wall, 1) if wall else None,
+                    "mb_per_sec": round(nbytes / wall / 1e6, 2) if wall else None,
+                    "mb_per_busy_sec": round(nbytes / busy / 1e6, 2) if busy else None,
+                    "utilisation": round(busy / (wall * d["workers"]), 4) if wall and d["workers"] else None,
+                }
+            return {
+                "tool_version": __version__,
+                "started_at": self.started_at,
+                "total_wall": round(sum(walls.values()), 6),
+                "stages": stages,
+                "devices": devices,
+                **self.extra,
+            }
+
+    def write(self, path, **context):
+        """Write as_dict() plus context (targets, options, ...) as JSON."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**context, **self.as_dict()}, f, indent=2, default=str)
+
+
+def metrics_file(folder, keep=None):
+    """A new per-run metrics path in folder, named after the current time.
+
+    With keep, older run files beyond the newest keep - 1 are removed first.
+    """
+    if keep is not None and os.path.isdir(folder):
+        runs = sorted(f for f in os.listdir(folder) if f.startswith("scan-") and f.endswith(".json"))
+        for name in runs[:max(0, len(runs) - keep + 1)]:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+    return os.path.join(folder, f"scan-{datetime.now():%Y%m%d-%H%M%S-%f}.json")
+
+
+def metrics_rows(data):
+    """Rows of display strings (see TABLE_COLUMNS) for an as_dict() result."""
+    pct = lambda v: f"{v:.0%}" if v is not None else "-"
+    rows = []
+    for name, s in data["stages"].items():
+        rows.append((
+            name,
+            f"{s['wall']:.2f}s" if "." not in name else "-",
+            str(s["files"]),
+            f"{s['bytes'] / 1e6:.1f} MB" if s["bytes"] else "-",
+            f"{s['mb_per_sec']:.1f}" if s["bytes"] and s["mb_per_sec"] is not None else "-",
+            f"{s['mb_per_busy_sec']:.1f}" if s["mb_per_busy_sec"] is not None and s["bytes"] else "-",
+            pct(s["cache_hit_rate"]),
+            str(s["workers"] or "-"),
+            pct(s["utilisation"]),
+        ))
+    for label, d in data.get("devices", {}).items():
+        rows.append((
+            f"{label} ({d['kind']})",
+            f"{d['wall']:.2f}s",
+            str(d["files"]),
+            f"{d['bytes'] / 1e6:.1f} MB" if d["bytes"] else "-",
+            f"{d['mb_per_sec']:.1f}" if d["mb_per_sec"] is not None else "-",
+            f"{d['mb_per_busy_sec']:.1f}" if d["mb_per_busy_sec"] is not None else "-",
+            "-",
+            str(d["workers"]),
+            pct(d["utilisation"]),
+        ))
+    return rows
+
+
+@contextmanager
+def profiled(profile_path=None, trace_memory=False, metrics=None, top=10):
+    """Run the body under cProfile and/or tracemalloc.
+
+    cProfile covers the calling thread (scheduling, grouping, cache and report
+    work); time spent inside pool workers shows up as busy time in the metrics.
+    Stats go to profile_path, readable with pstats or snakeviz. tracemalloc
+    follows every thread; the peak and the top allocation sites are stored
+    under metrics.extra["memory"].
+    """
+    profiler = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if metrics is not None:
+                metrics.extra["memory"] = {
+                    "current_bytes": current,
+                    "peak_bytes": peak,
+                    "top": [{"site": str(stat.traceback), "bytes": stat.size, "blocks": stat.count}
+                            for stat in snapshot.statistics("lineno")[:top]],
+                }
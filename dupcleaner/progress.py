@@ -0,0 +1,100 @@
+"""
+Progress/event bus between the scan engine and its front ends.
+
+The engine only bumps counters under a lock; the GUI (on a Tk timer) or the CLI
+(on a printer thread) polls snapshot() at its own pace, so progress reporting
+costs O(1) per file no matter how many files are scanned.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+
+from .metrics import ScanMetrics
+
+STAGE_IDLE = "idle"
+STAGE_WALK = "walk"
+STAGE_HASH = "hash"
+STAGE_DELETE = "delete"
+STAGE_DONE = "done"
+
+
+@dataclass
+class ProgressSnapshot:
+    stage: str
+    files_seen: int  # files found by the walker / size grouping
+    files_total: int  # candidate files entering the hash pipeline
+    files_done: int  # candidates resolved (unique, unreadable or confirmed duplicate)
+    bytes_total: int
+    bytes_done: int
+    cache_hits: int
+    cache_misses: int
+    groups: int
+    elapsed: float
+
+    @property
+    def fraction(self):
+        if self.bytes_total:
+            return min(1.0, self.bytes_done / self.bytes_total)
+        return 1.0 if self.stage == STAGE_DONE else 0.0
+
+    @property
+    def bytes_per_sec(self):
+        return self.bytes_done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def files_per_sec(self):
+        return self.files_done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta(self):
+        """Seconds left, extrapolated from resolved bytes; None until there is a rate."""
+        rate = self.bytes_per_sec
+        if not rate:
+            return None
+        return max(0.0, (self.bytes_total - self.bytes_done) / rate)
+
+
+class ProgressBus:
+    """Thread-safe scan counters published by the engine and polled by the UI.
+
+    metrics holds the per-stage figures of the current run (see metrics.py);
+    set_stage() times its top-level stages.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = ScanMetrics()
+        self.reset()
+
+    def reset(self):
+        self.metrics.reset()
+        with self._lock:
+            self._stage = STAGE_IDLE
+            self._counters = dict.fromkeys(
+                ("files_seen", "files_total", "files_done", "bytes_total", "bytes_done",
+                 "cache_hits", "cache_misses", "groups"), 0)
+            self._started = time.monotonic()
+            self._stage_started = self._started
+
+    def set_stage(self, stage):
+        self.metrics.begin(None if stage in (STAGE_IDLE, STAGE_DONE) else stage)
+        with self._lock:
+            self._stage = stage
+            self._stage_started = time.monotonic()
+
+    def set_totals(self, files, nbytes):
+        with self._lock:
+            self._counters["files_total"] = files
+            self._counters["bytes_total"] = nbytes
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counters[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            # Rates cover the hash (or delete) stage only, so walking time does not skew the ETA.
+            since = self._stage_started if self._stage in (STAGE_HASH, STAGE_DELETE) else self._started
+            return ProgressSnapshot(stage=self._stage, elapsed=time.monotonic() - since, **self._counters)
@@ -0,0 +1,244 @@
+"""Duplicate report writers and reader shared by the GUI export buttons and the CLI.
+
+JSON Lines and CSV reports are written one group at a time (while a scan is
+still running, if the writer is passed as on_group) and carry size, mtime and
+digest columns, so load_report() can bring a result back without rescanning.
+Both start with the same header (tool, version, timestamp, algorithm); in CSV
+it is a leading "# {...}" comment row. CSV is for exact duplicates only.
+"""
+
+import csv
+import json
+import os
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+from . import APP_NAME, __version__
+from .chunking import PARTIAL_MODE
+from .engine import ScanResult
+from .filetable import FileTable
+from .hashing import DEFAULT_ALGORITHM
+from .similar import PERCEPTUAL_METHODS
+from .utils import log_error
+from .walker import FileRecord, stat_record
+
+WRITE_BUFFER = 1024 * 1024
+REPORT_FORMATS = ("jsonl", "csv", "json", "txt")
+CSV_COLUMNS = ("group", "digest", "size", "mtime_ns", "path")
+CSV_COMMENT = "#"  # starts the header row of a CSV report
+
+
+def _header(algorithm):
+    return {
+        "tool": APP_NAME,
+        "version": __version__,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "algorithm": algorithm,
+    }
+
+
+def report_format(path):
+    """Format implied by a report's extension; unknown extensions are treated as JSON Lines."""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in REPORT_FORMATS else "jsonl"
+
+
+def check_csv_algorithm(fmt, algorithm):
+    """Raise ValueError if a result of this algorithm/mode cannot be written as fmt."""
+    if fmt == "csv" and (algorithm == PARTIAL_MODE or algorithm in PERCEPTUAL_METHODS):
+        raise ValueError(f"CSV reports hold exact duplicates only; save {algorithm} results as JSON Lines or JSON")
+
+
+# =================== STREAMING WRITERS ===================
+class ReportWriter:
+    """Write groups to a JSON Lines or CSV report as they arrive.
+
+    Use as on_group for scan()/find_duplicates(), or call write_group() with
+    lists of FileRecords. Only the current group is held in memory. Similar-image
+    and partial results are refused as CSV, which older versions read back as
+    exact duplicates.
+    """
+
+    def __init__(self, path, algorithm=DEFAULT_ALGORITHM, fmt=None):
+        self.format = fmt or report_format(path)
+        if self.format not in ("jsonl", "csv"):
+            raise ValueError(f"Streaming reports are JSON Lines or CSV, not {self.format!r}")
+        check_csv_algorithm(self.format, algorithm)
+        self.groups = 0
+        self.file = open(path, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER)
+        if self.format == "csv":
+            self.file.write(f"{CSV_COMMENT} {json.dumps(_header(algorithm))}\n")
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(CSV_COLUMNS)
+        else:
+            self.file.write(json.dumps(_header(algorithm)) + "\n")
+
+    def write_group(self, group, digest=None):
+        self.groups += 1
+        if self.format == "csv":
+            self.csv.writerows((self.groups, digest or "", rec.size, rec.mtime_ns, rec.path) for rec in group)
+        else:
+            self.file.write(json.dumps({
+                "group": self.groups,
+                "digest": digest,
+                "files": [{"path": rec.path, "size": rec.size, "mtime_ns": rec.mtime_ns} for rec in group],
+            }) + "\n")
+
+    __call__ = write_group
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_report(groups, path, records, algorithm=DEFAULT_ALGORITHM, digests=None):
+    """Write finished groups of paths in the format implied by path's extension."""
+    fmt = report_format(path)
+    if fmt == "json":
+        write_json_report(groups, path, algorithm)
+    elif fmt == "txt":
+        write_txt_report(groups, path)
+    else:
+        digests = digests or ()
+        with ReportWriter(path, algorithm, fmt) as writer:
+            for i, group in enumerate(groups):
+                recs = [records.get(f) or stat_record(f) or FileRecord(f, 0, 0, 0, 0) for f in group]
+                writer.write_group(recs, digests[i] if i < len(digests) else None)
+
+
+def write_json_report(groups, path, algorithm=DEFAULT_ALGORITHM):
+    """Write groups as JSON; algorithm records the digest so runs can be compared.
+
+    The document is streamed group by group rather than built as one dict.
+    """
+    with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+        f.write("{\n")
+        for key, value in _header(algorithm).items():
+            f.write(f"  {json.dumps(key)}: {json.dumps(value)},\n")
+        f.write('  "duplicates": {')
+        for i, lst in enumerate(groups):
+            f.write(f'{"," if i else ""}\n    "Group {i + 1}": {json.dumps(lst)}')
+        f.write("\n  }\n}\n")
+
+
+def write_partial_report(result, path, top=None):
+    """Write a chunking.PartialResult as JSON: totals, the best top pairs and every group.
+
+    Groups sit under "duplicates" as in write_json_report(), so load_report()
+    and the GUI can read them back; the "partial" algorithm in the header marks
+    files that share only part of their content.
+    """
+    data = _header(PARTIAL_MODE)
+    data["chunker"] = result.chunker
+    data["summary"] = {
+        "files": result.files,
+        "bytes": result.bytes_scanned,
+        "chunks": result.chunks,
+        "unique_chunks": result.unique_chunks,
+        "reclaimable": result.reclaimable,
+        "common_chunks": result.common_chunks,
+        "dropped_pairs": result.dropped_pairs,
+    }
+    data["pairs"] = [asdict(m) for m in result.pairs[:top]]
+    data["groups"] = [{"group": f"Group {i}", "size": g.size, "reclaimable": g.reclaimable, "ratio": g.ratio}
+                      for i, g in enumerate(result.groups, 1)]
+    data["duplicates"] = {f"Group {i}": g.paths for i, g in enumerate(result.groups, 1)}
+    with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+        json.dump(data, f, indent=2)
+
+
+def write_txt_report(groups, path):
+    with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+        for i, lst in enumerate(groups, 1):
+            f.write(f"Group {i} ({len(lst)} files)\n")
+            for file in lst:
+                f.write(f"{file}\n")
+            f.write("\n")
+
+
+# =================== READER ===================
+def _read_groups(path, fmt):
+    """Yield (digest, [(path, size, mtime_ns) or (path, None, None)]) per group."""
+    if fmt == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            if not f.readline().startswith(CSV_COMMENT):
+                f.seek(0)  # a CSV report from before the header row
+            reader = csv.DictReader(f)
+            current, digest, members = None, None, []
+            for row in reader:
+                if row["group"] != current and members:
+                    yield digest, members
+                    members = []
+                current, digest = row["group"], row["digest"] or None
+                members.append((row["path"], int(row["size"]), int(row["mtime_ns"])))
+            if members:
+                yield digest, members
+    elif fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "files" in entry:
+                    yield entry.get("digest"), [(e["path"], e.get("size"), e.get("mtime_ns")) for e in entry["files"]]
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for lst in data.get("duplicates", {}).values():
+            yield None, [(p, None, None) for p in lst]
+
+
+def read_report_header(path):
+    """Tool/version/timestamp/algorithm of a report ({} for a CSV report without its header row)."""
+    fmt = report_format(path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            if fmt == "jsonl":
+                return json.loads(f.readline())
+            if fmt == "csv":
+                line = f.readline()
+                return json.loads(line[1:]) if line.startswith(CSV_COMMENT) else {}
+            if fmt == "json":
+                return {k: v for k, v in json.load(f).items() if k != "duplicates"}
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def load_report(path, check=True):
+    """Read a JSON Lines, CSV or JSON report back into a ScanResult.
+
+    With check, every file is stat'ed (no hashing): files that vanished or whose
+    size/mtime no longer match the report are dropped, and groups left with one
+    file are discarded, so the result is safe to hand to the delete stage.
+    Reports without size/mtime per file (legacy JSON) cannot be checked that
+    way, and a CSV report without its header row may hold similar or partial
+    groups; the result of either has verified set to False.
+    """
+    fmt = report_format(path)
+    if fmt == "txt":
+        raise ValueError("Text reports cannot be loaded; export JSON Lines, CSV or JSON instead")
+    result = ScanResult(records=FileTable())
+    if fmt == "csv" and not read_report_header(path).get("algorithm"):
+        result.verified = False
+    dropped = 0
+    for digest, members in _read_groups(path, fmt):
+        group = []
+        for p, size, mtime_ns in members:
+            if size is None:
+                result.verified = False
+            rec = stat_record(p) if check or size is None else FileRecord(p, size, mtime_ns or 0, 0, 0)
+            if rec is None or (size is not None and (rec.size, rec.mtime_ns) != (size, mtime_ns)):
+                dropped += 1
+                continue
+            result.records.add(rec)
+            group.append(p)
+        if len(group) > 1:
+            result.groups.append(group)
+            result.digests.append(digest)
+    if dropped:
+        log_error(f"Report {path}: {dropped} files missing or changed since the report was written")
+    return result
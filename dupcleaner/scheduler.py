@@ -0,0 +1,177 @@
+"""
+Per-device read scheduling for the hash pipeline.
+
+Pending reads are queued by st_dev. Each device gets a queue depth that suits
+its kind: one reader on a spinning disk, which is then fed in inode order (a
+cheap proxy for on-disk position that needs no extra syscalls), more readers
+on SSDs, and more still on network mounts, where each read is latency bound.
+Devices are served round-robin, so a slow disk never holds up a fast one.
+
+Device kinds come from /sys/block/*/queue/rotational and /proc/self/mountinfo
+on Linux; elsewhere devices are "unknown" and treated like SSDs.
+"""
+
+import heapq
+import os
+import sys
+import time
+from collections import deque
+
+KIND_ROTATIONAL = "rotational"
+KIND_SSD = "ssd"
+KIND_NETWORK = "network"
+KIND_UNKNOWN = "unknown"
+DEVICE_KINDS = (KIND_ROTATIONAL, KIND_SSD, KIND_NETWORK, KIND_UNKNOWN)
+
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs",
+                       "fuse.sshfs", "fuse.rclone", "davfs", "fuse.s3fs"}
+
+_devices = {}  # st_dev -> (label, kind), cached per process
+
+
+def _mountinfo():
+    """{(major, minor): (fstype, source)} from /proc/self/mountinfo."""
+    mounts = {}
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8") as f:
+            for line in f:
+                fields, _, rest = line.partition(" - ")
+                parts, tail = fields.split(), rest.split()
+                if len(parts) < 3 or len(tail) < 2:
+                    continue
+                major, _, minor = parts[2].partition(":")
+                mounts.setdefault((int(major), int(minor)), (tail[0], tail[1]))
+    except (OSError, ValueError):
+        pass
+    return mounts
+
+
+def _rotational(sys_path):
+    """(block device name, True/False/None) for a /sys/dev/block or /sys/class/block entry."""
+    real = os.path.realpath(sys_path)
+    # Partitions have no queue/ of their own; it lives on the parent disk.
+    for folder in (real, os.path.dirname(real)):
+        try:
+            with open(os.path.join(folder, "queue", "rotational"), encoding="ascii") as f:
+                return os.path.basename(real), f.read().strip() == "1"
+        except OSError:
+            continue
+    return os.path.basename(real), None
+
+
+def device_info(dev):
+    """(label, kind) of the device with this st_dev; kind is one of DEVICE_KINDS."""
+    info = _devices.get(dev)
+    if info is not None:
+        return info
+    label, kind = f"dev {dev:#x}", KIND_UNKNOWN
+    if sys.platform.startswith("linux"):
+        major, minor = os.major(dev), os.minor(dev)
+        fstype, source = _mountinfo().get((major, minor), (None, None))
+        if fstype in NETWORK_FILESYSTEMS or (fstype or "").startswith("nfs"):
+            label, kind = source, KIND_NETWORK
+        else:
+            sys_path = f"/sys/dev/block/{major}:{minor}"
+            if not os.path.exists(sys_path) and source and source.startswith("/dev/"):
+                # btrfs and other filesystems on anonymous devices (major 0) report their source instead.
+                sys_path = f"/sys/class/block/{os.path.basename(os.path.realpath(source))}"
+            if os.path.exists(sys_path):
+                label, rotational = _rotational(sys_path)
+                if rotational is not None:
+                    kind = KIND_ROTATIONAL if rotational else KIND_SSD
+    info = _devices[dev] = (label, kind)
+    return info
+
+
+def queue_depths(workers, overrides=()):
+    """{kind: concurrent reads per device}; overrides is a sequence of (kind, depth) pairs."""
+    depths = {
+        KIND_ROTATIONAL: 1,
+        KIND_SSD: workers,
+        KIND_NETWORK: max(4, workers * 2),
+        KIND_UNKNOWN: workers,
+    }
+    depths.update((kind, max(1, int(depth))) for kind, depth in overrides)
+    return depths
+
+
+class _Device:
+    __slots__ = ("label", "kind", "depth", "queue", "inflight", "files", "bytes", "busy", "started", "active")
+
+    def __init__(self, label, kind, depth):
+        self.label, self.kind, self.depth = label, kind, depth
+        self.queue = []  # heap of (priority, order, seq, job)
+        self.inflight = 0
+        self.files = self.bytes = 0
+        self.busy = self.active = 0.0
+        self.started = None  # perf_counter() when the device last went from idle to busy
+
+
+class IOScheduler:
+    """Queues read jobs per device and hands out the ones whose device has a free slot.
+
+    push(job, rec, front) queues a job reading the file described by rec (its
+    device and inode pick the queue and position); front jobs, which finish
+    buckets already being read, go before the rest. pop() returns the next job
+    that may start or None; done(job, files, nbytes, busy) frees its slot.
+    """
+
+    def __init__(self, workers, overrides=(), metrics=None):
+        self.depths = queue_depths(workers, overrides)
+        self.metrics = metrics
+        self._devices = {}  # st_dev -> _Device
+        self._jobs = {}  # id(job) -> st_dev of running jobs
+        self._ready = deque()  # st_dev round-robin order
+        self._seq = 0
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def device(self, rec):
+        dev = self._devices.get(rec.dev)
+        if dev is None:
+            label, kind = device_info(rec.dev)
+            dev = self._devices[rec.dev] = _Device(label, kind, self.depths[kind])
+            self._ready.append(rec.dev)
+        return dev
+
+    def kind(self, rec):
+        return self.device(rec).kind
+
+    def push(self, job, rec, front=False):
+        dev = self.device(rec)
+        self._seq += 1
+        if dev.kind == KIND_ROTATIONAL:
+            order = rec.ino  # sweep the disk in inode order
+        else:
+            order = -self._seq if front else self._seq  # newest front job first, the rest first in, first out
+        heapq.heappush(dev.queue, (0 if front else 1, order, self._seq, job))
+        self._pending += 1
+
+    def pop(self):
+        for _ in range(len(self._ready)):
+            key = self._ready[0]
+            self._ready.rotate(-1)
+            dev = self._devices[key]
+            if dev.queue and dev.inflight < dev.depth:
+                job = heapq.heappop(dev.queue)[3]
+                if not dev.inflight:
+                    dev.started = time.perf_counter()
+                dev.inflight += 1
+                self._pending -= 1
+                self._jobs[id(job)] = key
+                return job
+        return None
+
+    def done(self, job, files=0, nbytes=0, busy=0.0):
+        dev = self._devices[self._jobs.pop(id(job))]
+        dev.inflight -= 1
+        dev.files += files
+        dev.bytes += nbytes
+        dev.busy += busy
+        if not dev.inflight:
+            dev.active += time.perf_counter() - dev.started
+        if self.metrics is not None:
+            self.metrics.set_device(dev.label, kind=dev.kind, workers=dev.depth, files=dev.files,
+                                    bytes=dev.bytes, busy=dev.busy, wall=dev.active)
@@ -0,0 +1,269 @@
+"""
+Portable scan indexes, for finding duplicates across machines.
+
+Each node scans its own disks and writes an index: a JSON Lines file whose
+first line names the node, digest algorithm and scanned roots, followed by one
+line per file with its path, size, mtime and the quick and full digests the
+local scan computed. Files whose size is unique on their node were never read
+and carry no digests.
+
+merge_indexes() combines any number of indexes by size. Files that collide in
+size with a file of another index and still lack a full digest (and cannot be
+told apart by quick digests) are listed per node; each node hashes only those
+with complete_index(), and merging again gives the final groups. No node ever
+reads another node's files.
+"""
+
+import json
+import os
+import re
+import socket
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from . import APP_NAME, __version__
+from .archives import hash_members, is_member, member_path, split_member
+from .engine import ScanOptions, scan
+from .hashing import QUICK_HASH_BYTES, READ_CHUNK, stream_digests
+from .utils import log_error
+from .walker import stat_record
+
+INDEX_KIND = "dupcleaner-index"
+INDEX_FORMAT = 1
+WRITE_BUFFER = 1024 * 1024
+
+
+def default_node():
+    return socket.gethostname() or "local"
+
+
+# =================== WRITING ===================
+def _absolute(path):
+    """path made absolute, so an index resolves from any working directory; member names stay as they are."""
+    archive, name = split_member(path)
+    if archive is not None:
+        return member_path(os.path.abspath(archive), name)
+    return os.path.abspath(path)
+
+
+def _entry_line(rec, digests):
+    entry = {"path": _absolute(rec.path), "size": rec.size, "mtime_ns": rec.mtime_ns}
+    if digests is not None:
+        quick, _, full = digests
+        if quick:
+            entry["quick"] = quick
+        if full:
+            entry["full"] = full
+    return json.dumps(entry) + "\n"
+
+
+def _write(path, header, lines):
+    """Write header and entry lines to a temporary file, then move it over path."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+        f.write(json.dumps(header) + "\n")
+        f.writelines(lines)
+    os.replace(tmp, path)
+
+
+def write_index(path, records, entries, node, algorithm, roots=()):
+    """Write records (a FileTable) and their digests (entries, {path: [quick, sample, full]}) as an index."""
+    header = {
+        "kind": INDEX_KIND,
+        "format": INDEX_FORMAT,
+        "tool": APP_NAME,
+        "version": __version__,
+        "node": node,
+        "algorithm": algorithm,
+        "roots": [os.path.abspath(r) for r in roots],
+        "files": len(records),
+    }
+    _write(path, header, (_entry_line(rec, entries.get(p)) for p, rec in records.items()))
+
+
+def build_index(paths, output, options=None, node=None, stop_event=None, bus=None):
+    """Scan paths and write their index to output; returns the ScanResult.
+
+    The scan is the ordinary local one, so the index holds exactly the digests
+    it needed. Nothing is written if the scan was stopped.
+    """
+    options = options or ScanOptions()
+    entries = {}
+    result = scan(paths, options, stop_event, bus, entries=entries)
+    if not result.stopped:
+        write_index(output, result.records, entries, node or default_node(), options.algorithm, paths)
+    return result
+
+
+# =================== READING ===================
+def read_index_header(path):
+    """The header of an index; ValueError if path is not an index."""
+    with open(path, encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+    if not isinstance(header, dict) or header.get("kind") != INDEX_KIND:
+        raise ValueError(f"{path} is not a {APP_NAME} index")
+    if header.get("format", 0) > INDEX_FORMAT:
+        raise ValueError(f"{path} was written by a newer version ({header.get('version')})")
+    return header
+
+
+def iter_index(path):
+    """Yield the entry dicts (path, size, mtime_ns, optional quick/full) of an index."""
+    with open(path, encoding="utf-8") as f:
+        f.readline()
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# =================== COMPLETING ===================
+def _hash_file(path, algorithm):
+    """(FileRecord, [quick, sample, full]) of a local file, or (None, None) if it is gone."""
+    rec = stat_record(path)
+    if rec is None:
+        return None, None
+    try:
+        with open(path, "rb") as f:
+            return rec, stream_digests(f, rec.size, algorithm, READ_CHUNK)
+    except OSError as e:
+        log_error(f"Hashing failed: {path} | {e}")
+        return rec, None
+
+
+def complete_index(path, needed, workers=1, stop_event=None):
+    """Hash the files in needed (paths listed by merge_indexes() for this node) and
+    update their entries in the index at path. Returns the number of files hashed.
+
+    Files that changed since the index was written get their new size and
+    mtime; files that vanished are dropped from the index.
+    """
+    header = read_index_header(path)
+    algorithm = header["algorithm"]
+    needed = set(needed)
+    updated = {}  # path -> (FileRecord or None, digests)
+    members = [p for p in needed if is_member(p)]
+    if members:
+        digests = {}
+        hash_members(members, algorithm, digests, workers, stop_event)
+        for p in members:
+            rec = stat_record(p)
+            updated[p] = (rec, digests.get(p) if rec is not None else None)
+    files = [p for p in needed if not is_member(p)]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="hash") as pool:
+        for p, outcome in zip(files, pool.map(lambda p: _hash_file(p, algorithm), files)):
+            if stop_event is not None and stop_event.is_set():
+                break
+            updated[p] = outcome
+
+    def lines():
+        for entry in iter_index(path):
+            if entry["path"] not in updated:
+                yield json.dumps(entry) + "\n"
+                continue
+            rec, digests = updated[entry["path"]]
+            if rec is not None:
+                yield _entry_line(rec, digests)
+
+    _write(path, header, lines())
+    return sum(1 for rec, digests in updated.values() if digests is not None)
+
+
+# =================== MERGING ===================
+@dataclass
+class MergeResult:
+    groups: list = field(default_factory=list)  # [(node, path), ...] per duplicate group
+    sizes: list = field(default_factory=list)  # file size per group
+    needs: dict = field(default_factory=dict)  # node -> paths that node must hash before merging again
+    nodes: list = field(default_factory=list)
+    files: int = 0
+    algorithm: str = ""
+
+    @property
+    def cross_node(self):
+        return [g for g in self.groups if len({node for node, _ in g}) > 1]
+
+    @property
+    def total_reclaimable(self):
+        return sum(size * (len(g) - 1) for g, size in zip(self.groups, self.sizes))
+
+
+def _content_key(entry):
+    """Full digest, or the quick digest where it covers the whole file; None if unknown."""
+    if entry.get("full"):
+        return entry["full"]
+    if entry["size"] <= QUICK_HASH_BYTES:
+        return entry.get("quick")
+    return None
+
+
+def merge_indexes(paths):
+    """Combine indexes into duplicate groups across nodes; return a MergeResult.
+
+    Each index is read twice, keeping only the files whose size occurs more
+    than once overall, so memory follows the size collisions rather than the
+    file count. Files whose content is not known well enough yet end up in
+    result.needs; once their nodes have run complete_index(), merge again.
+    """
+    headers = [read_index_header(p) for p in paths]
+    algorithms = {h["algorithm"] for h in headers}
+    if len(algorithms) > 1:
+        raise ValueError(f"Indexes use different digest algorithms ({', '.join(sorted(algorithms))}); rescan with one")
+    nodes = [h["node"] for h in headers]
+    result = MergeResult(nodes=list(dict.fromkeys(nodes)), algorithm=algorithms.pop() if algorithms else "")
+
+    sizes = Counter()
+    for p in paths:
+        for entry in iter_index(p):
+            sizes[entry["size"]] += 1
+            result.files += 1
+    by_size = defaultdict(dict)  # size -> {(node, path): entry}
+    for p, node in zip(paths, nodes):
+        for entry in iter_index(p):
+            if sizes[entry["size"]] > 1:
+                by_size[entry["size"]][node, entry["path"]] = entry
+    del sizes
+
+    needs = defaultdict(list)
+    found = []
+    for size, bucket in by_size.items():
+        if len(bucket) < 2:
+            continue  # the same node and path indexed twice
+        quick_known = all(e.get("quick") for e in bucket.values())
+        quick_counts = Counter(e.get("quick") for e in bucket.values())
+        by_content = defaultdict(list)
+        for key, entry in bucket.items():
+            content = _content_key(entry)
+            if content is not None:
+                by_content[content].append(key)
+            elif not (quick_known and quick_counts[entry["quick"]] == 1):
+                # Only a full digest can settle it; a unique quick digest already rules it out.
+                needs[key[0]].append(key[1])
+        for members in by_content.values():
+            if len(members) > 1:
+                found.append((sorted(members), size))
+    found.sort(key=lambda g: g[1] * (len(g[0]) - 1), reverse=True)
+    result.groups = [members for members, _ in found]
+    result.sizes = [size for _, size in found]
+    result.needs = {node: sorted(p) for node, p in needs.items()}
+    return result
+
+
+def write_needs(needs, folder):
+    """Write one "<node>.txt" list of paths per node into folder; returns {node: file}."""
+    os.makedirs(folder, exist_ok=True)
+    written = {}
+    for node, paths in needs.items():
+        path = os.path.join(folder, re.sub(r"[^\w.-]", "_", node) + ".txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(p + "\n" for p in paths)
+        written[node] = path
+    return written
+
+
+def read_needs(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
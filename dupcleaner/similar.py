@@ -0,0 +1,245 @@
+"""
+Near-duplicate images: perceptual hashes plus a BK-tree Hamming search.
+
+Re-encoded, resized or lightly edited copies never share bytes, but they do
+share a 64-bit perceptual hash up to a few flipped bits. Hashes are computed
+in parallel (and cached in the hash cache under their own algorithm name),
+indexed in a BK-tree, and each image's neighbours within the distance
+threshold are found without comparing every pair.
+"""
+
+import math
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .archives import is_member
+from .cache import open_hash_cache
+from .engine import ScanOptions, ScanResult, inode_key
+from .filetable import FileTable
+from .metrics import timed_call
+from .progress import STAGE_DONE, STAGE_HASH, STAGE_WALK, ProgressBus
+from .thumbnails import is_image
+from .utils import log_error
+from .walker import stat_record, walk
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+PERCEPTUAL_METHODS = ("ahash", "dhash", "phash")
+DEFAULT_METHOD = "dhash"
+DEFAULT_DISTANCE = 10  # differing bits out of 64
+HASH_SIDE = 8
+PHASH_SIDE = 32
+
+
+# =================== PERCEPTUAL HASHES ===================
+def _gray_pixels(path, width, height):
+    with Image.open(path) as img:
+        img.draft("L", (width * 4, height * 4))  # JPEG: decode at reduced scale
+        resample = getattr(Image, "Resampling", Image).LANCZOS
+        return list(img.convert("L").resize((width, height), resample).tobytes())
+
+
+def _bits(flags):
+    value = 0
+    for flag in flags:
+        value = (value << 1) | bool(flag)
+    return value
+
+
+def _ahash(path):
+    px = _gray_pixels(path, HASH_SIDE, HASH_SIDE)
+    mean = sum(px) / len(px)
+    return _bits(p > mean for p in px)
+
+
+def _dhash(path):
+    w = HASH_SIDE + 1
+    px = _gray_pixels(path, w, HASH_SIDE)
+    return _bits(px[r * w + c] > px[r * w + c + 1] for r in range(HASH_SIDE) for c in range(HASH_SIDE))
+
+
+_DCT = [[math.cos((2 * x + 1) * u * math.pi / (2 * PHASH_SIDE)) for x in range(PHASH_SIDE)]
+        for u in range(HASH_SIDE)]
+
+
+def _phash(path):
+    n = PHASH_SIDE
+    px = _gray_pixels(path, n, n)
+    # Only the 8x8 lowest frequencies of the 32x32 DCT-II are needed: transform
+    # rows into 8 coefficients, then columns of that 32x8 result.
+    rows = [[sum(c * v for c, v in zip(basis, px[y * n:(y + 1) * n])) for basis in _DCT] for y in range(n)]
+    low = [sum(basis[y] * rows[y][u] for y in range(n)) for basis in _DCT for u in range(HASH_SIDE)]
+    median = sorted(low)[len(low) // 2]
+    return _bits(c > median for c in low)
+
+
+_METHODS = {"ahash": _ahash, "dhash": _dhash, "phash": _phash}
+
+
+def perceptual_hash(path, method=DEFAULT_METHOD):
+    """64-bit perceptual hash as an int; None if the image cannot be decoded."""
+    try:
+        return _METHODS[method](path)
+    except KeyError:
+        raise ValueError(f"Unknown perceptual hash {method!r}; expected one of {', '.join(PERCEPTUAL_METHODS)}") from None
+    except Exception as e:
+        log_error(f"Perceptual hash failed: {path} | {e}")
+        return None
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+# =================== BK-TREE ===================
+class BKTree:
+    """Metric tree over Hamming distance.
+
+    Each child hangs off its parent at their exact distance d, so by the triangle
+    inequality a query at distance q from a node only needs the children with
+    |d - q| <= threshold.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, threshold):
+        """Items whose hash is within threshold bits of value."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= threshold:
+                found.extend(node[1])
+            for edge, child in node[2].items():
+                if d - threshold <= edge <= d + threshold:
+                    stack.append(child)
+        return found
+
+
+# =================== SEARCH ===================
+def find_similar_images(files, method=DEFAULT_METHOD, threshold=DEFAULT_DISTANCE, options=None, stop_event=None, bus=None,
+                        on_group=None):
+    """Group images whose perceptual hashes differ in at most threshold bits; return a ScanResult.
+
+    files are FileRecords or paths; non-images are ignored. Groups are formed
+    greedily in input order: an image claims every not yet grouped neighbour
+    within threshold, so chains of gradually drifting edits do not merge into
+    one group. Hardlinks are hashed once and listed as aliases. The digest of a
+    group is the perceptual hash of its first image; on_group([FileRecord, ...],
+    digest) is called as each group is formed.
+    """
+    if Image is None:
+        raise ImportError("Similar-image search needs Pillow (pip install pillow)")
+    if method not in PERCEPTUAL_METHODS:
+        raise ValueError(f"Unknown perceptual hash {method!r}; expected one of {', '.join(PERCEPTUAL_METHODS)}")
+    options = options or ScanOptions()
+    bus = bus or ProgressBus()
+    stopped = lambda: stop_event is not None and stop_event.is_set()
+
+    bus.set_stage(STAGE_WALK)
+    records = FileTable()
+    units = {}  # inode key -> representative path
+    aliases = defaultdict(list)
+    for item in files:
+        if stopped():
+            break
+        rec = stat_record(item) if isinstance(item, str) else item
+        if rec is None or rec.path in records or not is_image(rec.path) or is_member(rec.path):
+            continue
+        records.add(rec)
+        bus.add(files_seen=1)
+        key = inode_key(rec)
+        if key in units:
+            aliases[units[key]].append(rec.path)
+        else:
+            units[key] = rec.path
+    paths = list(units.values())
+    bus.metrics.add(STAGE_WALK, files=len(records))
+
+    bus.set_stage(STAGE_HASH)
+    bus.metrics.set_workers(STAGE_HASH, options.workers)
+    bus.set_totals(len(paths), sum(records[p].size for p in paths))
+    cache = open_hash_cache(options.cache_path, f"perceptual-{method}") if options.cache_path else None
+    hashes = {}
+    todo = []
+    for p in paths:
+        cached = cache.get(records[p])[2] if cache else None
+        if cached is not None:
+            hashes[p] = int(cached, 16)
+            bus.add(cache_hits=1, files_done=1, bytes_done=records[p].size)
+            bus.metrics.add("hash.perceptual", cache_hits=1)
+        else:
+            todo.append(p)
+            if cache:
+                bus.add(cache_misses=1)
+                bus.metrics.add("hash.perceptual", cache_misses=1)
+    try:
+        with ThreadPoolExecutor(max_workers=options.workers, thread_name_prefix="phash") as pool:
+            # PIL releases the GIL while decoding, so threads scale across cores.
+            job = lambda f: (0.0, None) if stopped() else timed_call(perceptual_hash, f, method)
+            for p, (busy, value) in zip(todo, pool.map(job, todo)):
+                bus.add(files_done=1, bytes_done=records[p].size)
+                bus.metrics.add("hash.perceptual", files=1, bytes=records[p].size, busy=busy, tasks=1)
+                if value is None:
+                    continue
+                hashes[p] = value
+                if cache:
+                    cache.put(p, records[p], None, None, f"{value:016x}")
+    finally:
+        if cache:
+            cache.close()
+
+    tree = BKTree()
+    order = [p for p in paths if p in hashes]
+    for i, p in enumerate(order):
+        tree.add(hashes[p], i)
+    result = ScanResult(records=records)
+    grouped = set()
+    for i, p in enumerate(order):
+        if stopped():
+            break
+        if i in grouped:
+            continue
+        members = sorted(j for j in tree.search(hashes[p], threshold) if j not in grouped)
+        if len(members) > 1:
+            grouped.update(members)
+            group = [a for j in members for a in (order[j], *aliases.get(order[j], ()))]
+            digest = f"{hashes[p]:016x}"
+            result.groups.append(group)
+            result.digests.append(digest)
+            if on_group is not None:
+                on_group([records[f] for f in group], digest)
+            bus.add(groups=1)
+
+    result.stopped = stopped()
+    bus.set_stage(STAGE_DONE)
+    return result
+
+
+def scan_similar(paths, method=DEFAULT_METHOD, threshold=DEFAULT_DISTANCE, options=None, stop_event=None, bus=None,
+                 on_group=None):
+    """Walk the given files/folders and return a ScanResult of near-duplicate image groups."""
+    options = options or ScanOptions()
+    files = walk(paths, options.exclude, options.follow_symlinks, options.walk_workers, stop_event)
+    return find_similar_images(files, method, threshold, options, stop_event, bus, on_group)
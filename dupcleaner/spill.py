@@ -0,0 +1,95 @@
+"""
+External-memory size grouping for trees too large to sort in RAM.
+
+group_by_size() normally sorts every file ID of the FileTable by size in one
+Python list, about 40 bytes per file on top of the table itself. With
+ScanOptions.group_memory set it uses SizeRuns instead: (size, file ID) pairs
+are sorted in runs that fit the memory ceiling, each run is written to an
+anonymous temporary file as packed 12-byte records, and the runs are merged
+with heapq.merge one size at a time. Only sizes shared by two or more files
+come out, smallest first, as a lazy stream, so hashing starts on the first
+groups while the later ones are still being merged.
+"""
+
+import heapq
+import struct
+import tempfile
+
+RUN_RECORD = struct.Struct("<qI")  # size, file ID
+RECORD_MEMORY = 48  # bytes per buffered pair while a run is sorted: an int key and its list slot
+MIN_RUN_RECORDS = 1 << 16
+READ_RECORDS = 1 << 14  # records read from a run file per refill during the merge
+ID_BITS = 32  # FileTable file IDs fit in 32 bits
+
+
+class SizeRuns:
+    """Sorted on-disk runs of (size, file ID), merged into same-size groups.
+
+    add() buffers pairs until memory_limit bytes' worth, then sorts the buffer
+    and writes it out as a run in folder (None: the system temp folder). If
+    everything fits in one buffer nothing is written. groups() can be
+    consumed once; the run files are closed, and so removed, when it finishes
+    or close() is called.
+    """
+
+    def __init__(self, memory_limit, folder=None):
+        self.run_records = max(MIN_RUN_RECORDS, memory_limit // RECORD_MEMORY)
+        self.folder = folder
+        self.runs = []  # open run files, each sorted by (size, file ID)
+        self._buffer = []  # size << ID_BITS | file ID
+
+    def add(self, size, fid):
+        self._buffer.append(size << ID_BITS | fid)
+        if len(self._buffer) >= self.run_records:
+            self._spill()
+
+    def _spill(self):
+        self._buffer.sort()
+        run = tempfile.TemporaryFile(dir=self.folder, prefix="dupcleaner-sizes-")
+        mask = (1 << ID_BITS) - 1
+        pack = RUN_RECORD.pack
+        for i in range(0, len(self._buffer), READ_RECORDS):
+            run.write(b"".join(pack(key >> ID_BITS, key & mask) for key in self._buffer[i:i + READ_RECORDS]))
+        run.seek(0)
+        self.runs.append(run)
+        self._buffer = []
+
+    @staticmethod
+    def _read(run):
+        """(size, file ID) pairs of one run file, read in blocks."""
+        block = RUN_RECORD.size * READ_RECORDS
+        while True:
+            data = run.read(block)
+            if not data:
+                return
+            yield from RUN_RECORD.iter_unpack(data)
+
+    def groups(self):
+        """Yield (size, [file IDs in ID order]) for each size held by two or more files, smallest first."""
+        try:
+            if self.runs:
+                if self._buffer:
+                    self._spill()
+                pairs = heapq.merge(*(self._read(run) for run in self.runs))
+            else:
+                self._buffer.sort()
+                mask = (1 << ID_BITS) - 1
+                pairs = ((key >> ID_BITS, key & mask) for key in self._buffer)
+            current, fids = None, []
+            for size, fid in pairs:
+                if size != current:
+                    if len(fids) > 1:
+                        yield current, fids
+                    current, fids = size, [fid]
+                else:
+                    fids.append(fid)
+            if len(fids) > 1:
+                yield current, fids
+        finally:
+            self.close()
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        self._buffer = []
@@ -0,0 +1,105 @@
+"""
+Prefix index over scan targets.
+
+Targets are kept in a trie of path components, so nested or repeated targets
+("/data" and "/data/photos", "/data" and "/data/") are found in time
+proportional to the path depth rather than by comparing every pair, and
+sibling names ("/data/a" versus "/data/ab") never match each other the way
+a plain string prefix test does.
+"""
+
+import os
+
+_TARGET = None  # trie key marking a node that is itself a target; components are never None
+
+
+def path_key(path):
+    """Tuple of normalized components: absolute, case-folded where the OS is, no trailing separator."""
+    parts = os.path.normcase(os.path.abspath(path)).split(os.sep)
+    return (parts[0], *(p for p in parts[1:] if p))
+
+
+def is_within(path, folder):
+    """True if path is folder or lies below it (compared by whole components)."""
+    a, b = path_key(path), path_key(folder)
+    return a[:len(b)] == b
+
+
+class TargetIndex:
+    """Ordered set of target paths with containment queries.
+
+    add() and discard() keep the paths as given; queries accept any spelling
+    of a path. roots() is what needs walking: targets not inside another one.
+    """
+
+    def __init__(self, paths=()):
+        self._trie = {}
+        self._paths = {}  # original path -> key, in insertion order
+        for path in paths:
+            self.add(path)
+
+    def _node(self, key, create=False):
+        node = self._trie
+        for part in key:
+            child = node.get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = node[part] = {}
+            node = child
+        return node
+
+    def add(self, path):
+        """Add path; False if the same folder or file (in any spelling) is already a target."""
+        key = path_key(path)
+        node = self._node(key, create=True)
+        if _TARGET in node:
+            return False
+        node[_TARGET] = path
+        self._paths[path] = key
+        return True
+
+    def discard(self, path):
+        key = self._paths.pop(path, None) or path_key(path)
+        node = self._node(key)
+        if node is not None and node.get(_TARGET) is not None:
+            self._paths.pop(node.pop(_TARGET), None)
+
+    def __contains__(self, path):
+        node = self._node(path_key(path))
+        return node is not None and _TARGET in node
+
+    def __iter__(self):
+        return iter(list(self._paths))
+
+    def __len__(self):
+        return len(self._paths)
+
+    def covering(self, path):
+        """The outermost other target that contains path, or None."""
+        node = self._trie
+        for part in path_key(path)[:-1]:
+            node = node.get(part)
+            if node is None:
+                return None
+            if _TARGET in node:
+                return node[_TARGET]
+        return None
+
+    def nested(self, path):
+        """Targets strictly below path, visiting only the index below it."""
+        node = self._node(path_key(path))
+        found = []
+        stack = [child for part, child in (node or {}).items() if part is not _TARGET]
+        while stack:
+            node = stack.pop()
+            for part, child in node.items():
+                if part is _TARGET:
+                    found.append(child)
+                else:
+                    stack.append(child)
+        return found
+
+    def roots(self):
+        """Targets not inside another target, in insertion order."""
+        return [p for p in self._paths if self.covering(p) is None]
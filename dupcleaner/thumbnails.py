@@ -0,0 +1,221 @@
+"""
+Thumbnail decoding off the UI thread.
+
+Finished thumbnails are kept in a bounded in-memory LRU and in an on-disk store
+keyed by file content, so every member of a duplicate group (and the same group
+on a later run) shares one decode. JPEGs are decoded with Image.draft(), which
+lets libjpeg scale by 1/2 to 1/8 while decoding instead of building the
+full-resolution bitmap first. The disk store is capped: a stored thumbnail's
+mtime is bumped whenever it is used, and once the store outgrows its byte
+budget the least recently used files are removed.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import open_hash_cache
+from .hashing import DEFAULT_ALGORITHM, SAMPLE_MIN_SIZE, file_hash, sample_hash
+from .utils import default_thumb_dir, log_error
+from .walker import stat_record
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+THUMB_SIZE = (120, 120)
+MEMORY_ITEMS = 512
+STORE_BYTES = 64 * 1024 * 1024
+PRUNE_TO = 0.8  # pruning removes the oldest thumbnails until the store is this fraction of its budget
+DEFAULT_THUMB_WORKERS = min(4, os.cpu_count() or 2)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def decode_thumbnail(path, size=THUMB_SIZE):
+    """Downscaled RGB/RGBA copy of an image, decoded at reduced scale where the format allows."""
+    with Image.open(path) as img:
+        img.draft("RGB", (size[0] * 2, size[1] * 2))  # JPEG only; other formats ignore it
+        img.thumbnail(size)
+        keep_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        return img.convert("RGBA" if keep_alpha else "RGB")
+
+
+class ThumbnailLoader:
+    """Background thumbnail pool with an LRU in front of a content-keyed disk store."""
+
+    def __init__(self, store_dir=default_thumb_dir, cache_path=None, algorithm=DEFAULT_ALGORITHM,
+                 workers=DEFAULT_THUMB_WORKERS, memory_items=MEMORY_ITEMS, size=THUMB_SIZE, store_bytes=STORE_BYTES):
+        self.algorithm = algorithm
+        self.size = size
+        self.memory_items = memory_items
+        self.memory = OrderedDict()  # content key -> PIL image
+        self.keys = OrderedDict()  # FileRecord -> content key, so lookups do not re-read files
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.store_dir = store_dir
+        self.store_bytes = store_bytes
+        self.store_used = 0
+        self.prune_lock = threading.Lock()
+        try:
+            os.makedirs(store_dir, exist_ok=True)
+            self.store_used = sum(size for _, size, _ in self._stored_files())
+        except OSError as e:
+            log_error(f"Thumbnail store unavailable, keeping thumbnails in memory only: {e}")
+            self.store_dir = None
+        self.cache = open_hash_cache(cache_path, algorithm) if cache_path else None
+        self.cache_lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb")
+
+    def _lru_put(self, lru, key, value):
+        with self.lock:
+            lru[key] = value
+            lru.move_to_end(key)
+            while len(lru) > self.memory_items:
+                lru.popitem(last=False)
+
+    def _lru_get(self, lru, key):
+        with self.lock:
+            value = lru.get(key)
+            if value is not None:
+                lru.move_to_end(key)
+            return value
+
+    def content_key(self, path, rec):
+        """Name of the thumbnail for this content.
+
+        Uses the full digest from the scan's hash cache when there is one. Small
+        files are hashed in full. For large uncached files the quick+sampled
+        fingerprint and size are used, the same evidence --verify none accepts.
+        """
+        key = self._lru_get(self.keys, rec)
+        if key is not None:
+            return key
+        quick = sample = full = None
+        if self.cache is not None:
+            with self.cache_lock:
+                quick, sample, full = self.cache.get(rec)
+        if full is None and rec.size <= SAMPLE_MIN_SIZE:
+            full = file_hash(path, quick=False, algorithm=self.algorithm)
+        if full is not None:
+            evidence = f"{self.algorithm}:{full}"
+        else:
+            quick = quick or file_hash(path, quick=True, algorithm=self.algorithm)
+            sample = sample or sample_hash(path, algorithm=self.algorithm)
+            if quick is None or sample is None:
+                return None
+            evidence = f"{self.algorithm}:{rec.size}:{quick}:{sample}"
+        key = hashlib.sha1(f"{evidence}:{self.size[0]}x{self.size[1]}".encode()).hexdigest()
+        self._lru_put(self.keys, rec, key)
+        return key
+
+    def _store_path(self, key):
+        return os.path.join(self.store_dir, key[:2], key + ".png")
+
+    def _stored_files(self):
+        """(mtime_ns, size, path) of every thumbnail in the store."""
+        files = []
+        for sub in os.scandir(self.store_dir):
+            if sub.is_dir():
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(".png"):
+                        st = entry.stat()
+                        files.append((st.st_mtime_ns, st.st_size, entry.path))
+        return files
+
+    def _stored(self, nbytes):
+        """Count a newly written thumbnail and prune the store if it is over budget."""
+        with self.lock:
+            self.store_used += nbytes
+            if self.store_used <= self.store_bytes:
+                return
+        if not self.prune_lock.acquire(blocking=False):
+            return  # another worker is already pruning
+        try:
+            files = sorted(self._stored_files())
+            used = sum(size for _, size, _ in files)
+            target = self.store_bytes * PRUNE_TO
+            for _, size, path in files:
+                if used <= target:
+                    break
+                try:
+                    os.remove(path)
+                    used -= size
+                except OSError:
+                    pass
+            with self.lock:
+                self.store_used = used
+        except OSError as e:
+            log_error(f"Thumbnail store pruning failed: {e}")
+        finally:
+            self.prune_lock.release()
+
+    def load(self, path, rec=None):
+        """Thumbnail for path from memory, disk or a fresh decode; None if it cannot be read."""
+        rec = rec or stat_record(path)
+        if rec is None:
+            return None
+        key = self.content_key(path, rec)
+        if key is None:
+            return None
+        img = self._lru_get(self.memory, key)
+        if img is not None:
+            return img
+        stored = self._store_path(key) if self.store_dir else None
+        if stored and os.path.exists(stored):
+            try:
+                with Image.open(stored) as cached:
+                    img = cached.copy()
+                os.utime(stored)  # mtime marks the last use, for pruning
+            except OSError:
+                img = None
+        if img is None:
+            img = decode_thumbnail(path, self.size)
+            if stored:
+                try:
+                    os.makedirs(os.path.dirname(stored), exist_ok=True)
+                    tmp = f"{stored}.{threading.get_ident()}.tmp"
+                    img.save(tmp, "PNG")
+                    os.replace(tmp, stored)
+                    self._stored(os.path.getsize(stored))
+                except OSError as e:
+                    log_error(f"Thumbnail store write failed: {stored} | {e}")
+        self._lru_put(self.memory, key, img)
+        return img
+
+    def request(self, path, rec, callback):
+        """Load in the pool and call callback(path, image or None) from a worker thread.
+
+        Requests made before the last cancel_pending() are dropped unstarted.
+        """
+        generation = self.generation
+
+        def job():
+            if generation != self.generation:
+                return
+            try:
+                img = self.load(path, rec)
+            except Exception as e:
+                log_error(f"Thumbnail failed: {path} | {e}")
+                img = None
+            if generation == self.generation:
+                callback(path, img)
+
+        self.pool.submit(job)
+
+    def cancel_pending(self):
+        self.generation += 1
+
+    def close(self):
+        self.cancel_pending()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            with self.cache_lock:
+                self.cache.close()
+            self.cache = None
@@ -0,0 +1,30 @@
+"""Shared helpers: data file locations, error log and size formatting."""
+
+import os
+from datetime import datetime
+
+
+def data_path(file_name):
+    """Location of a DupCleaner data file (log, settings, caches) in the working directory."""
+    return os.path.join(os.getcwd(), file_name)
+
+
+log_file = data_path("dupcleaner.log")
+default_cache_file = data_path("dupcleaner_cache.db")
+default_thumb_dir = data_path("dupcleaner_thumbs")
+default_checkpoint_file = data_path("dupcleaner_checkpoint.pkl")
+default_journal_file = data_path("dupcleaner_journal.jsonl")
+default_metrics_dir = data_path("dupcleaner_metrics")
+
+
+def log_error(msg):
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(f"[{datetime.now().isoformat()}] {msg}\n")
+
+
+def format_size(num):
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if num < 1024:
+            return f"{num:.2f} {unit}"
+        num /= 1024
+    return f"{num:.2f} PB"
@@ -0,0 +1,152 @@
+"""
+Parallel os.scandir walker.
+
+Each file is stat'ed exactly once and described by a FileRecord, which the size
+grouping, cache, hashing and delete stages reuse instead of calling
+os.path.getsize/getmtime again. With archives set, the members of zip and tar
+files are yielded too, as "archive.zip!/inner/path" records (see archives.py).
+"""
+
+import fnmatch
+import os
+import stat
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .archives import MEMBER_SEP, is_archive, list_members, member_info, member_path
+from .targets import TargetIndex
+from .utils import log_error
+
+FileRecord = namedtuple("FileRecord", "path size mtime_ns dev ino")
+
+DEFAULT_WALK_WORKERS = min(16, (os.cpu_count() or 4) * 2)  # directory reads are latency bound
+
+
+def _record(path, st):
+    return FileRecord(path, st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino)
+
+
+def _member_records(rec):
+    """FileRecords for the members of an archive: header sizes, the archive's mtime and
+    device, and inode 0 so they are never cached or taken for hardlinks."""
+    return [FileRecord(member_path(rec.path, name), size, rec.mtime_ns, rec.dev, 0)
+            for name, size in list_members(rec.path, rec.mtime_ns)]
+
+
+def stat_record(path):
+    """FileRecord for a single regular file or archive member, or None if it is missing or not a file."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        if MEMBER_SEP in path:
+            info = member_info(path)
+            if info is not None:
+                size, _, st = info
+                return FileRecord(path, size, st.st_mtime_ns, st.st_dev, 0)
+        return None
+    return _record(path, st) if stat.S_ISREG(st.st_mode) else None
+
+
+def is_excluded(name, exclude):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in exclude)
+
+
+def _scan_dir(path, exclude, follow_symlinks, archives=False):
+    """Read one directory; return (file records, [(subdir path, (dev, ino))])."""
+    files = []
+    dirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        if not is_excluded(entry.name, exclude):
+                            st = entry.stat(follow_symlinks=follow_symlinks)
+                            if not st.st_ino:
+                                st = os.stat(entry.path, follow_symlinks=follow_symlinks)
+                            dirs.append((entry.path, (st.st_dev, st.st_ino)))
+                    elif entry.is_file(follow_symlinks=follow_symlinks):
+                        st = entry.stat(follow_symlinks=follow_symlinks)
+                        if not st.st_ino:
+                            # DirEntry.stat() leaves st_dev/st_ino at 0 on Windows.
+                            st = os.stat(entry.path, follow_symlinks=follow_symlinks)
+                        files.append(_record(entry.path, st))
+                        if archives and is_archive(entry.name):
+                            files.extend(_member_records(files[-1]))
+                except OSError:
+                    continue
+    except OSError as e:
+        log_error(f"Cannot read folder: {path} | {e}")
+    return files, dirs
+
+
+class WalkState:
+    """Where a walk has got to, so a stopped walk can continue instead of starting over.
+
+    pending holds the folders queued but not yet fully yielded; seen holds the
+    (st_dev, st_ino) of every folder ever queued. Both are updated in place as
+    the walk() generator is consumed.
+    """
+
+    def __init__(self, pending=(), seen=()):
+        self.pending = set(pending)
+        self.seen = set(seen)
+
+
+def walk(paths, exclude=(), follow_symlinks=False, workers=DEFAULT_WALK_WORKERS, stop_event=None, state=None,
+         archives=False):
+    """Yield a FileRecord for every regular file below the given files/folders.
+
+    Directories are read concurrently and records are yielded as soon as their
+    directory has been listed. Folders whose name matches an exclude pattern are
+    pruned. Targets inside another target are dropped up front (see targets.py),
+    and every directory is visited once by (st_dev, st_ino), which also stops
+    symlink loops when follow_symlinks is set. Symlinked files are skipped unless
+    follow_symlinks is set. With archives, each zip/tar file is followed by its
+    members.
+
+    With a WalkState from an interrupted walk, only its pending folders are
+    listed again; files of a folder that was being yielded when the walk
+    stopped, and file targets, may be yielded a second time.
+    """
+    state = state if state is not None else WalkState()
+    seen_dirs = state.seen
+    paths = TargetIndex(paths).roots()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="walk") as pool:
+        pending = {pool.submit(_scan_dir, d, exclude, follow_symlinks, archives): d for d in state.pending}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                log_error(f"Cannot read target: {path} | {e}")
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                key = (st.st_dev, st.st_ino)
+                if key not in seen_dirs:
+                    seen_dirs.add(key)
+                    state.pending.add(path)
+                    pending[pool.submit(_scan_dir, path, exclude, follow_symlinks, archives)] = path
+            elif stat.S_ISREG(st.st_mode):
+                rec = _record(path, st)
+                yield rec
+                if archives and is_archive(path):
+                    yield from _member_records(rec)
+
+        while pending:
+            if stop_event is not None and stop_event.is_set():
+                for fut in pending:
+                    fut.cancel()
+                return
+            done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for fut in done:
+                folder = pending.pop(fut)
+                files, dirs = fut.result()
+                # Queue subfolders before yielding, so the state stays complete
+                # if the consumer stops partway through this folder's files.
+                for sub, key in dirs:
+                    if key not in seen_dirs:
+                        seen_dirs.add(key)
+                        state.pending.add(sub)
+                        pending[pool.submit(_scan_dir, sub, exclude, follow_symlinks, archives)] = sub
+                yield from files
+                state.pending.discard(folder)
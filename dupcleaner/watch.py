@@ -0,0 +1,438 @@
+"""
+Watch mode: keep scan results current without full rescans.
+
+A LiveIndex is seeded from a finished ScanResult and holds every file in its
+size bucket, with duplicates sharing one content set. A watcher (inotify on
+Linux, directory-mtime polling elsewhere) reports changed paths; only created
+or modified files are hashed again, and only against the files of the same
+size. Hardlinks join the set of their inode without hashing and, as in a
+scan, a set is only a duplicate group once it spans two distinct inodes.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+from collections import defaultdict
+from itertools import count
+
+from .cache import open_hash_cache
+from .engine import ScanOptions, inode_key, scan
+from .filetable import FileTable
+from .targets import TargetIndex
+from .hashing import QUICK_HASH_BYTES, SAMPLE_MIN_SIZE, file_hash, sample_hash
+from .utils import log_error
+from .walker import _scan_dir, is_excluded, stat_record, walk
+
+DEFAULT_INTERVAL = 1.0
+RESTAT_EVERY = 30  # polling watcher: re-stat all files every N polls to catch in-place edits
+
+
+# =================== INDEX ===================
+class ContentSet:
+    """Same-size files with identical content, in the order they were found."""
+
+    __slots__ = ("key", "paths")
+
+    def __init__(self, key):
+        self.key = key
+        self.paths = {}  # path -> inode key (engine.inode_key), insertion ordered
+
+    def is_duplicate(self):
+        """True once the set holds two distinct inodes; hardlinks alone free nothing."""
+        keys = iter(self.paths.values())
+        first = next(keys, None)
+        return any(k != first for k in keys)
+
+
+class LiveIndex:
+    """Incrementally maintained size buckets and duplicate sets.
+
+    Each ContentSet has an integer key: the seeded groups keep their position
+    in result.groups, new sets are numbered after them. changed_groups()
+    reports only the sets touched since its last call.
+    """
+
+    def __init__(self, result, options=None):
+        self.options = options or ScanOptions()
+        self.records = FileTable()
+        self.children = defaultdict(set)  # folder -> paths of files directly inside it
+        self.dirs = set()  # every folder known to contain indexed files (with ancestors)
+        self.by_size = defaultdict(list)  # size -> list of ContentSets
+        self.group_of = {}  # path -> its ContentSet
+        self.digests = {}  # path -> [quick, sample, full], filled lazily
+        self.cache = open_hash_cache(self.options.cache_path, self.options.algorithm) if self.options.cache_path else None
+        self.updated = []  # FileRecords added/changed since the last drain()
+        self.removed = []  # paths removed since the last drain()
+        self.touched = {}  # key -> ContentSet changed since the last changed_groups()
+        self._keys = count(len(result.groups))
+
+        for key, group in enumerate(result.groups):
+            members = [f for f in group if f in result.records]
+            if not members:
+                continue
+            content = ContentSet(key)
+            self.by_size[result.records[members[0]].size].append(content)
+            for f in members:
+                rec = result.records[f]
+                self._remember(rec)
+                content.paths[f] = inode_key(rec)
+                self.group_of[f] = content
+        for path, rec in result.records.items():
+            if path not in self.group_of:
+                content = ContentSet(next(self._keys))
+                content.paths[path] = inode_key(rec)
+                self.by_size[rec.size].append(content)
+                self.group_of[path] = content
+                self._remember(rec)
+
+    def _remember(self, rec):
+        self.records.add(rec)
+        parent = os.path.dirname(rec.path)
+        self.children[parent].add(rec.path)
+        while parent and parent not in self.dirs:
+            self.dirs.add(parent)
+            up = os.path.dirname(parent)
+            if up == parent:
+                break
+            parent = up
+
+    # ---------- content comparison ----------
+    def _digest(self, path, stage):
+        entry = self.digests.get(path)
+        if entry is None:
+            rec = self.records[path]
+            entry = self.digests[path] = list(self.cache.get(rec)) if self.cache else [None, None, None]
+        if entry[stage] is None:
+            algorithm = self.options.algorithm
+            if stage == 0:
+                entry[0] = file_hash(path, quick=True, algorithm=algorithm)
+            elif stage == 1:
+                entry[1] = sample_hash(path, algorithm=algorithm)
+            else:
+                entry[2] = file_hash(path, quick=False, algorithm=algorithm)
+            if self.cache and entry[stage]:
+                self.cache.put(path, self.records[path], *entry)
+        return entry[stage]
+
+    def _stages(self, size):
+        if size <= QUICK_HASH_BYTES:
+            return (0,)
+        if size <= SAMPLE_MIN_SIZE:
+            return (0, 2)
+        if self.options.verify == "none":
+            return (0, 1)
+        return (0, 1, 2)
+
+    def _same_content(self, a, b):
+        for stage in self._stages(self.records[a].size):
+            da = self._digest(a, stage)
+            if da is None or da != self._digest(b, stage):
+                return False
+        return True
+
+    # ---------- mutation ----------
+    def add(self, rec):
+        self._remember(rec)
+        key = inode_key(rec)
+        bucket = self.by_size[rec.size]
+        # A hardlink joins its inode's set unread; anything else is compared by content.
+        content = next((c for c in bucket if key in c.paths.values()), None)
+        if content is None:
+            content = next((c for c in bucket if self._same_content(next(iter(c.paths)), rec.path)), None)
+        if content is None:
+            content = ContentSet(next(self._keys))
+            bucket.append(content)
+        content.paths[rec.path] = key
+        self.group_of[rec.path] = content
+        self.touched[content.key] = content
+        self.updated.append(rec)
+
+    def remove(self, path):
+        rec = self.records.pop(path, None)
+        if rec is None:
+            return
+        self.children[os.path.dirname(path)].discard(path)
+        self.digests.pop(path, None)
+        content = self.group_of.pop(path)
+        del content.paths[path]
+        self.touched[content.key] = content
+        if not content.paths:
+            bucket = [c for c in self.by_size[rec.size] if c is not content]
+            if bucket:
+                self.by_size[rec.size] = bucket
+            else:
+                del self.by_size[rec.size]
+        self.removed.append(path)
+
+    def refresh_file(self, path):
+        rec = None
+        if self.options.follow_symlinks or not os.path.islink(path):
+            rec = stat_record(path)
+        old = self.records.get(path)
+        if old is not None and rec is not None and old == rec:
+            return
+        self.remove(path)
+        if rec is not None:
+            self.add(rec)
+
+    def refresh_dir(self, folder):
+        """Re-list one folder: pick up new/changed files, drop vanished ones, walk new subfolders."""
+        try:
+            is_dir = stat.S_ISDIR(os.stat(folder).st_mode)
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            self.remove_tree(folder)
+            return
+        self.dirs.add(folder)
+        files, subdirs = _scan_dir(folder, self.options.exclude, self.options.follow_symlinks)
+        seen = set()
+        for rec in files:
+            seen.add(rec.path)
+            if self.records.get(rec.path) != rec:
+                self.remove(rec.path)
+                self.add(rec)
+        for path in self.children.get(folder, set()) - seen:
+            self.remove(path)
+        for sub, _ in subdirs:
+            if sub not in self.dirs:
+                for rec in walk([sub], self.options.exclude, self.options.follow_symlinks):
+                    if rec.path not in self.records:
+                        self.add(rec)
+
+    def remove_tree(self, folder):
+        prefix = os.path.join(folder, "")
+        for d in [d for d in self.children if d == folder or d.startswith(prefix)]:
+            for path in list(self.children[d]):
+                self.remove(path)
+            del self.children[d]
+        self.dirs = {d for d in self.dirs if d != folder and not d.startswith(prefix)}
+
+    def refresh(self, paths):
+        """Apply a batch of changed paths from a watcher; returns True if anything changed."""
+        before = len(self.updated) + len(self.removed)
+        for path in paths:
+            if path in self.dirs or os.path.isdir(path):
+                self.refresh_dir(path)
+            else:
+                self.refresh_file(path)
+        if self.cache:
+            self.cache.commit()
+        return len(self.updated) + len(self.removed) != before
+
+    def restat_all(self):
+        """Re-stat every indexed file; catches in-place edits a directory mtime cannot show."""
+        before = len(self.updated) + len(self.removed)
+        for path in list(self.records):
+            self.refresh_file(path)
+        if self.cache:
+            self.cache.commit()
+        return len(self.updated) + len(self.removed) != before
+
+    def drain(self):
+        """Return and clear (updated records, removed paths) since the last call."""
+        updated, removed = self.updated, self.removed
+        self.updated, self.removed = [], []
+        return updated, removed
+
+    def duplicate_groups(self):
+        """{key: paths} of every current duplicate group, paths in discovery order."""
+        return {c.key: list(c.paths) for bucket in self.by_size.values() for c in bucket if c.is_duplicate()}
+
+    def changed_groups(self):
+        """{key: paths, or None if it is no longer a duplicate group} for the sets touched since the last call."""
+        changed = {key: list(c.paths) if c.is_duplicate() else None for key, c in self.touched.items()}
+        self.touched = {}
+        return changed
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+
+
+# =================== WATCHERS ===================
+def _watch_dirs(roots, exclude, follow_symlinks):
+    """Every folder below roots, pruned like the scan walker; nested roots are listed once."""
+    for root in TargetIndex(roots).roots():
+        if not os.path.isdir(root):
+            continue
+        for folder, subdirs, _ in os.walk(root, followlinks=follow_symlinks):
+            subdirs[:] = [d for d in subdirs if not is_excluded(d, exclude)]
+            yield folder
+
+
+class PollingWatcher:
+    """Portable fallback: compares folder mtimes every poll (creations, deletions, renames)."""
+
+    def __init__(self, roots, exclude=(), follow_symlinks=False):
+        self.exclude = exclude
+        self.follow_symlinks = follow_symlinks
+        self.polls = 0
+        self.mtimes = {}
+        for folder in _watch_dirs(roots, exclude, follow_symlinks):
+            self._track(folder)
+
+    def _track(self, folder):
+        try:
+            self.mtimes[folder] = os.stat(folder).st_mtime_ns
+        except OSError:
+            pass
+
+    def poll(self, timeout, stop_event):
+        if stop_event.wait(timeout):
+            return set()
+        self.polls += 1
+        dirty = set()
+        for folder, mtime in list(self.mtimes.items()):
+            try:
+                current = os.stat(folder).st_mtime_ns
+            except OSError:
+                del self.mtimes[folder]
+                dirty.add(folder)
+                continue
+            if current != mtime:
+                self.mtimes[folder] = current
+                dirty.add(folder)
+                for sub in _watch_dirs([folder], self.exclude, self.follow_symlinks):
+                    if sub not in self.mtimes:
+                        self._track(sub)
+        return dirty
+
+    @property
+    def restat_due(self):
+        return self.polls % RESTAT_EVERY == 0
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watches on every folder, read through ctypes (no extra dependency)."""
+
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT = struct.Struct("iIII")
+
+    restat_due = False
+
+    def __init__(self, roots, exclude=(), follow_symlinks=False):
+        self.roots = list(roots)
+        self.exclude = exclude
+        self.follow_symlinks = follow_symlinks
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wds = {}  # watch descriptor -> folder
+        for folder in _watch_dirs(self.roots, exclude, follow_symlinks):
+            self._add(folder)
+
+    def _add(self, folder):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return
+        self.wds[wd] = folder
+
+    def poll(self, timeout, stop_event):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready or stop_event.is_set():
+            return set()
+        dirty = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, length = self.EVENT.unpack_from(buf, offset)
+                name = buf[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b"\0")
+                offset += self.EVENT.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    dirty.update(self.roots)  # events were lost: re-list everything
+                    continue
+                folder = self.wds.get(wd)
+                if folder is None:
+                    continue
+                if mask & self.IN_IGNORED:
+                    del self.wds[wd]
+                    continue
+                if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                    dirty.add(folder)
+                    continue
+                path = os.path.join(folder, os.fsdecode(name)) if name else folder
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO) and not is_excluded(os.path.basename(path), self.exclude):
+                        for sub in _watch_dirs([path], self.exclude, self.follow_symlinks):
+                            self._add(sub)
+                    dirty.add(path)
+                else:
+                    dirty.add(path)
+        return dirty
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(roots, exclude=(), follow_symlinks=False):
+    """inotify where available, otherwise (or when watches run out) directory-mtime polling."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots, exclude, follow_symlinks)
+        except (OSError, AttributeError) as e:
+            log_error(f"inotify unavailable, polling folders instead: {e}")
+    return PollingWatcher(roots, exclude, follow_symlinks)
+
+
+# =================== WATCH LOOP ===================
+def watch(paths, on_update, options=None, stop_event=None, result=None, interval=DEFAULT_INTERVAL, bus=None):
+    """Keep duplicate groups for paths current until stop_event is set.
+
+    Runs a full scan first unless a ScanResult is passed in. After every batch of
+    changes, on_update(groups, updated records, removed paths) is called from this
+    thread with the groups that changed and the file-level delta. groups maps a
+    group key to its paths, or to None for a group that is gone; the groups of
+    the starting result have their index in result.groups as key, and a scan
+    run here is reported as a first update with every group.
+    """
+    options = options or ScanOptions()
+    stop_event = stop_event or threading.Event()
+    watcher = make_watcher(paths, options.exclude, options.follow_symlinks)
+    try:
+        if result is None:
+            result = scan(paths, options, stop_event, bus)
+            on_update(dict(enumerate(result.groups)), list(result.records.values()), [])
+        index = LiveIndex(result, options)
+        try:
+            while not stop_event.is_set():
+                dirty = watcher.poll(interval, stop_event)
+                changed = index.refresh(dirty) if dirty else False
+                if watcher.restat_due and index.restat_all():
+                    changed = True
+                if changed:
+                    on_update(index.changed_groups(), *index.drain())
+        finally:
+            index.close()
+    finally:
+        watcher.close()
@@ -0,0 +1,73 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from dupcleaner.chunking import PARTIAL_MODE
+from dupcleaner.cli import main
+from dupcleaner.engine import scan
+from dupcleaner.report import ReportWriter, load_report, read_report_header, write_report
+from dupcleaner.similar import PERCEPTUAL_METHODS
+
+
+class CsvReportModeTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.files = os.path.join(self.root, "files")
+        os.mkdir(self.files)
+        for name in ("a", "b"):
+            with open(os.path.join(self.files, name), "wb") as f:
+                f.write(b"dup" * 50)
+        self.csv = os.path.join(self.root, "report.csv")
+
+    def run_cli(self, *argv):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            return main(list(argv))
+
+    def test_exact_round_trip(self):
+        result = scan([self.files])
+        write_report(result.groups, self.csv, result.records, "sha256", result.digests)
+        self.assertEqual(read_report_header(self.csv)["algorithm"], "sha256")
+        loaded = load_report(self.csv)
+        self.assertTrue(loaded.verified)
+        self.assertEqual(loaded.groups, result.groups)
+        self.assertEqual(loaded.digests, result.digests)
+
+    def test_similar_and_partial_are_not_written_as_csv(self):
+        result = scan([self.files])
+        for mode in PERCEPTUAL_METHODS + (PARTIAL_MODE,):
+            with self.subTest(mode=mode):
+                with self.assertRaises(ValueError):
+                    ReportWriter(self.csv, mode)
+                with self.assertRaises(ValueError):
+                    write_report(result.groups, self.csv, result.records, mode)
+                self.assertFalse(os.path.exists(self.csv))
+        for method in PERCEPTUAL_METHODS:
+            with self.subTest(method=method):
+                self.assertEqual(self.run_cli("scan", self.files, "--similar", method, "--csv", self.csv), 2)
+                self.assertFalse(os.path.exists(self.csv))
+
+    def test_csv_without_mode_refuses_delete_and_link(self):
+        result = scan([self.files])
+        write_report(result.groups, self.csv, result.records)
+        with open(self.csv, encoding="utf-8", newline="") as f:
+            f.readline()  # drop the header row, as in reports from older versions
+            legacy = f.read()
+        with open(self.csv, "w", encoding="utf-8", newline="") as f:
+            f.write(legacy)
+        self.assertEqual(read_report_header(self.csv), {})
+        loaded = load_report(self.csv)
+        self.assertFalse(loaded.verified)
+        self.assertEqual(loaded.groups, result.groups)
+        self.assertEqual(self.run_cli("load", self.csv, "--link", "hardlink"), 2)
+        self.assertEqual(self.run_cli("load", self.csv, "--delete", "--permanent"), 2)
+        a, b = result.groups[0]
+        self.assertTrue(os.path.exists(a) and os.path.exists(b))
+        self.assertNotEqual(os.stat(a).st_ino, os.stat(b).st_ino)
+
+
+if __name__ == "__main__":
+    unittest.main()
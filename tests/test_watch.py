@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from dupcleaner.engine import scan
+from dupcleaner.watch import LiveIndex
+
+
+class LiveIndexHardlinkTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_hardlink_only_set_is_not_a_duplicate(self):
+        one = self.write("one", b"unique" * 100)
+        self.write("b", b"dup" * 50)
+        self.write("a", b"dup" * 50)
+        result = scan([self.root])
+        index = LiveIndex(result)
+        self.addCleanup(index.close)
+
+        link = os.path.join(self.root, "one_link")
+        os.link(one, link)
+        index.refresh([self.root])
+        self.assertEqual(list(index.duplicate_groups().values()), scan([self.root]).groups)
+        self.assertTrue(all(g is None for g in index.changed_groups().values()))
+
+        copy = self.write("one_copy", b"unique" * 100)
+        index.refresh([self.root])
+        self.assertEqual(list(index.changed_groups().values()), [[one, link, copy]])
+
+    def test_groups_keep_scan_order(self):
+        self.write("b", b"dup" * 50)
+        self.write("a", b"dup" * 50)
+        result = scan([self.root])
+        index = LiveIndex(result)
+        self.addCleanup(index.close)
+
+        c = self.write("c", b"dup" * 50)
+        index.refresh([self.root])
+        self.assertEqual(index.changed_groups(), {0: result.groups[0] + [c]})
+        self.assertEqual(index.changed_groups(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()